@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the simplified analyzer
+
+Runs SimplifiedAnalyzer over a video in each execution mode (sequential,
+pipelined, parallel segments) and reports, per mode:
+- analyzed frames per second and the real-time factor,
+- per-stage latency percentiles (the analyzer's instrumentation histograms),
+- peak resident memory (of the run process and of its worker processes),
+- size of the result file.
+
+The video is either a local sample clip (--video) or a deterministic
+synthetic clip with N faces moving on Lissajous paths (--faces). Synthetic
+faces are drawn from --face-image when given (any portrait works, e.g. the
+dashboard's public/ photos); otherwise a simple procedural face is drawn,
+which still exercises decoding and detection but may not be picked up by
+Face Mesh.
+
+Every mode runs in a fresh process so memory peaks and model loading do not
+leak between modes. Results are written as JSON (--json); --baseline
+compares against an earlier report and fails when throughput regressed.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from emotion_model import EMOTION_BACKENDS
+
+MODES = ['sequential', 'pipelined', 'parallel']
+
+
+# ---------------------------------------------------------------------------
+# Synthetic video
+# ---------------------------------------------------------------------------
+
+def _procedural_face(size: int, rng: np.random.Generator) -> np.ndarray:
+    """Draw a simple shaded face on a transparent (BGRA) canvas"""
+    face = np.zeros((size, size, 4), dtype=np.uint8)
+    skin = tuple(int(v) for v in rng.integers(120, 220, size=3)) + (255,)
+    center = (size // 2, size // 2)
+    cv2.ellipse(face, center, (int(size * 0.36), int(size * 0.46)), 0, 0, 360, skin, -1, cv2.LINE_AA)
+
+    eye_y = int(size * 0.42)
+    for eye_x in (int(size * 0.36), int(size * 0.64)):
+        cv2.ellipse(face, (eye_x, eye_y), (int(size * 0.07), int(size * 0.035)), 0, 0, 360, (255, 255, 255, 255), -1, cv2.LINE_AA)
+        cv2.circle(face, (eye_x, eye_y), int(size * 0.025), (40, 30, 20, 255), -1, cv2.LINE_AA)
+        cv2.line(face, (eye_x - int(size * 0.08), eye_y - int(size * 0.08)),
+                 (eye_x + int(size * 0.08), eye_y - int(size * 0.09)), (30, 30, 30, 255), max(1, size // 40), cv2.LINE_AA)
+
+    nose = np.array([[size // 2, int(size * 0.47)], [int(size * 0.46), int(size * 0.6)], [int(size * 0.54), int(size * 0.6)]])
+    cv2.polylines(face, [nose], False, (80, 80, 120, 255), max(1, size // 60), cv2.LINE_AA)
+    cv2.ellipse(face, (size // 2, int(size * 0.7)), (int(size * 0.12), int(size * 0.05)), 0, 0, 180, (60, 60, 160, 255), max(1, size // 40), cv2.LINE_AA)
+    return face
+
+
+def _face_sprite(face_image: str, size: int, rng: np.random.Generator) -> np.ndarray:
+    if not face_image:
+        return _procedural_face(size, rng)
+    image = cv2.imread(face_image)
+    if image is None:
+        raise IOError(f"Could not read face image {face_image}")
+    height, width = image.shape[:2]
+    side = min(height, width)
+    top, left = (height - side) // 2, (width - side) // 2
+    sprite = cv2.resize(image[top:top + side, left:left + side], (size, size), interpolation=cv2.INTER_AREA)
+    return np.dstack([sprite, np.full((size, size), 255, dtype=np.uint8)])
+
+
+def generate_synthetic_video(path: str, num_faces: int = 4, seconds: float = 10, fps: int = 30,
+                             width: int = 1280, height: int = 720, face_size: int = 180,
+                             seed: int = 0, face_image: str = None) -> dict:
+    """
+    Write a deterministic clip with num_faces faces moving on Lissajous paths
+
+    The same arguments always produce the same frames.
+
+    Returns:
+        Dict describing the clip (path, frames, fps, size, faces, seed)
+    """
+    rng = np.random.default_rng(seed)
+    background = np.full((height, width, 3), 60, dtype=np.uint8)
+    background += rng.integers(0, 20, size=(height, width, 1), dtype=np.uint8)
+
+    sprites = [_face_sprite(face_image, face_size, rng) for _ in range(num_faces)]
+    phases = rng.uniform(0, 2 * np.pi, size=(num_faces, 2))
+    speeds = rng.uniform(0.1, 0.4, size=(num_faces, 2))
+    span = np.array([width - face_size, height - face_size], dtype=np.float64)
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    total_frames = int(seconds * fps)
+    for index in range(total_frames):
+        frame = background.copy()
+        t = index / fps
+        positions = (0.5 + 0.5 * np.sin(2 * np.pi * speeds * t + phases)) * span
+        for sprite, (x, y) in zip(sprites, positions.astype(np.int64)):
+            alpha = sprite[:, :, 3:4].astype(np.float32) / 255.0
+            region = frame[y:y + face_size, x:x + face_size]
+            region[:] = (alpha * sprite[:, :, :3] + (1 - alpha) * region).astype(np.uint8)
+        writer.write(frame)
+    writer.release()
+
+    return {
+        'path': path,
+        'synthetic': True,
+        'frames': total_frames,
+        'fps': fps,
+        'size': [width, height],
+        'faces': num_faces,
+        'seed': seed,
+        'face_image': face_image
+    }
+
+
+def describe_video(path: str) -> dict:
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video source {path}")
+    info = {
+        'path': path,
+        'synthetic': False,
+        'frames': int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+        'fps': cap.get(cv2.CAP_PROP_FPS),
+        'size': [int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))]
+    }
+    cap.release()
+    return info
+
+
+# ---------------------------------------------------------------------------
+# Measurements
+# ---------------------------------------------------------------------------
+
+def peak_rss_mb() -> dict:
+    """Peak resident set size of this process and of its (finished) children"""
+    try:
+        import resource
+    except ImportError:  # Not available on Windows
+        return {'self': None, 'children': None}
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    unit = 1 if sys.platform == 'darwin' else 1024
+    return {
+        'self': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit / 1e6,
+        'children': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit / 1e6
+    }
+
+
+def output_size(path: str) -> int:
+    """Size in bytes of a result file or columnar result directory"""
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def run_mode(config: dict) -> dict:
+    """Benchmark one mode (runs in a fresh process)"""
+    from simplified_analyzer import SimplifiedAnalyzer
+
+    mode = config['mode']
+    options = config['options']
+    stages = {}
+    setup_start = time.perf_counter()
+
+    if mode == 'parallel':
+        from parallel_analysis import analyze_video_parallel
+
+        setup_seconds = 0.0
+        run_start = time.perf_counter()
+        written = analyze_video_parallel(
+            config['video'],
+            output_file=config['output'],
+            num_workers=config['workers'],
+            segment_seconds=config['segment_seconds'],
+            stride=options['stride'],
+            batch_emotions=options['batch_emotions'],
+            emotion_refresh=options['emotion_refresh'],
+            detection_scale=options['detection_scale'],
+            emotion_options=options['emotion_options']
+        )
+        run_seconds = time.perf_counter() - run_start
+        analyzed_frames = written['frames'] if written else 0
+        last_frame = written['last_frame_count'] + 1 if analyzed_frames else 0
+    else:
+        analyzer = SimplifiedAnalyzer(
+            video_source=config['video'],
+            output_file=config['output'],
+            batch_emotions=options['batch_emotions'],
+            emotion_refresh=options['emotion_refresh'],
+            detection_scale=options['detection_scale'],
+            instrument=True,
+            **options['emotion_options']
+        )
+        setup_seconds = time.perf_counter() - setup_start
+
+        run_start = time.perf_counter()
+        analyzer.run_analysis(
+            headless=True,
+            progress_callback=lambda progress: None,
+            stride=options['stride'],
+            pipelined=mode == 'pipelined',
+            queue_size=config['queue_size']
+        )
+        run_seconds = time.perf_counter() - run_start
+        analyzer.release_models()
+        stages = analyzer.instrumentation.summary()['stages']
+        analyzed_frames = stages.get('output', {}).get('count', 0)
+        last_frame = analyzer.frame_count + 1 if analyzed_frames else 0
+
+    return {
+        'mode': mode,
+        'options': options,
+        'analyzed_frames': analyzed_frames,
+        'source_frames': last_frame,
+        'setup_seconds': setup_seconds,
+        'run_seconds': run_seconds,
+        'fps': analyzed_frames / run_seconds if run_seconds > 0 else 0.0,
+        'realtime_factor': (last_frame / config['video_fps']) / run_seconds if run_seconds > 0 and config['video_fps'] else None,
+        'stages': {stage: {key: value for key, value in summary.items() if key != 'buckets'}
+                   for stage, summary in stages.items()},
+        'peak_rss_mb': peak_rss_mb(),
+        'output_bytes': output_size(config['output'])
+    }
+
+
+# ---------------------------------------------------------------------------
+# Suite
+# ---------------------------------------------------------------------------
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(video: dict, modes: list, options: dict, workers: int = 2, segment_seconds: float = 60,
+              queue_size: int = 8, output_format: str = 'jsonl', keep_outputs: str = None) -> dict:
+    """Run every mode in its own process and collect the report"""
+    output_dir = keep_outputs or tempfile.mkdtemp(prefix='analyzer-bench-')
+    os.makedirs(output_dir, exist_ok=True)
+    extension = {'json': '.json', 'jsonl': '.jsonl', 'columnar': '.cols'}[output_format]
+
+    results = []
+    context = multiprocessing.get_context('spawn')
+    try:
+        for mode in modes:
+            config = {
+                'mode': mode,
+                'video': video['path'],
+                'video_fps': video['fps'],
+                'output': os.path.join(output_dir, f"{mode}{extension}"),
+                'options': options,
+                'workers': workers,
+                'segment_seconds': segment_seconds,
+                'queue_size': queue_size
+            }
+            print(f"Benchmarking {mode} mode...")
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                result = pool.submit(run_mode, config).result()
+            results.append(result)
+            print(f"  {result['fps']:.1f} fps, peak RSS {result['peak_rss_mb']['self'] or 0:.0f} MB, "
+                  f"output {result['output_bytes'] / 1e3:.1f} kB")
+    finally:
+        if not keep_outputs:
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+    return {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'opencv': cv2.__version__,
+            'git_commit': _git_commit()
+        },
+        'video': video,
+        'output_format': output_format,
+        'results': results
+    }
+
+
+def compare_reports(baseline: dict, report: dict, max_regression: float = 0.1) -> list:
+    """Modes whose fps dropped by more than max_regression (fraction) against the baseline"""
+    previous = {result['mode']: result for result in baseline.get('results', [])}
+    regressions = []
+    for result in report['results']:
+        before = previous.get(result['mode'])
+        if not before or not before['fps']:
+            continue
+        change = result['fps'] / before['fps'] - 1
+        print(f"{result['mode']}: {before['fps']:.1f} -> {result['fps']:.1f} fps ({change * 100:+.1f}%)")
+        if change < -max_regression:
+            regressions.append({'mode': result['mode'], 'baseline_fps': before['fps'],
+                                'fps': result['fps'], 'change': change})
+    return regressions
+
+
+def print_report(report: dict):
+    print(f"\n{'mode':<11} {'frames':>7} {'fps':>7} {'x rt':>6} {'rss MB':>7} {'out kB':>8}  stage p50/p90/p99 ms")
+    for result in report['results']:
+        stages = '  '.join(
+            f"{stage} {s['p50_ms']:.1f}/{s['p90_ms']:.1f}/{s['p99_ms']:.1f}"
+            for stage, s in result['stages'].items() if s['count']
+        )
+        rss = result['peak_rss_mb']['self'] or 0
+        realtime = result['realtime_factor']
+        print(f"{result['mode']:<11} {result['analyzed_frames']:>7} {result['fps']:>7.1f} "
+              f"{'-' if realtime is None else f'{realtime:.2f}':>6} {rss:>7.0f} "
+              f"{result['output_bytes'] / 1e3:>8.1f}  {stages}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark SimplifiedAnalyzer throughput, latency and memory')
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--video', type=str, help='Local sample clip (default: a synthetic clip)')
+    source.add_argument('--faces', type=int, default=4, help='Number of faces in the synthetic clip')
+    parser.add_argument('--seconds', type=float, default=10, help='Length of the synthetic clip')
+    parser.add_argument('--resolution', type=str, default='1280x720', help='Synthetic clip size WxH')
+    parser.add_argument('--seed', type=int, default=0, help='Synthetic clip seed')
+    parser.add_argument('--face-image', type=str, help='Portrait used for the synthetic faces')
+    parser.add_argument('--modes', type=str, default=','.join(MODES), help='Comma-separated modes to run')
+    parser.add_argument('--stride', type=int, default=1, help='Analyze every N-th frame')
+    parser.add_argument('--detection-scale', type=float, default=1.0, help='Face Mesh input scale')
+    parser.add_argument('--emotion-refresh', type=str, default='adaptive', choices=['adaptive', 'fixed'])
+    parser.add_argument('--emotion-backend', type=str, default='deepface', choices=EMOTION_BACKENDS)
+    parser.add_argument('--onnx-model', type=str, help='ONNX emotion model for the onnx backend')
+    parser.add_argument('--onnx-threads', type=int, help='ONNX Runtime intra-op threads')
+    parser.add_argument('--per-face-emotions', action='store_true', help='Benchmark the DeepFace.analyze per-face path')
+    parser.add_argument('--workers', type=int, default=2, help='Worker processes of the parallel mode')
+    parser.add_argument('--segment-seconds', type=float, default=60, help='Segment length of the parallel mode')
+    parser.add_argument('--queue-size', type=int, default=8, help='Queue capacity of the pipelined mode')
+    parser.add_argument('--output-format', type=str, default='jsonl', choices=['json', 'jsonl', 'columnar'])
+    parser.add_argument('--keep-outputs', type=str, help='Keep the result files in this directory')
+    parser.add_argument('--json', type=str, default='benchmark_results.json', help='Machine-readable report file')
+    parser.add_argument('--baseline', type=str, help='Earlier report to compare against')
+    parser.add_argument('--max-regression', type=float, default=0.1, help='Allowed fps drop against the baseline (fraction)')
+    args = parser.parse_args()
+
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"Unknown mode(s): {', '.join(sorted(unknown))}")
+
+    workdir = tempfile.mkdtemp(prefix='analyzer-bench-video-')
+    try:
+        if args.video:
+            video = describe_video(args.video)
+        else:
+            width, height = (int(v) for v in args.resolution.lower().split('x'))
+            video = generate_synthetic_video(os.path.join(workdir, 'synthetic.mp4'), args.faces, args.seconds,
+                                             width=width, height=height, seed=args.seed, face_image=args.face_image)
+            print(f"Generated synthetic clip: {video['frames']} frames, {args.faces} face(s), {width}x{height}")
+
+        options = {
+            'stride': args.stride,
+            'detection_scale': args.detection_scale,
+            'emotion_refresh': args.emotion_refresh,
+            'batch_emotions': not args.per_face_emotions,
+            'emotion_options': {
+                'emotion_backend': args.emotion_backend,
+                'onnx_model': args.onnx_model,
+                'onnx_threads': args.onnx_threads
+            }
+        }
+        report = run_suite(video, modes, options, args.workers, args.segment_seconds,
+                           args.queue_size, args.output_format, args.keep_outputs)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(report)
+    with open(args.json, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport saved to {args.json}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_reports(baseline, report, args.max_regression)
+        if regressions:
+            print(f"Throughput regression in: {', '.join(r['mode'] for r in regressions)}")
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Throughput vs. accuracy of Face Mesh at reduced detection scales
+
+Decodes a sample of frames once, then runs the landmark stage (resize, RGB
+conversion, Face Mesh, engagement features) at every requested scale. The
+full-resolution run is the reference: for each scale the report gives the
+landmark-stage frame rate and how far its results are from the reference
+(faces found, landmark error relative to face size, bbox IoU and the
+differences in the engagement metrics).
+"""
+
+import argparse
+import json
+import time
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+import landmark_features
+from detection_frames import FACE_MESH_OPTIONS, DetectionFrameConverter, scaled_size
+from face_tracker import _assign, bbox_centers, pairwise_iou
+
+
+def read_sample_frames(video_path: str, max_frames: int = 300, stride: int = 1) -> list:
+    """Decode up to max_frames frames (every stride-th) into memory"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video source {video_path}")
+
+    frames = []
+    index = 0
+    while len(frames) < max_frames:
+        if index % stride:
+            if not cap.grab():
+                break
+        else:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        index += 1
+    cap.release()
+    return frames
+
+
+def run_scale(frames: list, scale: float) -> dict:
+    """Run the landmark stage on all frames at one detection scale"""
+    convert = DetectionFrameConverter(scale)
+    outputs = []
+
+    with mp.solutions.face_mesh.FaceMesh(**FACE_MESH_OPTIONS) as face_mesh:
+        start = time.perf_counter()
+        for frame in frames:
+            results = face_mesh.process(convert(frame))
+            if not results.multi_face_landmarks:
+                outputs.append(None)
+                continue
+            points = landmark_features.stack_faces(results.multi_face_landmarks)
+            features = landmark_features.compute_face_features(points, frame.shape[1], frame.shape[0])
+            outputs.append((points, features))
+        elapsed = time.perf_counter() - start
+
+    return {
+        'scale': scale,
+        'seconds': elapsed,
+        'fps': len(frames) / elapsed if elapsed > 0 else 0.0,
+        'outputs': outputs
+    }
+
+
+def compare_to_reference(reference: list, candidate: list, width: int, height: int) -> dict:
+    """Accuracy of one scale's landmark outputs against the full-resolution run"""
+    reference_faces = 0
+    matched_faces = 0
+    extra_faces = 0
+    landmark_errors, ious, ear_errors, tilt_errors, gaze_agreement = [], [], [], [], []
+    pixels = np.array([width, height], dtype=np.float64)
+
+    for ref, cand in zip(reference, candidate):
+        ref_count = 0 if ref is None else len(ref[0])
+        cand_count = 0 if cand is None else len(cand[0])
+        reference_faces += ref_count
+        if not ref_count or not cand_count:
+            extra_faces += cand_count
+            continue
+
+        ref_points, ref_features = ref
+        cand_points, cand_features = cand
+        ref_boxes = ref_features['bbox'].astype(np.float64)
+        cand_boxes = cand_features['bbox'].astype(np.float64)
+
+        # Pair faces by bbox centre distance, gated at half the reference face width
+        distance = np.linalg.norm(bbox_centers(ref_boxes)[:, None, :] - bbox_centers(cand_boxes)[None, :, :], axis=-1)
+        gate = np.maximum(ref_boxes[:, 2:3], 1.0) / 2
+        cost = np.where(distance < gate, distance, 1e6)
+        pairs = _assign(cost)
+        iou = pairwise_iou(ref_boxes, cand_boxes)
+
+        matched_faces += len(pairs)
+        extra_faces += cand_count - len(pairs)
+        for r, c in pairs:
+            face_size = max(np.hypot(ref_boxes[r, 2], ref_boxes[r, 3]), 1.0)
+            error = np.linalg.norm((ref_points[r] - cand_points[c]) * pixels, axis=-1)
+            landmark_errors.append(float(np.mean(error)) / face_size)
+            ious.append(float(iou[r, c]))
+            ear_errors.append(abs(float(ref_features['eye_aspect_ratio'][r] - cand_features['eye_aspect_ratio'][c])))
+            tilt_errors.append(abs(float(ref_features['head_tilt'][r] - cand_features['head_tilt'][c])))
+            gaze_agreement.append(bool(ref_features['gaze_off_screen'][r]) == bool(cand_features['gaze_off_screen'][c]))
+
+    def mean(values):
+        return float(np.mean(values)) if values else None
+
+    return {
+        'reference_faces': reference_faces,
+        'recall': matched_faces / reference_faces if reference_faces else None,
+        'extra_faces': extra_faces,
+        'landmark_error': mean(landmark_errors),
+        'bbox_iou': mean(ious),
+        'ear_error': mean(ear_errors),
+        'head_tilt_error': mean(tilt_errors),
+        'gaze_agreement': mean(gaze_agreement)
+    }
+
+
+def benchmark(video_path: str, scales: list, max_frames: int = 300, stride: int = 1) -> list:
+    """Benchmark every scale against the full-resolution reference"""
+    frames = read_sample_frames(video_path, max_frames, stride)
+    if not frames:
+        raise ValueError(f"No frames decoded from {video_path}")
+    height, width = frames[0].shape[:2]
+    print(f"Benchmarking {len(frames)} frames of {width}x{height} from {video_path}")
+
+    reference = run_scale(frames, 1.0)
+    report = []
+    for scale in scales:
+        run = reference if scale == 1.0 else run_scale(frames, scale)
+        report.append({
+            'scale': scale,
+            'detection_size': list(scaled_size(width, height, scale)),
+            'frames': len(frames),
+            'fps': run['fps'],
+            'ms_per_frame': 1000 * run['seconds'] / len(frames),
+            'speedup': run['fps'] / reference['fps'] if reference['fps'] else None,
+            **compare_to_reference(reference['outputs'], run['outputs'], width, height)
+        })
+    return report
+
+
+def print_report(report: list):
+    def fmt(value, pattern):
+        return '-' if value is None else pattern.format(value)
+
+    print(f"{'scale':>6} {'size':>11} {'fps':>8} {'ms/frame':>9} {'speedup':>8} {'recall':>7} "
+          f"{'lm err':>7} {'iou':>6} {'ear err':>8} {'tilt err':>9} {'gaze':>6}")
+    for row in report:
+        size = f"{row['detection_size'][0]}x{row['detection_size'][1]}"
+        print(f"{row['scale']:>6.2f} {size:>11} {row['fps']:>8.1f} {row['ms_per_frame']:>9.2f} "
+              f"{fmt(row['speedup'], '{:.2f}x'):>8} {fmt(row['recall'], '{:.1%}'):>7} "
+              f"{fmt(row['landmark_error'], '{:.3f}'):>7} {fmt(row['bbox_iou'], '{:.3f}'):>6} "
+              f"{fmt(row['ear_error'], '{:.4f}'):>8} {fmt(row['head_tilt_error'], '{:.4f}'):>9} "
+              f"{fmt(row['gaze_agreement'], '{:.1%}'):>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Face Mesh throughput and accuracy at reduced detection scales')
+    parser.add_argument('video', help='Sample video (e.g. a 1080p gallery-view recording)')
+    parser.add_argument('--scales', type=str, default='1.0,0.5,0.33', help='Comma-separated detection scales')
+    parser.add_argument('--max-frames', type=int, default=300, help='Number of frames to benchmark')
+    parser.add_argument('--stride', type=int, default=1, help='Use every N-th frame of the video')
+    parser.add_argument('--json', type=str, help='Also write the report to this JSON file')
+    args = parser.parse_args()
+
+    scales = [float(s) for s in args.scales.split(',') if s.strip()]
+    report = benchmark(args.video, scales, args.max_frames, args.stride)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Checkpoints of a sequential analysis run
+
+A checkpoint holds the analyzer's state at a frame position: the next frame
+index, the analysis clock, the tracker's tracks and id counter, the emotion
+cache, and the partial output (the JSON records so far, the byte length of
+a JSONL file, or the row counts of the columnar files). All of it is
+restored exactly.
+
+Checkpoints are JSON. Values JSON has no type for (numpy arrays and
+scalars, deques, tuples, dicts with non-string keys) are written as tagged
+objects and rebuilt with their original types, so floats and dtypes survive
+the round trip. Loading a checkpoint never executes code, so a checkpoint
+file is no more trusted than a results file. It is written to a temporary
+file and moved over the previous one with os.replace, so a crash while
+writing leaves the last complete checkpoint in place.
+
+Face Mesh keeps internal tracking state (the face regions of the previous
+frame) that cannot be saved. On resume the last REPLAY_FRAMES analyzed
+frames are replayed through Face Mesh only, which re-primes that tracking;
+its landmarks on the first frames after the checkpoint can still differ
+slightly from those of an uninterrupted run, and so can the records built
+from them. Everything downstream of the landmarks continues exactly.
+"""
+
+import json
+import os
+from collections import OrderedDict, deque
+
+import numpy as np
+
+CHECKPOINT_VERSION = 2
+
+# Analyzed frames between checkpoints when --resume is used without an interval
+DEFAULT_CHECKPOINT_INTERVAL = 1000
+
+# Analyzed frames replayed through Face Mesh before resuming
+REPLAY_FRAMES = 3
+
+
+def checkpoint_path(output_file: str) -> str:
+    """Default checkpoint file of an output file (``<output>.ckpt``)"""
+    return output_file.rstrip('/\\') + '.ckpt'
+
+
+def encode_state(value):
+    """Convert a state value to JSON types, tagging the ones JSON cannot represent"""
+    if isinstance(value, np.ndarray):
+        return {'__ndarray__': value.tolist(), 'dtype': value.dtype.str, 'shape': list(value.shape)}
+    if isinstance(value, np.generic):
+        return {'__npscalar__': value.item(), 'dtype': value.dtype.str}
+    if isinstance(value, deque):
+        return {'__deque__': [encode_state(v) for v in value], 'maxlen': value.maxlen}
+    if isinstance(value, tuple):
+        return {'__tuple__': [encode_state(v) for v in value]}
+    if isinstance(value, dict):
+        if all(isinstance(key, str) for key in value) and not isinstance(value, OrderedDict):
+            return {key: encode_state(v) for key, v in value.items()}
+        return {'__items__': [[encode_state(key), encode_state(v)] for key, v in value.items()],
+                'ordered': isinstance(value, OrderedDict)}
+    if isinstance(value, list):
+        return [encode_state(v) for v in value]
+    return value
+
+
+def decode_state(value):
+    """Rebuild the values tagged by encode_state"""
+    if isinstance(value, list):
+        return [decode_state(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+    if '__ndarray__' in value:
+        return np.array(value['__ndarray__'], dtype=np.dtype(value['dtype'])).reshape(value['shape'])
+    if '__npscalar__' in value:
+        return np.dtype(value['dtype']).type(value['__npscalar__'])
+    if '__deque__' in value:
+        return deque((decode_state(v) for v in value['__deque__']), maxlen=value['maxlen'])
+    if '__tuple__' in value:
+        return tuple(decode_state(v) for v in value['__tuple__'])
+    if '__items__' in value:
+        items = ((decode_state(key), decode_state(v)) for key, v in value['__items__'])
+        return OrderedDict(items) if value['ordered'] else dict(items)
+    return {key: decode_state(v) for key, v in value.items()}
+
+
+def save_checkpoint(path: str, state: dict):
+    """Atomically write a checkpoint"""
+    state = dict(state, version=CHECKPOINT_VERSION)
+    temporary = path + '.tmp'
+    with open(temporary, 'w') as f:
+        json.dump(encode_state(state), f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+def load_checkpoint(path: str) -> dict:
+    """Read a checkpoint, or None if there is none"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            state = decode_state(json.load(f))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:  # e.g. a pickled version 1 checkpoint
+        raise ValueError(f"{path} is not a version {CHECKPOINT_VERSION} checkpoint") from e
+    if not isinstance(state, dict) or state.get('version') != CHECKPOINT_VERSION:
+        raise ValueError(f"{path} is not a version {CHECKPOINT_VERSION} checkpoint")
+    return state
+
+
+def remove_checkpoint(path: str):
+    """Delete a checkpoint once the run it belongs to has finished"""
+    if os.path.exists(path):
+        os.remove(path)
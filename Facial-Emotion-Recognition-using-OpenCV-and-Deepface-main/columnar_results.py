@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Compact columnar on-disk format for analyzer results
+
+A result set is a directory (conventionally ending in ``.cols``) holding one
+``.npy`` file per field plus a ``meta.json`` describing the schema. Columns
+are typed arrays, so they can be memory-mapped with ``np.load(mmap_mode='r')``
+and aggregated without parsing any JSON.
+
+The writer appends rows to the column files in chunks while the analysis
+runs, and keeps the row count in each file's header up to date, so memory
+stays flat and the rows written so far are readable before close().
+meta.json has 'complete': false until the writer is closed.
+
+Frame-level columns (one row per analyzed frame):
+    frames.frame_count, frames.timestamp, frames.total_faces,
+    frames.engaged_count, frames.disengaged_count, frames.confused_count
+
+Face-level columns (one row per face per frame, ordered by frame):
+    faces.frame, faces.timestamp, faces.face_id, faces.bbox (N, 4),
+    faces.emotions (N, 7, EMOTION_LABELS order), faces.dominant_emotion,
+    faces.confusion_score, faces.disengagement_score, faces.engagement_score,
+    faces.state (STATE_LABELS index), faces.state_confidence,
+    faces.eye_aspect_ratio, faces.gaze_off_screen, faces.head_tilt,
+    faces.blink_rate
+"""
+
+import json
+import os
+import struct
+
+import numpy as np
+
+from emotion_model import EMOTION_LABELS
+from result_io import iter_results
+
+FORMAT_NAME = 'engagement-columnar'
+FORMAT_VERSION = 1
+
+STATE_LABELS = ['engaged', 'disengaged', 'confused']
+
+FRAME_COLUMNS = {
+    'frame_count': np.int64,
+    'timestamp': np.float64,
+    'total_faces': np.int32,
+    'engaged_count': np.int32,
+    'disengaged_count': np.int32,
+    'confused_count': np.int32
+}
+
+FACE_COLUMNS = {
+    'frame': np.int64,
+    'timestamp': np.float64,
+    'face_id': np.int32,
+    'bbox': np.int32,
+    'emotions': np.float32,
+    'dominant_emotion': np.int8,
+    'confusion_score': np.float32,
+    'disengagement_score': np.float32,
+    'engagement_score': np.float32,
+    'state': np.int8,
+    'state_confidence': np.float32,
+    'eye_aspect_ratio': np.float32,
+    'gaze_off_screen': np.bool_,
+    'head_tilt': np.float32,
+    'blink_rate': np.float32
+}
+
+_SUMMARY_KEYS = ['total_faces', 'engaged_count', 'disengaged_count', 'confused_count']
+
+
+def is_columnar(path: str) -> bool:
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, 'meta.json'))
+
+
+# Every column file starts with a header of this fixed size, so the row count
+# in its shape can be rewritten in place as rows are appended
+_HEADER_SIZE = 128
+
+# Trailing dimensions of the 2-D face columns
+_ROW_SHAPES = {'bbox': (4,), 'emotions': (len(EMOTION_LABELS),)}
+
+
+def _npy_header(dtype, rows: int, row_shape: tuple = ()) -> bytes:
+    """Version 1.0 .npy header of a C-order array, padded to _HEADER_SIZE bytes"""
+    header = repr({
+        'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)),
+        'fortran_order': False,
+        'shape': (rows,) + tuple(row_shape)
+    }).encode('latin1')
+    prefix = np.lib.format.magic(1, 0)
+    header_len = _HEADER_SIZE - len(prefix) - 2
+    if len(header) + 1 > header_len:
+        raise ValueError(f"Column header does not fit in {_HEADER_SIZE} bytes")
+    return prefix + struct.pack('<H', header_len) + header + b' ' * (header_len - len(header) - 1) + b'\n'
+
+
+class _ColumnFile:
+    """An appendable .npy file: raw rows after a fixed-size header"""
+
+    def __init__(self, path: str, dtype, row_shape: tuple = (), rows: int = None):
+        """
+        Args:
+            path: .npy file
+            dtype: Column dtype
+            row_shape: Shape of one row (() for scalars)
+            rows: Reopen an existing file keeping its first rows rows
+                (the rest is truncated); None creates a new file
+        """
+        self.dtype = np.dtype(dtype)
+        self.row_shape = tuple(row_shape)
+        self.row_bytes = self.dtype.itemsize * int(np.prod(self.row_shape, dtype=np.int64))
+        if rows is None:
+            self.rows = 0
+            self._file = open(path, 'w+b')
+            self._file.write(_npy_header(self.dtype, 0, self.row_shape))
+        else:
+            self.rows = rows
+            self._file = open(path, 'r+b')
+            self._file.truncate(_HEADER_SIZE + rows * self.row_bytes)
+            self._file.seek(0, os.SEEK_END)
+
+    def append(self, values: list):
+        array = np.asarray(values, dtype=self.dtype)
+        if array.size == 0:
+            array = array.reshape((0,) + self.row_shape)
+        self._file.write(np.ascontiguousarray(array).tobytes())
+        self.rows += len(array)
+
+    def sync_header(self):
+        """Rewrite the row count and flush, so the file is a complete .npy"""
+        self._file.seek(0)
+        self._file.write(_npy_header(self.dtype, self.rows, self.row_shape))
+        self._file.seek(0, os.SEEK_END)
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self.sync_header()
+            self._file.close()
+
+
+class ColumnarResultWriter:
+    """
+    Write frame records as typed columns, appending to the .npy files as it goes
+
+    Rows are buffered in small Python lists and appended to their column
+    files every chunk_size rows, so memory use does not grow with the
+    length of the recording. flush() (and every chunk) leaves each column a
+    valid .npy file holding the rows written so far, and refreshes
+    meta.json, so an interrupted run still leaves a readable result set.
+    """
+
+    def __init__(self, path: str, chunk_size: int = 4096, resume_state: dict = None):
+        """
+        Args:
+            path: Output directory
+            chunk_size: Rows buffered in memory before they are appended to disk
+            resume_state: checkpoint_state() of an earlier writer of path;
+                the columns are truncated to it and appended to (resume)
+        """
+        self.path = path
+        self.chunk_size = chunk_size
+        self.records_written = resume_state['records_written'] if resume_state else 0
+        self._frame_rows = {name: [] for name in FRAME_COLUMNS}
+        self._face_rows = {name: [] for name in FACE_COLUMNS}
+        os.makedirs(path, exist_ok=True)
+        self._frame_files = {
+            name: _ColumnFile(os.path.join(path, f"frames.{name}.npy"), dtype,
+                              rows=resume_state['frame_rows'] if resume_state else None)
+            for name, dtype in FRAME_COLUMNS.items()
+        }
+        self._face_files = {
+            name: _ColumnFile(os.path.join(path, f"faces.{name}.npy"), dtype, _ROW_SHAPES.get(name, ()),
+                              rows=resume_state['face_rows'] if resume_state else None)
+            for name, dtype in FACE_COLUMNS.items()
+        }
+        self._closed = False
+        self._write_meta(complete=False)
+
+    def write(self, record: dict):
+        summary = record.get('summary', {})
+        frame_count = record.get('frame_count', self.records_written)
+        timestamp = record.get('timestamp', 0.0)
+
+        self._frame_rows['frame_count'].append(frame_count)
+        self._frame_rows['timestamp'].append(timestamp)
+        for key in _SUMMARY_KEYS:
+            self._frame_rows[key].append(summary.get(key, 0))
+
+        rows = self._face_rows
+        for face in record.get('faces', []):
+            emotions = face.get('emotions', {})
+            metrics = face.get('engagement_metrics', {})
+            rows['frame'].append(frame_count)
+            rows['timestamp'].append(timestamp)
+            rows['face_id'].append(face['face_id'])
+            rows['bbox'].append(face.get('bbox', [0, 0, 0, 0]))
+            rows['emotions'].append([emotions.get(label, 0.0) for label in EMOTION_LABELS])
+            rows['dominant_emotion'].append(EMOTION_LABELS.index(face.get('dominant_emotion', 'neutral')))
+            rows['confusion_score'].append(face.get('confusion_score', 0.0))
+            rows['disengagement_score'].append(face.get('disengagement_score', 0.0))
+            rows['engagement_score'].append(face.get('engagement_score', 0.0))
+            rows['state'].append(STATE_LABELS.index(face['dominant_state']))
+            rows['state_confidence'].append(face.get('state_confidence', 0.0))
+            rows['eye_aspect_ratio'].append(metrics.get('eye_aspect_ratio', 0.0))
+            rows['gaze_off_screen'].append(metrics.get('gaze_off_screen', False))
+            rows['head_tilt'].append(metrics.get('head_tilt', 0.0))
+            rows['blink_rate'].append(metrics.get('blink_rate', 0.0))
+
+        self.records_written += 1
+        if len(self._frame_rows['frame_count']) >= self.chunk_size or len(rows['frame']) >= self.chunk_size:
+            self.flush()
+
+    def _append_buffered(self):
+        """Append the buffered rows to the column files"""
+        for rows, files in ((self._frame_rows, self._frame_files), (self._face_rows, self._face_files)):
+            for name, column in files.items():
+                if rows[name]:
+                    column.append(rows[name])
+                    rows[name] = []
+
+    def flush(self):
+        """Write the buffered rows and make the files on disk a complete result set so far"""
+        self._append_buffered()
+        for column in list(self._frame_files.values()) + list(self._face_files.values()):
+            column.sync_header()
+        self._write_meta(complete=False)
+
+    def checkpoint_state(self) -> dict:
+        """Flush and return what a resumed writer needs (see resume_state)"""
+        self.flush()
+        return {
+            'records_written': self.records_written,
+            'frame_rows': self._frame_files['frame_count'].rows,
+            'face_rows': self._face_files['frame'].rows
+        }
+
+    def _write_meta(self, complete: bool, extra_meta: dict = None):
+        meta = {
+            'format': FORMAT_NAME,
+            'version': FORMAT_VERSION,
+            'complete': complete,  # False while the run is still writing
+            'emotion_labels': EMOTION_LABELS,
+            'state_labels': STATE_LABELS,
+            'num_frames': self._frame_files['frame_count'].rows,
+            'num_faces': self._face_files['frame'].rows,
+            'frame_columns': {name: np.dtype(dtype).name for name, dtype in FRAME_COLUMNS.items()},
+            'face_columns': {name: np.dtype(dtype).name for name, dtype in FACE_COLUMNS.items()}
+        }
+        if extra_meta:
+            meta.update(extra_meta)
+        temporary = os.path.join(self.path, 'meta.json.tmp')
+        with open(temporary, 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(temporary, os.path.join(self.path, 'meta.json'))
+
+    def close(self, extra_meta: dict = None):
+        if self._closed:
+            return
+        self._append_buffered()
+        for column in list(self._frame_files.values()) + list(self._face_files.values()):
+            column.close()
+        self._write_meta(complete=True, extra_meta=extra_meta)
+        self._closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_columnar(path: str, mmap: bool = True) -> dict:
+    """
+    Load a columnar result set
+
+    Returns:
+        Dict with 'meta', 'frames' and 'faces'; the latter two map column
+        names to (memory-mapped by default) arrays
+    """
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+
+    mmap_mode = 'r' if mmap else None
+    return {
+        'meta': meta,
+        'frames': {name: np.load(os.path.join(path, f"frames.{name}.npy"), mmap_mode=mmap_mode)
+                   for name in meta['frame_columns']},
+        'faces': {name: np.load(os.path.join(path, f"faces.{name}.npy"), mmap_mode=mmap_mode)
+                  for name in meta['face_columns']}
+    }
+
+
+def iter_columnar_records(path: str):
+    """Rebuild per-frame records (regular JSON schema) from a columnar result set"""
+    data = load_columnar(path)
+    frames, faces = data['frames'], data['faces']
+    emotion_labels = data['meta']['emotion_labels']
+    state_labels = data['meta']['state_labels']
+
+    face_frames = np.asarray(faces['frame'])
+    starts = np.searchsorted(face_frames, frames['frame_count'], side='left')
+    ends = np.searchsorted(face_frames, frames['frame_count'], side='right')
+
+    for i in range(len(frames['frame_count'])):
+        face_records = []
+        for row in range(starts[i], ends[i]):
+            face_records.append({
+                'face_id': int(faces['face_id'][row]),
+                'bbox': [int(v) for v in faces['bbox'][row]],
+                'emotions': {label: float(v) for label, v in zip(emotion_labels, faces['emotions'][row])},
+                'dominant_emotion': emotion_labels[int(faces['dominant_emotion'][row])],
+                'confusion_score': float(faces['confusion_score'][row]),
+                'disengagement_score': float(faces['disengagement_score'][row]),
+                'engagement_score': float(faces['engagement_score'][row]),
+                'dominant_state': state_labels[int(faces['state'][row])],
+                'state_confidence': float(faces['state_confidence'][row]),
+                'engagement_metrics': {
+                    'eye_aspect_ratio': float(faces['eye_aspect_ratio'][row]),
+                    'gaze_off_screen': bool(faces['gaze_off_screen'][row]),
+                    'head_tilt': float(faces['head_tilt'][row]),
+                    'blink_rate': float(faces['blink_rate'][row])
+                }
+            })
+        yield {
+            'timestamp': float(frames['timestamp'][i]),
+            'frame_count': int(frames['frame_count'][i]),
+            'faces': face_records,
+            'summary': {key: int(frames[key][i]) for key in _SUMMARY_KEYS}
+        }
+
+
+def summarize_columnar(path: str) -> dict:
+    """Per-face state counts and session span, computed on the arrays directly"""
+    data = load_columnar(path)
+    frames, faces = data['frames'], data['faces']
+    state_labels = data['meta']['state_labels']
+
+    num_frames = len(frames['timestamp'])
+    face_ids, inverse = np.unique(np.asarray(faces['face_id']), return_inverse=True)
+    counts = np.zeros((len(face_ids), len(state_labels)), dtype=np.int64)
+    np.add.at(counts, (inverse, np.asarray(faces['state'], dtype=np.int64)), 1)
+
+    state_counts = {
+        str(face_id): {label: int(counts[i, j]) for j, label in enumerate(state_labels) if counts[i, j]}
+        for i, face_id in enumerate(face_ids)
+    }
+    return {
+        'num_frames': num_frames,
+        'first_timestamp': float(frames['timestamp'][0]) if num_frames else None,
+        'last_timestamp': float(frames['timestamp'][-1]) if num_frames else None,
+        'state_counts': state_counts,
+        'frame_counts': {face_id: sum(c.values()) for face_id, c in state_counts.items()}
+    }
+
+
+def convert_json_to_columnar(source: str, destination: str) -> dict:
+    """Convert a JSON or JSONL result file into a columnar result set"""
+    with ColumnarResultWriter(destination) as writer:
+        for record in iter_results(source):
+            writer.write(record)
+    with open(os.path.join(destination, 'meta.json')) as f:
+        return json.load(f)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Convert analyzer JSON/JSONL results to the columnar format')
+    parser.add_argument('source', help='JSON or JSONL result file')
+    parser.add_argument('destination', help='Output directory (e.g. session.cols)')
+    args = parser.parse_args()
+
+    meta = convert_json_to_columnar(args.source, args.destination)
+    print(f"Converted {meta['num_frames']} frames / {meta['num_faces']} face rows to {args.destination}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Detection input for Face Mesh at a reduced resolution
+
+Face Mesh returns landmarks normalized to [0, 1], so landmarks found on a
+downscaled copy of the frame map straight back onto the full-resolution
+frame: bounding boxes and emotion ROIs are still cropped from the original
+pixels, only the landmark search runs on fewer of them. The resize and the
+BGR -> RGB conversion write into buffers that are allocated once and reused
+for every frame of the same size.
+"""
+
+import cv2
+import numpy as np
+
+# Face Mesh settings shared by the analyzer and the benchmarks
+FACE_MESH_OPTIONS = {
+    'static_image_mode': False,
+    'max_num_faces': 5,
+    'refine_landmarks': False,
+    'min_detection_confidence': 0.4,
+    'min_tracking_confidence': 0.4
+}
+
+# Gallery mode: one participant per tile
+TILE_FACE_MESH_OPTIONS = dict(FACE_MESH_OPTIONS, max_num_faces=1)
+
+
+def scaled_size(width: int, height: int, scale: float) -> tuple:
+    """(width, height) of a frame resized by scale, at least 1x1"""
+    return max(1, int(round(width * scale))), max(1, int(round(height * scale)))
+
+
+class DetectionFrameConverter:
+    """Turn BGR frames into (optionally downscaled) RGB frames for Face Mesh"""
+
+    def __init__(self, scale: float = 1.0):
+        """
+        Args:
+            scale: Detection resolution relative to the source frame, in (0, 1]
+        """
+        if not 0 < scale <= 1:
+            raise ValueError(f"Detection scale must be in (0, 1], got {scale}")
+        self.scale = scale
+        self._resized = None
+        self._rgb = None
+
+    @staticmethod
+    def _buffer(buffer: np.ndarray, shape: tuple, dtype) -> np.ndarray:
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            return np.empty(shape, dtype=dtype)
+        return buffer
+
+    def __call__(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Convert one frame
+
+        The returned array is reused by the next call, so it must be consumed
+        (e.g. by face_mesh.process) before converting another frame.
+        """
+        source = frame
+        if self.scale < 1.0:
+            width, height = scaled_size(frame.shape[1], frame.shape[0], self.scale)
+            self._resized = self._buffer(self._resized, (height, width) + frame.shape[2:], frame.dtype)
+            cv2.resize(frame, (width, height), dst=self._resized, interpolation=cv2.INTER_AREA)
+            source = self._resized
+
+        self._rgb = self._buffer(self._rgb, source.shape, source.dtype)
+        cv2.cvtColor(source, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        return self._rgb
@@ -0,0 +1,163 @@
+"""
+Per-track emotion cache with an adaptive refresh policy
+
+Instead of re-running emotion inference on every face every few frames, a
+track is refreshed only when something changed enough to matter:
+- the track has no cached result yet,
+- its landmarks moved by more than landmark_threshold (relative to face size),
+- its ROI content changed by more than roi_threshold (mean absolute
+  difference of a small grayscale thumbnail, in 0-255 units),
+- or the cached result is older than max_staleness analysis steps.
+
+The 'fixed' policy reproduces the original behaviour (refresh every
+interval-th step). Entries expire after ttl steps without use and the cache
+is bounded to max_entries (least recently used first).
+
+set_load_factor() stretches the refresh interval, the staleness limit and
+the change thresholds, so a real-time run under load refreshes less often.
+"""
+
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+THUMBNAIL_SIZE = 16
+
+
+def roi_thumbnail(face_roi: np.ndarray) -> np.ndarray:
+    """Small grayscale thumbnail used to detect ROI content changes"""
+    gray = cv2.cvtColor(face_roi, cv2.COLOR_BGR2GRAY) if face_roi.ndim == 3 else face_roi
+    return cv2.resize(gray, (THUMBNAIL_SIZE, THUMBNAIL_SIZE), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+
+def landmark_motion(previous: np.ndarray, current: np.ndarray) -> float:
+    """Mean landmark displacement relative to the face size"""
+    scale = float(np.max(np.ptp(previous, axis=0)))
+    if scale <= 0:
+        return float('inf')
+    return float(np.mean(np.linalg.norm(current - previous, axis=-1))) / scale
+
+
+class EmotionCache:
+    """Cache of the last emotion result per track, deciding when to refresh"""
+
+    def __init__(self, policy: str = 'adaptive', interval: int = 3, max_staleness: int = 30,
+                 landmark_threshold: float = 0.03, roi_threshold: float = 10.0,
+                 ttl: int = 90, max_entries: int = 256):
+        """
+        Args:
+            policy: 'adaptive' or 'fixed'
+            interval: Refresh period of the fixed policy (analysis steps)
+            max_staleness: Adaptive policy refreshes results older than this
+            landmark_threshold: Relative landmark motion that triggers a refresh
+            roi_threshold: Thumbnail mean absolute difference that triggers a refresh
+            ttl: Entries unused for this many steps are dropped
+            max_entries: Maximum number of cached tracks
+        """
+        if policy not in ('adaptive', 'fixed'):
+            raise ValueError(f"Unknown emotion refresh policy: {policy}")
+        self.policy = policy
+        self.interval = interval
+        self.max_staleness = max_staleness
+        self.landmark_threshold = landmark_threshold
+        self.roi_threshold = roi_threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.load_factor = 1.0
+        self._base = (interval, max_staleness, landmark_threshold, roi_threshold)
+        self.entries = OrderedDict()
+        self.stats = {
+            'inferences': 0,
+            'skipped': 0,
+            'evicted': 0,
+            'reasons': {'new': 0, 'interval': 0, 'stale': 0, 'motion': 0, 'content': 0}
+        }
+
+    def set_load_factor(self, factor: float):
+        """Scale the refresh interval, staleness limit and change thresholds by factor (>= 1)"""
+        interval, max_staleness, landmark_threshold, roi_threshold = self._base
+        self.load_factor = max(1.0, factor)
+        self.interval = max(1, int(round(interval * self.load_factor)))
+        self.max_staleness = max(1, int(round(max_staleness * self.load_factor)))
+        self.landmark_threshold = landmark_threshold * self.load_factor
+        self.roi_threshold = roi_threshold * self.load_factor
+
+    def __contains__(self, face_id) -> bool:
+        return face_id in self.entries
+
+    def needs_refresh(self, face_id: int, step: int, landmarks: np.ndarray = None,
+                      face_roi: np.ndarray = None) -> tuple:
+        """
+        Decide whether a face needs fresh emotion inference
+
+        Returns:
+            Tuple of (refresh, reason); reason is None when the cache is used
+        """
+        entry = self.entries.get(face_id)
+        if entry is None:
+            return True, 'new'
+
+        if self.policy == 'fixed':
+            return (True, 'interval') if step % self.interval == 0 else (False, None)
+
+        if step - entry['step'] >= self.max_staleness:
+            return True, 'stale'
+        if landmarks is not None and entry['landmarks'] is not None:
+            if landmark_motion(entry['landmarks'], landmarks) > self.landmark_threshold:
+                return True, 'motion'
+        if face_roi is not None and entry['thumbnail'] is not None:
+            if float(np.mean(np.abs(roi_thumbnail(face_roi) - entry['thumbnail']))) > self.roi_threshold:
+                return True, 'content'
+        return False, None
+
+    def get(self, face_id: int, step: int) -> dict:
+        """Cached result of a track (None if missing), marking it as used"""
+        entry = self.entries.get(face_id)
+        if entry is None:
+            return None
+        entry['last_used'] = step
+        self.entries.move_to_end(face_id)
+        self.stats['skipped'] += 1
+        return entry['result']
+
+    def put(self, face_id: int, step: int, result: dict, reason: str = None,
+            landmarks: np.ndarray = None, face_roi: np.ndarray = None):
+        """Store a fresh inference result for a track"""
+        adaptive = self.policy == 'adaptive'
+        self.entries[face_id] = {
+            'result': result,
+            'step': step,
+            'last_used': step,
+            'landmarks': landmarks.copy() if adaptive and landmarks is not None else None,
+            'thumbnail': roi_thumbnail(face_roi) if adaptive and face_roi is not None else None
+        }
+        self.entries.move_to_end(face_id)
+        self.stats['inferences'] += 1
+        if reason:
+            self.stats['reasons'][reason] += 1
+        self.expire(step)
+
+    def evict(self, face_ids):
+        """Drop the entries of the given tracks"""
+        for face_id in face_ids:
+            if self.entries.pop(face_id, None) is not None:
+                self.stats['evicted'] += 1
+
+    def expire(self, step: int):
+        """Drop entries past their TTL and enforce the size bound"""
+        expired = [face_id for face_id, entry in self.entries.items() if step - entry['last_used'] > self.ttl]
+        self.evict(expired)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.stats['evicted'] += 1
+
+    def summary(self) -> dict:
+        total = self.stats['inferences'] + self.stats['skipped']
+        return {
+            **self.stats,
+            'reasons': dict(self.stats['reasons']),
+            'load_factor': self.load_factor,
+            'cached_tracks': len(self.entries),
+            'skip_ratio': self.stats['skipped'] / total if total else 0.0
+        }
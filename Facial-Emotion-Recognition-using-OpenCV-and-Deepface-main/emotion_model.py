@@ -0,0 +1,188 @@
+"""
+Batched emotion inference for the simplified analyzer
+
+DeepFace.analyze handles one image per call, re-runs face detection on the
+crop and does its own preprocessing. The face ROIs handed to this module
+already come from MediaPipe, so detection is skipped: every ROI is
+preprocessed the way DeepFace prepares input for its emotion model and the
+whole batch goes through a single forward pass.
+
+Two backends run the same network: the DeepFace Keras model (TensorFlow) and
+an ONNX export of it on ONNX Runtime (optionally int8-quantized, see
+emotion_onnx), which needs neither TensorFlow nor DeepFace at runtime.
+"""
+
+import cv2
+import numpy as np
+
+# Output order of the DeepFace emotion model
+EMOTION_LABELS = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral']
+
+EMOTION_BACKENDS = ['deepface', 'onnx']
+
+# Optional packages of the onnx backend (requirements-onnx.txt)
+ONNX_REQUIREMENTS = "pip install -r requirements-onnx.txt"
+
+# Used when inference fails or no result has been cached yet
+DEFAULT_EMOTIONS = {'neutral': 1.0, 'happy': 0.0, 'sad': 0.0, 'angry': 0.0, 'fear': 0.0, 'disgust': 0.0, 'surprise': 0.0}
+DEFAULT_DOMINANT_EMOTION = 'neutral'
+
+
+def default_emotion_result() -> dict:
+    """Fresh copy of the fallback emotion result"""
+    return {
+        'emotions': dict(DEFAULT_EMOTIONS),
+        'dominant_emotion': DEFAULT_DOMINANT_EMOTION
+    }
+
+
+def load_deepface_emotion_model():
+    """Build DeepFace's emotion classifier and return the underlying Keras model"""
+    from deepface import DeepFace
+
+    try:
+        client = DeepFace.build_model(model_name="Emotion", task="facial_attribute")
+    except TypeError:
+        # Older DeepFace releases take only the model name
+        client = DeepFace.build_model("Emotion")
+    return getattr(client, 'model', client)
+
+
+class BatchEmotionModel:
+    """Run the DeepFace emotion classifier on many face ROIs at once"""
+
+    input_size = 48
+
+    def __init__(self, model=None, max_batch_size: int = 64):
+        """
+        Args:
+            model: Keras model to use (loaded from DeepFace on first use if None)
+            max_batch_size: Largest number of ROIs sent through one forward pass
+        """
+        self._model = model
+        self.max_batch_size = max_batch_size
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = load_deepface_emotion_model()
+        return self._model
+
+    def preprocess(self, face_roi: np.ndarray) -> np.ndarray:
+        """
+        Prepare one BGR face ROI like DeepFace does for its emotion model:
+        aspect-preserving resize with zero padding, grayscale, 48x48, [0, 1]
+        """
+        gray = cv2.cvtColor(face_roi, cv2.COLOR_BGR2GRAY) if face_roi.ndim == 3 else face_roi
+        height, width = gray.shape[:2]
+
+        factor = self.input_size / max(height, width)
+        resized_w = max(1, int(round(width * factor)))
+        resized_h = max(1, int(round(height * factor)))
+        resized = cv2.resize(gray, (resized_w, resized_h))
+
+        padded = np.zeros((self.input_size, self.input_size), dtype=np.float32)
+        top = (self.input_size - resized_h) // 2
+        left = (self.input_size - resized_w) // 2
+        padded[top:top + resized_h, left:left + resized_w] = resized
+        return padded / 255.0
+
+    def predict_probabilities(self, face_rois: list) -> np.ndarray:
+        """
+        Run the classifier on a list of ROIs
+
+        Returns:
+            Array of shape (N, 7) with softmax outputs in EMOTION_LABELS order
+        """
+        if not face_rois:
+            return np.empty((0, len(EMOTION_LABELS)), dtype=np.float32)
+
+        batch = np.stack([self.preprocess(roi) for roi in face_rois])[..., np.newaxis]
+        outputs = []
+        for start in range(0, len(batch), self.max_batch_size):
+            chunk = batch[start:start + self.max_batch_size]
+            outputs.append(np.asarray(self.model(chunk, training=False)))
+        return np.concatenate(outputs)
+
+    def predict(self, face_rois: list) -> list:
+        """
+        Analyze emotions of face ROIs from one frame or a window of frames
+
+        Args:
+            face_rois: List of BGR face crops
+
+        Returns:
+            List of dicts with 'emotions' (percentages, as returned by
+            DeepFace.analyze) and 'dominant_emotion', one per ROI
+        """
+        probabilities = self.predict_probabilities(face_rois)
+        totals = probabilities.sum(axis=1, keepdims=True)
+        percentages = 100 * probabilities / np.where(totals > 0, totals, 1)
+
+        results = []
+        for row in percentages:
+            emotions = {label: float(value) for label, value in zip(EMOTION_LABELS, row)}
+            results.append({
+                'emotions': emotions,
+                'dominant_emotion': EMOTION_LABELS[int(np.argmax(row))]
+            })
+        return results
+
+
+class OnnxEmotionModel(BatchEmotionModel):
+    """Run an ONNX export of the emotion classifier on ONNX Runtime (CPU)"""
+
+    def __init__(self, model_path: str, num_threads: int = None, max_batch_size: int = 64):
+        """
+        Args:
+            model_path: ONNX file written by emotion_onnx.export_onnx
+            num_threads: Intra-op threads of the session (default: ONNX Runtime's choice)
+            max_batch_size: Largest number of ROIs sent through one forward pass
+        """
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError(f"The onnx emotion backend needs onnxruntime ({ONNX_REQUIREMENTS})") from e
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.inter_op_num_threads = 1
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+
+        self.model_path = model_path
+        self.num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+        super().__init__(model=self.session, max_batch_size=max_batch_size)
+
+    def predict_probabilities(self, face_rois: list) -> np.ndarray:
+        if not face_rois:
+            return np.empty((0, len(EMOTION_LABELS)), dtype=np.float32)
+
+        batch = np.stack([self.preprocess(roi) for roi in face_rois])[..., np.newaxis].astype(np.float32)
+        outputs = []
+        for start in range(0, len(batch), self.max_batch_size):
+            chunk = batch[start:start + self.max_batch_size]
+            outputs.append(self.session.run(None, {self.input_name: chunk})[0])
+        return np.concatenate(outputs)
+
+
+def create_emotion_model(emotion_backend: str = 'deepface', onnx_model: str = None,
+                         onnx_threads: int = None) -> BatchEmotionModel:
+    """
+    Build the batched emotion model of a backend
+
+    Args:
+        emotion_backend: 'deepface' (Keras model, imports TensorFlow) or 'onnx'
+        onnx_model: ONNX file, required by the onnx backend
+        onnx_threads: Intra-op thread count of the ONNX Runtime session
+    """
+    if emotion_backend == 'deepface':
+        return BatchEmotionModel(load_deepface_emotion_model())
+    if emotion_backend == 'onnx':
+        if not onnx_model:
+            raise ValueError("The onnx emotion backend needs an ONNX model file (see emotion_onnx.py export)")
+        return OnnxEmotionModel(onnx_model, num_threads=onnx_threads)
+    raise ValueError(f"Unknown emotion backend: {emotion_backend}")
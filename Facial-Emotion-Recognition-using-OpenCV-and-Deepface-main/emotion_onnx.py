@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Export the DeepFace emotion classifier to ONNX and validate the export
+
+    python emotion_onnx.py export --output emotion.onnx [--int8]
+    python emotion_onnx.py validate --model emotion.int8.onnx --video sample.mp4
+
+Export needs TensorFlow, DeepFace and tf2onnx; int8 quantization needs
+onnxruntime (both in requirements-onnx.txt). Quantization is dynamic (weights stored as int8, activations
+quantized at run time), so no calibration set is required.
+
+Validation runs the Keras model and the ONNX model on the same face ROIs
+(cropped with Face Mesh from a sample video, or read from a directory of
+face images) and compares the probabilities. The ONNX model is accepted
+when the largest probability difference is within the tolerance and the
+dominant emotion agrees on enough faces.
+"""
+
+import argparse
+import glob
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+import landmark_features
+from emotion_model import ONNX_REQUIREMENTS, BatchEmotionModel, OnnxEmotionModel, load_deepface_emotion_model
+
+# Opset with the ops of the emotion CNN on every ONNX Runtime release we target
+DEFAULT_OPSET = 13
+
+
+def export_onnx(output_path: str, quantize: bool = False, opset: int = DEFAULT_OPSET) -> str:
+    """
+    Export the DeepFace emotion model to ONNX
+
+    Args:
+        output_path: Path of the float32 ONNX model
+        quantize: Also write an int8-quantized copy next to it
+            (``<name>.int8.onnx``) and return its path
+        opset: ONNX opset version
+
+    Returns:
+        Path of the model to use (the int8 copy when quantize is set)
+    """
+    import tensorflow as tf
+    try:
+        import tf2onnx
+    except ImportError as e:
+        raise ImportError(f"Exporting to ONNX needs tf2onnx ({ONNX_REQUIREMENTS})") from e
+
+    model = load_deepface_emotion_model()
+    size = BatchEmotionModel.input_size
+    signature = [tf.TensorSpec((None, size, size, 1), tf.float32, name='face')]
+    tf2onnx.convert.from_keras(model, input_signature=signature, opset=opset, output_path=output_path)
+    print(f"Exported emotion model to {output_path}")
+
+    if not quantize:
+        return output_path
+    return quantize_onnx(output_path)
+
+
+def quantize_onnx(model_path: str, output_path: str = None) -> str:
+    """Write a dynamically int8-quantized copy of an ONNX model"""
+    try:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+    except ImportError as e:
+        raise ImportError(f"Quantizing needs onnxruntime ({ONNX_REQUIREMENTS})") from e
+
+    output_path = output_path or os.path.splitext(model_path)[0] + '.int8.onnx'
+    quantize_dynamic(model_path, output_path, weight_type=QuantType.QInt8)
+    print(f"Quantized model written to {output_path} "
+          f"({os.path.getsize(model_path) / 1e6:.2f} MB -> {os.path.getsize(output_path) / 1e6:.2f} MB)")
+    return output_path
+
+
+def collect_video_rois(video_path: str, max_faces: int = 200, stride: int = 15) -> list:
+    """Face ROIs cropped with Face Mesh from every stride-th frame of a video"""
+    from model_registry import models
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video source {video_path}")
+
+    face_mesh = models.acquire_face_mesh()
+    rois = []
+    frame_index = 0
+    try:
+        while len(rois) < max_faces:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frame_index += 1
+            if frame_index % stride:
+                continue
+
+            results = face_mesh.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            if not results.multi_face_landmarks:
+                continue
+            points = landmark_features.stack_faces(results.multi_face_landmarks)
+            for x, y, w, h in landmark_features.bounding_boxes(points, frame.shape[1], frame.shape[0]):
+                roi = frame[y:y + h, x:x + w]
+                if roi.size:
+                    rois.append(roi.copy())
+    finally:
+        cap.release()
+        models.release_face_mesh(face_mesh)
+    return rois[:max_faces]
+
+
+def collect_image_rois(directory: str) -> list:
+    """Face crops stored as image files in a directory"""
+    rois = []
+    for path in sorted(glob.glob(os.path.join(directory, '*'))):
+        image = cv2.imread(path)
+        if image is not None:
+            rois.append(image)
+    return rois
+
+
+def _timed_probabilities(model: BatchEmotionModel, rois: list) -> tuple:
+    model.predict_probabilities(rois[:1])  # Warm-up
+    start = time.perf_counter()
+    probabilities = model.predict_probabilities(rois)
+    return probabilities, time.perf_counter() - start
+
+
+def validate_onnx(onnx_path: str, rois: list, tolerance: float = 0.05, min_agreement: float = 0.95,
+                  num_threads: int = None) -> dict:
+    """
+    Compare an ONNX export against the DeepFace (Keras) backend
+
+    Args:
+        onnx_path: ONNX model to validate
+        rois: BGR face crops used as validation inputs
+        tolerance: Largest accepted absolute probability difference (0-1)
+        min_agreement: Smallest accepted share of faces with the same dominant emotion
+        num_threads: ONNX Runtime intra-op threads
+
+    Returns:
+        Dict with the difference statistics, per-face latencies and 'passed'
+    """
+    if not rois:
+        raise ValueError("Validation needs at least one face ROI")
+
+    reference, reference_seconds = _timed_probabilities(BatchEmotionModel(load_deepface_emotion_model()), rois)
+    candidate, candidate_seconds = _timed_probabilities(OnnxEmotionModel(onnx_path, num_threads=num_threads), rois)
+
+    difference = np.abs(reference - candidate)
+    agreement = float(np.mean(np.argmax(reference, axis=1) == np.argmax(candidate, axis=1)))
+    report = {
+        'model': onnx_path,
+        'faces': len(rois),
+        'max_abs_diff': float(difference.max()),
+        'mean_abs_diff': float(difference.mean()),
+        'dominant_agreement': agreement,
+        'tolerance': tolerance,
+        'min_agreement': min_agreement,
+        'deepface_ms_per_face': 1000 * reference_seconds / len(rois),
+        'onnx_ms_per_face': 1000 * candidate_seconds / len(rois),
+        'model_size_mb': os.path.getsize(onnx_path) / 1e6
+    }
+    report['passed'] = report['max_abs_diff'] <= tolerance and agreement >= min_agreement
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export and validate the ONNX emotion backend')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export = commands.add_parser('export', help='Export the DeepFace emotion model to ONNX')
+    export.add_argument('--output', type=str, default='emotion.onnx', help='ONNX file to write')
+    export.add_argument('--int8', action='store_true', help='Also write a dynamically int8-quantized model')
+    export.add_argument('--opset', type=int, default=DEFAULT_OPSET, help='ONNX opset version')
+
+    validate = commands.add_parser('validate', help='Compare an ONNX model with the DeepFace backend')
+    validate.add_argument('--model', type=str, required=True, help='ONNX model to validate')
+    sources = validate.add_mutually_exclusive_group(required=True)
+    sources.add_argument('--video', type=str, help='Sample video to crop validation faces from')
+    sources.add_argument('--images', type=str, help='Directory of face crops')
+    validate.add_argument('--max-faces', type=int, default=200, help='Number of faces taken from the video')
+    validate.add_argument('--tolerance', type=float, default=0.05, help='Largest accepted probability difference')
+    validate.add_argument('--min-agreement', type=float, default=0.95, help='Smallest accepted dominant emotion agreement')
+    validate.add_argument('--threads', type=int, help='ONNX Runtime intra-op threads')
+    validate.add_argument('--json', type=str, help='Also write the report to this JSON file')
+
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        export_onnx(args.output, quantize=args.int8, opset=args.opset)
+        return
+
+    rois = collect_video_rois(args.video, args.max_faces) if args.video else collect_image_rois(args.images)
+    report = validate_onnx(args.model, rois, args.tolerance, args.min_agreement, args.threads)
+    print(f"{report['faces']} faces: max diff {report['max_abs_diff']:.4f}, mean diff {report['mean_abs_diff']:.4f}, "
+          f"dominant agreement {report['dominant_agreement'] * 100:.1f}%")
+    print(f"Latency per face: deepface {report['deepface_ms_per_face']:.2f} ms, onnx {report['onnx_ms_per_face']:.2f} ms")
+    print("Validation passed" if report['passed'] else "Validation FAILED")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    if not report['passed']:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
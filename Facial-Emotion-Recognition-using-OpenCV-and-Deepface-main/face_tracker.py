@@ -0,0 +1,156 @@
+"""
+Multi-face tracker for the simplified analyzer
+
+All detections of a frame are assigned to existing tracks at once. The cost
+of every (detection, track) pair combines centre distance and IoU and is
+computed with array broadcasting, and the assignment is optimal (Hungarian
+algorithm, scipy.optimize.linear_sum_assignment). Tracks that have not been
+seen for a while are expired and reported to an on_expire callback so
+per-track caches can be evicted.
+"""
+
+from collections import deque
+
+import numpy as np
+
+from scipy.optimize import linear_sum_assignment
+
+# Cost assigned to pairs that fail the gating rules
+_INFEASIBLE = 1e6
+
+# Analysis steps an unseen track is kept (and can be re-acquired) before it expires
+DEFAULT_EXPIRE_AFTER = 90
+
+
+def bbox_centers(bboxes: np.ndarray) -> np.ndarray:
+    """Integer centres (x + w // 2, y + h // 2) of (N, 4) x/y/w/h boxes"""
+    return bboxes[:, :2] + bboxes[:, 2:] // 2
+
+
+def pairwise_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """IoU matrix between (N, 4) and (M, 4) x/y/w/h boxes"""
+    a_min, a_max = a[:, None, :2], a[:, None, :2] + a[:, None, 2:]
+    b_min, b_max = b[None, :, :2], b[None, :, :2] + b[None, :, 2:]
+
+    overlap = np.clip(np.minimum(a_max, b_max) - np.maximum(a_min, b_min), 0, None)
+    intersection = overlap[..., 0] * overlap[..., 1]
+    area_a = a[:, 2] * a[:, 3]
+    area_b = b[:, 2] * b[:, 3]
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return np.where(union > 0, intersection / np.maximum(union, 1e-9), 0.0)
+
+
+def _assign(cost: np.ndarray) -> list:
+    """Minimum-cost one-to-one assignment, returns (row, col) pairs of feasible matches"""
+    if cost.size == 0:
+        return []
+
+    rows, cols = linear_sum_assignment(cost)
+    return [(row, col) for row, col in zip(rows.tolist(), cols.tolist()) if cost[row, col] < _INFEASIBLE]
+
+
+class FaceTracker:
+    """Assign stable ids to face bounding boxes across frames"""
+
+    def __init__(self, max_distance: float = 80, iou_weight: float = 0.5,
+                 max_age: int = 5, expire_after: int = DEFAULT_EXPIRE_AFTER, on_expire=None):
+        """
+        Args:
+            max_distance: Largest centre distance (pixels) for a match
+            iou_weight: Weight of (1 - IoU) in the matching cost; the centre
+                distance contributes distance / max_distance
+            max_age: Tracks seen within this many analysis steps are matched first
+            expire_after: Tracks unseen for longer than this are deleted. Tracks
+                between max_age and expire_after can still be re-acquired, so a
+                face that flickers out briefly keeps its id.
+            on_expire: Called with the list of expired track ids
+        """
+        self.max_distance = max_distance
+        self.iou_weight = iou_weight
+        self.max_age = max_age
+        self.expire_after = expire_after
+        self.on_expire = on_expire
+        self.tracks = {}
+        self.next_id = 0
+
+    def _new_track(self, bbox: tuple, step: int) -> int:
+        track_id = self.next_id
+        self.next_id += 1
+        self.tracks[track_id] = {
+            'bbox': bbox,
+            'last_seen': step,
+            'emotion_history': deque(maxlen=10),
+            'engagement_history': deque(maxlen=10)
+        }
+        return track_id
+
+    def _cost_matrix(self, detections: np.ndarray, track_boxes: np.ndarray) -> np.ndarray:
+        centers_d = bbox_centers(detections).astype(np.float64)
+        centers_t = bbox_centers(track_boxes).astype(np.float64)
+        distance = np.linalg.norm(centers_d[:, None, :] - centers_t[None, :, :], axis=-1)
+        iou = pairwise_iou(detections.astype(np.float64), track_boxes.astype(np.float64))
+
+        cost = distance / self.max_distance + self.iou_weight * (1.0 - iou)
+        cost[distance >= self.max_distance] = _INFEASIBLE
+        return cost
+
+    def _match(self, detections: np.ndarray, unmatched: list, candidate_ids: list, step: int, ids: list):
+        """Match the unmatched detections against candidate tracks, in place"""
+        if not unmatched or not candidate_ids:
+            return unmatched
+
+        track_boxes = np.array([self.tracks[t]['bbox'] for t in candidate_ids], dtype=np.int64)
+        cost = self._cost_matrix(detections[unmatched], track_boxes)
+
+        matched = set()
+        for row, col in _assign(cost):
+            det_index = unmatched[row]
+            track_id = candidate_ids[col]
+            self.tracks[track_id]['bbox'] = tuple(int(v) for v in detections[det_index])
+            self.tracks[track_id]['last_seen'] = step
+            ids[det_index] = track_id
+            matched.add(det_index)
+        return [d for d in unmatched if d not in matched]
+
+    def update(self, bboxes, step: int) -> list:
+        """
+        Assign track ids to all detections of one frame
+
+        Args:
+            bboxes: (N, 4) array or list of x/y/w/h boxes
+            step: Current analysis step (monotonic frame clock)
+
+        Returns:
+            List of N track ids, in detection order
+        """
+        detections = np.asarray(bboxes, dtype=np.int64).reshape(-1, 4)
+        ids = [None] * len(detections)
+        unmatched = list(range(len(detections)))
+
+        # Recently seen tracks first, then lost tracks that are not expired yet
+        recent, lost = [], []
+        for track_id, track in self.tracks.items():
+            age = step - track['last_seen']
+            if age <= self.max_age:
+                recent.append(track_id)
+            elif age <= self.expire_after:
+                lost.append(track_id)
+
+        unmatched = self._match(detections, unmatched, recent, step, ids)
+        unmatched = self._match(detections, unmatched, lost, step, ids)
+
+        for det_index in unmatched:
+            ids[det_index] = self._new_track(tuple(int(v) for v in detections[det_index]), step)
+
+        self.expire(step)
+        return ids
+
+    def expire(self, step: int) -> list:
+        """Delete tracks unseen for more than expire_after steps"""
+        expired = [track_id for track_id, track in self.tracks.items()
+                   if step - track['last_seen'] > self.expire_after]
+        for track_id in expired:
+            del self.tracks[track_id]
+        if expired and self.on_expire:
+            self.on_expire(expired)
+        return expired
@@ -0,0 +1,134 @@
+"""
+Gallery-view layout detection
+
+Recall's gallery_view_v2 recordings show every participant in a tile of a
+grid drawn on a uniform background. The grid is detected once from a few
+sampled frames: pixels that stay within a tolerance of the background colour
+in every sample are background, rows that are (almost) entirely background
+separate the rows of tiles, and within each row of tiles the background
+columns separate the tiles. A short last row (centred, with fewer tiles) is
+handled naturally because columns are split per row.
+
+Tiles are numbered in reading order (left to right, top to bottom); the tile
+index is the participant identity in gallery mode. The layout is detected
+once per recording, so participants joining or leaving mid-meeting (which
+reflows the grid) are not followed.
+"""
+
+import json
+
+import cv2
+import numpy as np
+
+
+def sample_frames(video_path: str, count: int = 8) -> list:
+    """Decode count frames spread evenly over a video"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video source {video_path}")
+
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    positions = np.linspace(0, max(total_frames - 1, 0), num=count, dtype=np.int64) if total_frames > 0 else [0]
+
+    frames = []
+    for position in sorted(set(int(p) for p in positions)):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, position)
+        ret, frame = cap.read()
+        if ret:
+            frames.append(frame)
+    cap.release()
+    return frames
+
+
+def _content_runs(is_background: np.ndarray, min_size: int) -> list:
+    """(start, end) ranges of consecutive non-background entries at least min_size long"""
+    content = np.concatenate([[False], ~is_background, [False]]).astype(np.int8)
+    edges = np.flatnonzero(np.diff(content))
+    return [(int(start), int(end)) for start, end in zip(edges[0::2], edges[1::2]) if end - start >= min_size]
+
+
+def background_mask(frames: list, tolerance: int = 12) -> tuple:
+    """
+    Pixels that match the background colour in every sampled frame
+
+    The background colour is the median of the frame borders.
+
+    Returns:
+        Tuple of (boolean (H, W) mask, background grey level)
+    """
+    gray = np.stack([cv2.cvtColor(f, cv2.COLOR_BGR2GRAY) if f.ndim == 3 else f for f in frames]).astype(np.int16)
+    border = np.concatenate([gray[:, 0, :].ravel(), gray[:, -1, :].ravel(),
+                             gray[:, :, 0].ravel(), gray[:, :, -1].ravel()])
+    background = int(np.median(border))
+    return np.all(np.abs(gray - background) <= tolerance, axis=0), background
+
+
+def detect_gallery_layout(frames: list, tolerance: int = 12, separator_fraction: float = 0.97,
+                          min_tile_size: int = 64) -> dict:
+    """
+    Detect the participant tiles of a gallery-view recording
+
+    Args:
+        frames: Sampled BGR frames of the recording (see sample_frames)
+        tolerance: Largest grey-level difference still counted as background
+        separator_fraction: Share of background pixels that makes a row or
+            column a separator between tiles
+        min_tile_size: Smaller content runs (labels, borders) are ignored
+
+    Returns:
+        Dict with frame_size [w, h], background (grey level) and tiles, a
+        list of [x, y, w, h] boxes in reading order. A frame without a
+        detectable grid is a single tile covering the whole frame.
+    """
+    if not frames:
+        raise ValueError("Gallery layout detection needs at least one frame")
+
+    mask, background = background_mask(frames, tolerance)
+    height, width = mask.shape
+
+    tiles = []
+    for top, bottom in _content_runs(mask.mean(axis=1) >= separator_fraction, min_tile_size):
+        band = mask[top:bottom]
+        for left, right in _content_runs(band.mean(axis=0) >= separator_fraction, min_tile_size):
+            tiles.append([left, top, right - left, bottom - top])
+
+    if not tiles:
+        tiles = [[0, 0, width, height]]
+
+    return {
+        'frame_size': [width, height],
+        'background': background,
+        'tiles': tiles
+    }
+
+
+def load_layout(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_layout(layout: dict, path: str):
+    with open(path, 'w') as f:
+        json.dump(layout, f, indent=2)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Detect the participant tiles of a gallery-view recording')
+    parser.add_argument('video', help='Gallery-view recording')
+    parser.add_argument('--output', type=str, help='Save the layout as JSON (usable with --gallery-layout)')
+    parser.add_argument('--samples', type=int, default=8, help='Number of frames sampled for detection')
+    args = parser.parse_args()
+
+    layout = detect_gallery_layout(sample_frames(args.video, args.samples))
+    print(f"{len(layout['tiles'])} tile(s) in a {layout['frame_size'][0]}x{layout['frame_size'][1]} frame")
+    for index, (x, y, w, h) in enumerate(layout['tiles']):
+        print(f"  tile {index}: x={x} y={y} w={w} h={h}")
+    if args.output:
+        save_layout(layout, args.output)
+        print(f"Layout saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Optional per-stage timing for the simplified analyzer
+
+Each stage of a frame (decode, colour conversion, Face Mesh, landmark math,
+tracking, emotion cache lookups, emotion inference, scoring, output, and the
+drawing/display/encoding done by run_analysis) is timed with
+time.perf_counter and added to a fixed-bucket histogram: recording a sample
+is a bisect and a few additions, so timing every frame stays cheap, and
+memory does not grow with the length of the recording. When instrumentation
+is disabled, stage() returns a shared no-op context manager.
+
+Per-face counters record how many emotion inferences were run, served from
+the cache, or failed for each face_id.
+
+In pipelined mode the stages run on the decode, landmark and emotion
+threads, so RunInstrumentation guards its histograms and counters with one
+lock; it is only held for the few additions of a sample, never while a
+stage runs, and summary() takes a consistent snapshot under it.
+"""
+
+import bisect
+import threading
+import time
+
+# Bucket upper bounds in seconds: 10 microseconds to ~20 seconds in sqrt(2) steps
+BUCKET_EDGES = [10e-6 * 2 ** (k / 2) for k in range(43)]
+
+INFERENCE_OUTCOMES = ('run', 'cached', 'failed')
+
+
+class LatencyHistogram:
+    """Fixed log-scale histogram of stage durations"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_EDGES) + 1)  # Last bucket: above the largest edge
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, seconds: float):
+        self.counts[bisect.bisect_left(BUCKET_EDGES, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bound of the bucket holding the given fraction of samples (seconds)"""
+        if not self.count:
+            return None
+        target = fraction * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= target and count:
+                upper = BUCKET_EDGES[index] if index < len(BUCKET_EDGES) else self.max
+                return min(upper, self.max)
+        return self.max
+
+    def as_dict(self) -> dict:
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'total_seconds': self.total,
+            'mean_ms': 1000 * self.total / self.count,
+            'min_ms': 1000 * self.min,
+            'p50_ms': 1000 * self.percentile(0.5),
+            'p90_ms': 1000 * self.percentile(0.9),
+            'p99_ms': 1000 * self.percentile(0.99),
+            'max_ms': 1000 * self.max,
+            # [bucket upper bound in ms (None: above the last bound), samples] for non-empty buckets
+            'buckets': [[1000 * BUCKET_EDGES[i] if i < len(BUCKET_EDGES) else None, count]
+                        for i, count in enumerate(self.counts) if count]
+        }
+
+
+class _StageTiming:
+    __slots__ = ('histogram', 'lock', 'start')
+
+    def __init__(self, histogram: LatencyHistogram, lock: threading.Lock):
+        self.histogram = histogram
+        self.lock = lock
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        with self.lock:
+            self.histogram.record(elapsed)
+        return False
+
+
+class _NoTiming:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_TIMING = _NoTiming()
+
+
+class RunInstrumentation:
+    """Stage histograms and per-face inference counters of one analysis run"""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.histograms = {}
+        self.face_inferences = {}
+        self.started_at = time.time()
+        self._lock = threading.Lock()  # Stages record from several pipeline threads
+
+    def _histogram(self, name: str) -> LatencyHistogram:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, LatencyHistogram())
+        return histogram
+
+    def stage(self, name: str):
+        """Context manager timing one execution of a stage"""
+        if not self.enabled:
+            return _NO_TIMING
+        return _StageTiming(self._histogram(name), self._lock)
+
+    def record(self, name: str, seconds: float):
+        """Add an externally measured duration to a stage"""
+        if self.enabled:
+            histogram = self._histogram(name)
+            with self._lock:
+                histogram.record(seconds)
+
+    def count_inference(self, face_id: int, outcome: str):
+        """Count an emotion inference outcome ('run', 'cached' or 'failed') for a face"""
+        if not self.enabled:
+            return
+        with self._lock:
+            counts = self.face_inferences.get(face_id)
+            if counts is None:
+                counts = self.face_inferences[face_id] = dict.fromkeys(INFERENCE_OUTCOMES, 0)
+            counts[outcome] += 1
+
+    def summary(self) -> dict:
+        """Histograms and counters as a JSON-serializable dict"""
+        with self._lock:
+            stages = {name: histogram.as_dict() for name, histogram in self.histograms.items()}
+            faces = {face_id: dict(counts) for face_id, counts in self.face_inferences.items()}
+        totals = dict.fromkeys(INFERENCE_OUTCOMES, 0)
+        for counts in faces.values():
+            for outcome, count in counts.items():
+                totals[outcome] += count
+        return {
+            'elapsed_seconds': time.time() - self.started_at,
+            'stages': stages,
+            'inferences': {
+                'totals': totals,
+                'faces': {str(face_id): counts for face_id, counts in sorted(faces.items())}
+            }
+        }
@@ -0,0 +1,165 @@
+"""
+Vectorized landmark feature extraction for the simplified analyzer
+
+Landmarks are converted once per face into a contiguous (468, 2) array of
+normalized x/y coordinates. Every feature function accepts arrays with any
+number of leading dimensions, so the same code handles a single face
+(468, 2), all faces in a frame (N, 468, 2) or a window of frames
+(F, N, 468, 2).
+"""
+
+import numpy as np
+
+NUM_LANDMARKS = 468
+
+# Eye landmark indices. Only the first six points of each contour are used
+# for the Eye Aspect Ratio (p1..p6 in the usual EAR formulation).
+LEFT_EYE_INDICES = [33, 7, 163, 144, 145, 153, 154, 155, 133, 173, 157, 158, 159, 160, 161, 246]
+RIGHT_EYE_INDICES = [362, 382, 381, 380, 374, 373, 390, 249, 263, 466, 388, 387, 386, 385, 384, 398]
+
+# Points used by the simplified gaze and head pose estimates
+LEFT_EYE_CENTER_INDICES = [33, 7]
+RIGHT_EYE_CENTER_INDICES = [362, 382]
+NOSE_TIP_INDEX = 1
+CHIN_INDEX = 152
+
+GAZE_OFF_SCREEN_THRESHOLD = 0.25
+BLINK_EAR_THRESHOLD = 0.2
+
+
+def landmarks_to_array(landmarks) -> np.ndarray:
+    """
+    Convert MediaPipe landmarks to a contiguous (468, 2) float64 array
+
+    Args:
+        landmarks: Sequence of MediaPipe NormalizedLandmark (or an array)
+
+    Returns:
+        Array of normalized (x, y) coordinates
+    """
+    if isinstance(landmarks, np.ndarray):
+        return np.ascontiguousarray(landmarks[..., :2], dtype=np.float64)
+
+    count = len(landmarks)
+    coords = np.fromiter(
+        (value for lm in landmarks for value in (lm.x, lm.y)),
+        dtype=np.float64,
+        count=2 * count
+    )
+    return coords.reshape(count, 2)
+
+
+def stack_faces(multi_face_landmarks) -> np.ndarray:
+    """Convert all faces of a MediaPipe result into one (N, 468, 2) array"""
+    if not multi_face_landmarks:
+        return np.empty((0, NUM_LANDMARKS, 2), dtype=np.float64)
+    return np.stack([landmarks_to_array(face.landmark) for face in multi_face_landmarks])
+
+
+def eye_aspect_ratio(points: np.ndarray, eye_indices) -> np.ndarray:
+    """Eye Aspect Ratio for blink detection over arrays of shape (..., 468, 2)"""
+    eye = points[..., eye_indices[:6], :]
+
+    vertical_1 = np.linalg.norm(eye[..., 1, :] - eye[..., 5, :], axis=-1)
+    vertical_2 = np.linalg.norm(eye[..., 2, :] - eye[..., 4, :], axis=-1)
+    horizontal = np.linalg.norm(eye[..., 0, :] - eye[..., 3, :], axis=-1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (vertical_1 + vertical_2) / (2.0 * horizontal)
+
+
+def gaze_direction(points: np.ndarray) -> np.ndarray:
+    """Simplified gaze vector (right eye centre - left eye centre), shape (..., 2)"""
+    left_eye_center = points[..., LEFT_EYE_CENTER_INDICES, :].mean(axis=-2)
+    right_eye_center = points[..., RIGHT_EYE_CENTER_INDICES, :].mean(axis=-2)
+    return right_eye_center - left_eye_center
+
+
+def head_pose(points: np.ndarray) -> np.ndarray:
+    """Simplified head tilt angle from the nose tip to the chin, shape (...)"""
+    head_vector = points[..., CHIN_INDEX, :] - points[..., NOSE_TIP_INDEX, :]
+    return np.arctan2(head_vector[..., 1], head_vector[..., 0])
+
+
+def bounding_boxes(points: np.ndarray, frame_width: int, frame_height: int) -> np.ndarray:
+    """
+    Pixel bounding boxes (x, y, w, h) of the landmarks, shape (..., 4)
+
+    Coordinates are truncated toward zero, matching int() on the scaled
+    minimum / maximum of each axis.
+    """
+    mins = points.min(axis=-2)
+    maxs = points.max(axis=-2)
+    scale = np.array([frame_width, frame_height], dtype=np.float64)
+
+    top_left = np.trunc(mins * scale).astype(np.int64)
+    bottom_right = np.trunc(maxs * scale).astype(np.int64)
+    return np.concatenate([top_left, bottom_right - top_left], axis=-1)
+
+
+def compute_face_features(points: np.ndarray, frame_width: int, frame_height: int) -> dict:
+    """
+    Compute every per-face feature used by the analyzer in one pass
+
+    Args:
+        points: Landmark array of shape (..., 468, 2)
+        frame_width: Width in pixels of the frame the landmarks refer to
+        frame_height: Height in pixels of the frame the landmarks refer to
+
+    Returns:
+        Dict of arrays sharing the leading dimensions of ``points``:
+        eye_aspect_ratio, gaze_vector, gaze_off_screen, head_tilt,
+        blink_rate and bbox
+    """
+    left_ear = eye_aspect_ratio(points, LEFT_EYE_INDICES)
+    right_ear = eye_aspect_ratio(points, RIGHT_EYE_INDICES)
+    avg_ear = (left_ear + right_ear) / 2
+
+    gaze_vector = gaze_direction(points)
+    gaze_off_screen = np.any(np.abs(gaze_vector) > GAZE_OFF_SCREEN_THRESHOLD, axis=-1)
+
+    return {
+        'eye_aspect_ratio': avg_ear,
+        'gaze_vector': gaze_vector,
+        'gaze_off_screen': gaze_off_screen,
+        'head_tilt': np.abs(head_pose(points)),
+        'blink_rate': (avg_ear < BLINK_EAR_THRESHOLD).astype(np.float64),
+        'bbox': bounding_boxes(points, frame_width, frame_height)
+    }
+
+
+def compute_window_features(frames_points, frame_width: int, frame_height: int) -> list:
+    """
+    Compute features for a window of frames with varying face counts
+
+    All faces of all frames are concatenated into one (total_faces, 468, 2)
+    array, processed in a single vectorized pass and split back per frame.
+
+    Args:
+        frames_points: List of per-frame arrays of shape (N_i, 468, 2)
+        frame_width: Width in pixels of the frames
+        frame_height: Height in pixels of the frames
+
+    Returns:
+        List of feature dicts, one per frame, as returned by
+        compute_face_features
+    """
+    if not frames_points:
+        return []
+
+    counts = [len(points) for points in frames_points]
+    features = compute_face_features(np.concatenate(frames_points), frame_width, frame_height)
+    boundaries = np.cumsum(counts)[:-1]
+
+    split = {name: np.split(values, boundaries) for name, values in features.items()}
+    return [{name: split[name][i] for name in split} for i in range(len(counts))]
+
+
+def engagement_metrics_at(features: dict, index) -> dict:
+    """Build the JSON ``engagement_metrics`` dict for one face of a batch"""
+    return {
+        'eye_aspect_ratio': float(features['eye_aspect_ratio'][index]),
+        'gaze_off_screen': bool(features['gaze_off_screen'][index]),
+        'head_tilt': float(features['head_tilt'][index]),
+        'blink_rate': float(features['blink_rate'][index])
+    }
@@ -0,0 +1,147 @@
+"""
+Process-wide registry of the analyzer's models
+
+Building a Face Mesh graph and loading the emotion classifier take seconds,
+and both run slower on their first input while they initialize. When many
+short recordings are analyzed back to back, every SimplifiedAnalyzer paid
+that cost again. The registry loads and warms up each model once per process
+and hands it to analyzer instances:
+
+- the emotion classifier (per backend) is shared by every analyzer of the
+  process;
+- Face Mesh keeps tracking state between frames, so instances are leased:
+  an analyzer acquires one and releases it when done, and the registry
+  resets its tracking state before handing it to the next analyzer.
+
+Load and warm-up times are recorded per model (see report()). preload()
+warms everything up front, e.g. as a worker process initializer.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+from detection_frames import FACE_MESH_OPTIONS
+from emotion_model import BatchEmotionModel, create_emotion_model
+
+# Blank input used to warm up Face Mesh and to clear its tracking state
+_BLANK_FRAME_SIZE = (480, 640, 3)
+
+
+def _options_key(options: dict) -> tuple:
+    return tuple(sorted(options.items()))
+
+
+class ModelRegistry:
+    """Load, warm up and share models within one process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._emotion_models = {}  # Per (backend, onnx_model, onnx_threads)
+        self._deepface_backends = set()
+        self._face_meshes = {}  # Idle Face Mesh instances per options key
+        self.timings = {}
+
+    def _record(self, name: str, load_seconds: float = 0.0, warmup_seconds: float = 0.0):
+        entry = self.timings.setdefault(name, {'loads': 0, 'load_seconds': 0.0, 'warmup_seconds': 0.0})
+        entry['loads'] += 1
+        entry['load_seconds'] += load_seconds
+        entry['warmup_seconds'] += warmup_seconds
+
+    def emotion_model(self, emotion_backend: str = 'deepface', onnx_model: str = None,
+                      onnx_threads: int = None) -> BatchEmotionModel:
+        """Shared batched emotion model of a backend, loaded and warmed up on first use"""
+        key = (emotion_backend, onnx_model, onnx_threads)
+        with self._lock:
+            if key not in self._emotion_models:
+                load_start = time.time()
+                model = create_emotion_model(emotion_backend, onnx_model, onnx_threads)
+                loaded = time.time()
+                model.predict_probabilities([np.zeros((model.input_size, model.input_size), dtype=np.uint8)])
+                self._record(f'emotion_model_{emotion_backend}', loaded - load_start, time.time() - loaded)
+                self._emotion_models[key] = model
+            return self._emotion_models[key]
+
+    def warm_up_deepface(self, detector_backend: str = 'opencv'):
+        """Warm up DeepFace.analyze (per-face path) for a detector backend"""
+        with self._lock:
+            if detector_backend in self._deepface_backends:
+                return
+            from deepface import DeepFace
+
+            start = time.time()
+            DeepFace.analyze(
+                np.zeros((BatchEmotionModel.input_size, BatchEmotionModel.input_size, 3), dtype=np.uint8),
+                actions=['emotion'],
+                enforce_detection=False,
+                silent=True,
+                detector_backend=detector_backend
+            )
+            self._record(f'deepface_{detector_backend}', warmup_seconds=time.time() - start)
+            self._deepface_backends.add(detector_backend)
+
+    def _build_face_mesh(self, options: dict):
+        import mediapipe as mp
+
+        load_start = time.time()
+        face_mesh = mp.solutions.face_mesh.FaceMesh(**options)
+        loaded = time.time()
+        face_mesh.process(np.zeros(_BLANK_FRAME_SIZE, dtype=np.uint8))
+        self._record('face_mesh', loaded - load_start, time.time() - loaded)
+        return face_mesh
+
+    def acquire_face_mesh(self, options: dict = None):
+        """Lease a warmed-up Face Mesh built with options (default FACE_MESH_OPTIONS)"""
+        options = options or FACE_MESH_OPTIONS
+        with self._lock:
+            idle = self._face_meshes.get(_options_key(options))
+            if idle:
+                return idle.pop()
+        return self._build_face_mesh(options)
+
+    def release_face_mesh(self, face_mesh, options: dict = None):
+        """Return a leased Face Mesh after clearing its tracking state"""
+        options = options or FACE_MESH_OPTIONS
+        # A frame without faces drops the tracked faces, so the next lease starts with detection
+        face_mesh.process(np.zeros(_BLANK_FRAME_SIZE, dtype=np.uint8))
+        with self._lock:
+            self._face_meshes.setdefault(_options_key(options), []).append(face_mesh)
+
+    def preload(self, face_meshes: int = 1, emotion_model: bool = True, face_mesh_options: dict = None,
+                emotion_options: dict = None):
+        """
+        Load and warm up models ahead of the first analysis
+
+        Args:
+            face_meshes: Number of Face Mesh instances to build
+            emotion_model: Also load the batched emotion model
+            face_mesh_options: Face Mesh settings (default FACE_MESH_OPTIONS)
+            emotion_options: Keyword arguments of emotion_model() (backend selection)
+        """
+        if emotion_model:
+            self.emotion_model(**(emotion_options or {}))
+        leased = [self.acquire_face_mesh(face_mesh_options) for _ in range(face_meshes)]
+        for face_mesh in leased:
+            self.release_face_mesh(face_mesh, face_mesh_options)
+
+    def report(self) -> dict:
+        """Load/warm-up timings per model and the number of idle Face Mesh instances"""
+        with self._lock:
+            return {
+                'timings': {name: dict(entry) for name, entry in self.timings.items()},
+                'idle_face_meshes': sum(len(idle) for idle in self._face_meshes.values())
+            }
+
+
+# The registry of this process
+models = ModelRegistry()
+
+
+def preload_models(face_meshes: int = 1, emotion_model: bool = True, face_mesh_options: dict = None,
+                   emotion_options: dict = None):
+    """Worker initializer: warm up the models of this process and print the timings"""
+    models.preload(face_meshes=face_meshes, emotion_model=emotion_model,
+                   face_mesh_options=face_mesh_options, emotion_options=emotion_options)
+    for name, entry in models.report()['timings'].items():
+        print(f"Model {name}: loaded in {entry['load_seconds']:.2f}s, warmed up in {entry['warmup_seconds']:.2f}s")
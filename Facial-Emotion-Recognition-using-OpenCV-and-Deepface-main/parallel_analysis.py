@@ -0,0 +1,426 @@
+"""
+Parallel sharded analysis of a single long recording
+
+The video is cut into time segments that are analyzed in a process pool.
+Every worker builds its own SimplifiedAnalyzer (and with it its own Face Mesh
+and emotion model). Segment results are stitched back together by
+re-identifying new tracks with faces that are no longer tracked (see
+TrackStitcher), across segment boundaries and within segments, so face_ids
+stay consistent across the whole session and the merged output keeps the
+regular per-frame JSON schema.
+
+Gallery-view recordings can instead be split by space: the participant tiles
+are divided among the workers, every worker decodes the whole recording and
+analyzes only its tiles, and the per-frame results of the workers are merged.
+The tile index is the face_id, so no stitching is needed.
+
+Workers stream their records to JSONL part files in a temporary directory
+next to the output instead of returning them, and the parent merges the
+parts record by record, so memory stays flat however long the recording is.
+"""
+
+import heapq
+import itertools
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from detection_frames import TILE_FACE_MESH_OPTIONS
+from face_tracker import _INFEASIBLE, DEFAULT_EXPIRE_AFTER, _assign, bbox_centers
+from gallery_layout import detect_gallery_layout, sample_frames
+from model_registry import preload_models
+from result_io import iter_results, write_results
+from simplified_analyzer import SimplifiedAnalyzer, resolve_stride
+
+# Same spatial continuity rule as FaceTracker
+MAX_MATCH_DISTANCE = 80
+
+
+def plan_segments(total_frames: int, fps: float, segment_seconds: float = 300,
+                  num_segments: int = None, stride: int = 1) -> list:
+    """
+    Split a video into (start_frame, end_frame) segments
+
+    Segment starts are aligned to the stride so the union of the segments
+    samples exactly the same frames as a sequential run.
+    """
+    if total_frames <= 0:
+        return [(0, None)]
+
+    if num_segments:
+        segment_frames = int(np.ceil(total_frames / num_segments))
+    else:
+        segment_frames = int(segment_seconds * fps) if fps > 0 else total_frames
+    segment_frames = max(stride, segment_frames - segment_frames % stride)
+
+    segments = []
+    for start in range(0, total_frames, segment_frames):
+        segments.append((start, min(start + segment_frames, total_frames)))
+    return segments
+
+
+def analyze_segment(task: dict) -> dict:
+    """Worker entry point: analyze one segment into its JSONL part file"""
+    analyzer = SimplifiedAnalyzer(
+        video_source=task['video_path'],
+        output_file=task['part_file'],
+        batch_emotions=task['batch_emotions'],
+        output_format='jsonl',  # Streamed to disk, nothing kept in memory
+        emotion_refresh=task['emotion_refresh'],
+        max_staleness=task['max_staleness'],
+        scoring_config=task['scoring_config'],
+        detection_scale=task['detection_scale'],
+        **task['emotion_options']
+    )
+    analyzer.run_analysis(
+        headless=True,
+        progress_callback=lambda progress: None,
+        stride=task['stride'],
+        start_frame=task['start_frame'],
+        end_frame=task['end_frame']
+    )
+    analyzer.release_models()
+    return {
+        'segment_index': task['segment_index'],
+        'start_frame': task['start_frame'],
+        'end_frame': task['end_frame'],
+        'part_file': task['part_file']
+    }
+
+
+class TrackStitcher:
+    """
+    Map the per-segment face_ids of the workers onto session-wide ids
+
+    Every worker numbers its tracks from 0. Frames are fed in session order;
+    a local id keeps the global id it got when it first appeared. A new local
+    id takes over the global id of a face that is no longer tracked (its
+    segment ended, or its local track expired after expire_after analyzed
+    frames without a detection) when the new box is within
+    MAX_MATCH_DISTANCE of that face's last box. Simultaneous new ids are
+    matched with the tracker's minimum-cost assignment.
+
+    This re-identifies a face across segment boundaries and also a face
+    that was lost for longer than the tracker's expiry inside a segment, so
+    attendance is not split per segment or per long occlusion. Re-acquisition
+    is purely positional: a face that comes back somewhere else gets a new
+    id, and another person taking an empty seat inherits its id.
+    """
+
+    def __init__(self, expire_after: int = DEFAULT_EXPIRE_AFTER, max_distance: float = MAX_MATCH_DISTANCE):
+        """
+        Args:
+            expire_after: Track expiry of the workers' FaceTracker (analysis steps)
+            max_distance: Largest centre distance (pixels) to re-identify a face
+        """
+        self.expire_after = expire_after
+        self.max_distance = max_distance
+        self.next_id = 0
+        self.last_boxes = {}  # Global id -> last bounding box
+        self.start_segment()
+
+    def start_segment(self):
+        """Forget the local ids of the previous segment (they are all ended)"""
+        self._mapping = {}  # Local id -> global id
+        self._last_step = {}  # Local id -> analysis step it was last seen
+        self._step = 0
+
+    def _free_ids(self) -> list:
+        """Global ids not held by a local track that is still alive"""
+        held = {self._mapping[local_id] for local_id, step in self._last_step.items()
+                if self._step - step <= self.expire_after}
+        return [global_id for global_id in self.last_boxes if global_id not in held]
+
+    def _assign_new(self, new_ids: list, boxes: dict):
+        candidates = self._free_ids()
+        matched = {}
+        if candidates:
+            new_centers = bbox_centers(np.array([boxes[i] for i in new_ids], dtype=np.int64)).astype(np.float64)
+            old_centers = bbox_centers(np.array([self.last_boxes[g] for g in candidates],
+                                                dtype=np.int64)).astype(np.float64)
+            distance = np.linalg.norm(new_centers[:, None, :] - old_centers[None, :, :], axis=-1)
+            cost = distance / self.max_distance
+            cost[distance >= self.max_distance] = _INFEASIBLE
+            matched = {new_ids[row]: candidates[col] for row, col in _assign(cost)}
+
+        for local_id in new_ids:
+            if local_id in matched:
+                self._mapping[local_id] = matched[local_id]
+            else:
+                self._mapping[local_id] = self.next_id
+                self.next_id += 1
+
+    def map_frame(self, frame: dict) -> dict:
+        """Rewrite the face_ids of the next frame record in place and return it"""
+        boxes = {}
+        for face in frame['faces']:
+            if face['face_id'] not in self._mapping:
+                boxes.setdefault(face['face_id'], face['bbox'])
+        if boxes:
+            self._assign_new(list(boxes), boxes)
+
+        for face in frame['faces']:
+            local_id = face['face_id']
+            global_id = self._mapping[local_id]
+            face['face_id'] = global_id
+            self.last_boxes[global_id] = face['bbox']
+            self._last_step[local_id] = self._step
+        self._step += 1
+        return frame
+
+
+def stitch_segments(segments):
+    """
+    Merge segment results into one frame stream with session-wide face_ids
+
+    Args:
+        segments: Frame record iterables of the segments, in segment order
+            (e.g. iter_results over the part files)
+
+    Yields:
+        Per-frame records in the regular analyzer schema, one at a time
+    """
+    stitcher = TrackStitcher()
+    for frames in segments:
+        stitcher.start_segment()
+        for frame in frames:
+            yield stitcher.map_frame(frame)
+
+
+def write_merged(output_file: str, records, output_format: str = None) -> dict:
+    """Write a merged record stream and return its frame count and last frame_count"""
+    written = {'output_file': output_file, 'frames': 0, 'last_frame_count': None}
+
+    def counted():
+        for record in records:
+            written['frames'] += 1
+            written['last_frame_count'] = record['frame_count']
+            yield record
+
+    write_results(output_file, counted(), output_format)
+    return written
+
+
+def make_parts_dir(output_file: str) -> str:
+    """Temporary directory for the workers' part files, next to the output"""
+    return tempfile.mkdtemp(prefix='.parts-', dir=os.path.dirname(os.path.abspath(output_file)))
+
+
+def analyze_video_parallel(video_path: str, output_file: str = "simplified_analysis.json",
+                           num_workers: int = None, segment_seconds: float = 300,
+                           stride: int = 1, analysis_fps: float = None,
+                           batch_emotions: bool = True, output_format: str = None,
+                           emotion_refresh: str = 'adaptive', max_staleness: int = 30,
+                           scoring_config: dict = None, detection_scale: float = 1.0,
+                           emotion_options: dict = None) -> dict:
+    """
+    Analyze a recording in parallel time segments and save the merged results
+
+    Every worker streams its segment to a JSONL part file; the parts are
+    then stitched and written to output_file one record at a time, so
+    neither the workers nor the parent hold the session in memory.
+
+    Args:
+        video_path: Path to the video file
+        output_file: Path to save the merged analysis
+        num_workers: Number of worker processes (default: CPU count)
+        segment_seconds: Length of each segment
+        stride: Analyze every stride-th frame
+        analysis_fps: Target analysis rate (overrides stride)
+        batch_emotions: Use batched emotion inference in the workers
+        output_format: 'json', 'jsonl' or 'columnar' (default: from the output_file extension)
+        emotion_refresh: Emotion refresh policy of the workers
+        max_staleness: Longest reuse of an emotion result (adaptive policy)
+        scoring_config: State scoring rules of the workers (see rescoring)
+        detection_scale: Face Mesh input resolution relative to the frame
+        emotion_options: Emotion backend of the workers (emotion_backend,
+            onnx_model, onnx_threads keyword arguments of SimplifiedAnalyzer)
+
+    Returns:
+        Dict with output_file, frames (number of merged frame records) and
+        last_frame_count, or None if the video could not be opened
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        print(f"Error: Could not open video source {video_path}")
+        return None
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    stride = resolve_stride(fps, stride, analysis_fps)
+    segments = plan_segments(total_frames, fps, segment_seconds, stride=stride)
+    num_workers = num_workers or os.cpu_count() or 1
+
+    print(f"Parallel analysis: {len(segments)} segment(s) of {video_path} on {num_workers} worker(s)")
+
+    parts_dir = make_parts_dir(output_file)
+    tasks = [{
+        'video_path': video_path,
+        'part_file': os.path.join(parts_dir, f'segment-{index:05d}.jsonl'),
+        'segment_index': index,
+        'start_frame': start,
+        'end_frame': end,
+        'stride': stride,
+        'batch_emotions': batch_emotions,
+        'emotion_refresh': emotion_refresh,
+        'max_staleness': max_staleness,
+        'scoring_config': scoring_config,
+        'detection_scale': detection_scale,
+        'emotion_options': emotion_options or {}
+    } for index, (start, end) in enumerate(segments)]
+
+    start_time = time.time()
+    try:
+        # TensorFlow and MediaPipe are not fork-safe, always start fresh workers
+        context = multiprocessing.get_context('spawn')
+        # Workers load and warm up their models once, then reuse them for every segment
+        with ProcessPoolExecutor(max_workers=num_workers, mp_context=context,
+                                 initializer=preload_models, initargs=(1, batch_emotions, None, emotion_options)) as pool:
+            results = sorted(pool.map(analyze_segment, tasks), key=lambda r: r['segment_index'])
+
+        merged = stitch_segments(iter_results(result['part_file']) for result in results)
+        written = write_merged(output_file, merged, output_format)
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+
+    elapsed = time.time() - start_time
+    print(f"Parallel analysis complete in {elapsed:.1f}s: {written['frames']} frames saved to {output_file}")
+    return written
+
+
+def analyze_tile_group(task: dict) -> dict:
+    """Worker entry point: analyze a group of gallery tiles over the whole recording into its part file"""
+    analyzer = SimplifiedAnalyzer(
+        video_source=task['video_path'],
+        output_file=task['part_file'],
+        batch_emotions=task['batch_emotions'],
+        output_format='jsonl',  # Streamed to disk, nothing kept in memory
+        emotion_refresh=task['emotion_refresh'],
+        max_staleness=task['max_staleness'],
+        scoring_config=task['scoring_config'],
+        detection_scale=task['detection_scale'],
+        tiles=task['tiles'],
+        **task['emotion_options']
+    )
+    analyzer.run_analysis(
+        headless=True,
+        progress_callback=lambda progress: None,
+        stride=task['stride']
+    )
+    analyzer.release_models()
+    return {
+        'group_index': task['group_index'],
+        'part_file': task['part_file']
+    }
+
+
+def merge_tile_groups(groups):
+    """
+    Merge the per-frame results of tile groups that analyzed the same frames
+
+    Every group is read in frame order, so the merge only holds one frame
+    per group at a time. Faces are concatenated (ordered by tile index) and
+    summary counts summed.
+
+    Args:
+        groups: Frame record iterables of the groups, each in frame order
+
+    Yields:
+        Merged per-frame records in frame order
+    """
+    frames = heapq.merge(*groups, key=lambda frame: frame['frame_count'])
+    for _, same_frame in itertools.groupby(frames, key=lambda frame: frame['frame_count']):
+        record = next(same_frame)
+        for frame in same_frame:
+            record['faces'].extend(frame['faces'])
+            for key, value in frame['summary'].items():
+                record['summary'][key] += value
+        record['faces'].sort(key=lambda face: face['face_id'])
+        yield record
+
+
+def analyze_gallery_parallel(video_path: str, output_file: str = "simplified_analysis.json",
+                             num_workers: int = None, layout: dict = None,
+                             stride: int = 1, analysis_fps: float = None,
+                             batch_emotions: bool = True, output_format: str = None,
+                             emotion_refresh: str = 'adaptive', max_staleness: int = 30,
+                             scoring_config: dict = None, detection_scale: float = 1.0,
+                             emotion_options: dict = None) -> dict:
+    """
+    Analyze a gallery-view recording tile by tile in parallel workers
+
+    Every worker streams its tiles to a JSONL part file, and the parts are
+    merged frame by frame into output_file.
+
+    Args:
+        video_path: Path to the video file
+        output_file: Path to save the merged analysis
+        num_workers: Number of worker processes (default: CPU count, at most one per tile)
+        layout: Gallery layout (see gallery_layout); detected from sampled frames if None
+        stride, analysis_fps, batch_emotions, output_format, emotion_refresh,
+        max_staleness, scoring_config, detection_scale, emotion_options: As in
+            analyze_video_parallel
+
+    Returns:
+        Dict with output_file, frames and last_frame_count as in
+        analyze_video_parallel (face_id being the tile index), or None if
+        the video could not be opened
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        print(f"Error: Could not open video source {video_path}")
+        return None
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+
+    if layout is None:
+        layout = detect_gallery_layout(sample_frames(video_path))
+    tiles = layout['tiles']
+    stride = resolve_stride(fps, stride, analysis_fps)
+    num_workers = min(num_workers or os.cpu_count() or 1, len(tiles))
+
+    print(f"Gallery analysis: {len(tiles)} tile(s) of {video_path} on {num_workers} worker(s)")
+
+    # Round-robin keeps the groups balanced when the last grid row is short
+    parts_dir = make_parts_dir(output_file)
+    tasks = [{
+        'video_path': video_path,
+        'part_file': os.path.join(parts_dir, f'tiles-{group:03d}.jsonl'),
+        'group_index': group,
+        'tiles': {index: tiles[index] for index in range(group, len(tiles), num_workers)},
+        'stride': stride,
+        'batch_emotions': batch_emotions,
+        'emotion_refresh': emotion_refresh,
+        'max_staleness': max_staleness,
+        'scoring_config': scoring_config,
+        'detection_scale': detection_scale,
+        'emotion_options': emotion_options or {}
+    } for group in range(num_workers)]
+
+    start_time = time.time()
+    try:
+        if num_workers == 1:
+            results = [analyze_tile_group(tasks[0])]
+        else:
+            # TensorFlow and MediaPipe are not fork-safe, always start fresh workers
+            context = multiprocessing.get_context('spawn')
+            tiles_per_worker = -(-len(tiles) // num_workers)
+            with ProcessPoolExecutor(max_workers=num_workers, mp_context=context, initializer=preload_models,
+                                     initargs=(tiles_per_worker, batch_emotions, TILE_FACE_MESH_OPTIONS, emotion_options)) as pool:
+                results = list(pool.map(analyze_tile_group, tasks))
+
+        merged = merge_tile_groups(iter_results(result['part_file']) for result in results)
+        written = write_merged(output_file, merged, output_format)
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+
+    elapsed = time.time() - start_time
+    print(f"Gallery analysis complete in {elapsed:.1f}s: {written['frames']} frames saved to {output_file}")
+    return written
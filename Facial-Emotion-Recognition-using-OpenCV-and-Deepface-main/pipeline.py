@@ -0,0 +1,230 @@
+"""
+Pipelined execution of the simplified analyzer
+
+Decoding, landmark detection and emotion inference run in their own threads
+connected by bounded queues, while the calling thread handles drawing,
+display and encoding. OpenCV, MediaPipe and the emotion model release the GIL
+during their heavy work, so the stages overlap instead of leaving the CPU idle
+while one of them waits. Every stage is a single thread consuming a FIFO
+queue, so frames come out in the same order, with the same frame_count and
+timestamp values, as in the sequential loop.
+
+Each piece of per-track state has one owner thread: the tracker belongs to the
+landmark stage, and the emotion cache to the emotion stage. Tracks that expire
+in the landmark stage travel with their frame to the emotion stage, which
+evicts them from the cache before analyzing that frame, so the two threads
+never mutate the same structure.
+"""
+
+import queue
+import threading
+import time
+
+# Marks the end of the stream in the stage queues
+_END = object()
+
+
+class StageStats:
+    """Throughput counters for one pipeline stage"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy_seconds = 0.0  # Time spent doing the stage's work
+        self.wait_seconds = 0.0  # Time blocked on the input or output queue
+        self.started_at = None
+        self.finished_at = None
+
+    def as_dict(self) -> dict:
+        wall = ((self.finished_at or time.time()) - self.started_at) if self.started_at else 0.0
+        return {
+            'stage': self.name,
+            'items': self.items,
+            'busy_seconds': self.busy_seconds,
+            'wait_seconds': self.wait_seconds,
+            'items_per_second': self.items / wall if wall > 0 else 0.0,
+            'busy_items_per_second': self.items / self.busy_seconds if self.busy_seconds > 0 else 0.0
+        }
+
+
+class AnalysisPipeline:
+    """Run SimplifiedAnalyzer as decoder / landmark / emotion / output stages"""
+
+    def __init__(self, analyzer, queue_size: int = 8):
+        """
+        Args:
+            analyzer: SimplifiedAnalyzer whose stage methods are used
+            queue_size: Capacity of each inter-stage queue (backpressure bound)
+        """
+        self.analyzer = analyzer
+        self.queue_size = queue_size
+        self.stats = {name: StageStats(name) for name in ('decode', 'landmarks', 'emotions', 'output')}
+        self._stop = threading.Event()
+        self._error = None
+        self._threads = []
+        self._detected = None  # Landmark -> emotion queue of the running pipeline
+
+    def _put(self, target: queue.Queue, item, stats: StageStats) -> bool:
+        """Blocking put that gives up when the pipeline is stopped"""
+        wait_start = time.time()
+        while not self._stop.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                stats.wait_seconds += time.time() - wait_start
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, source: queue.Queue, stats: StageStats):
+        wait_start = time.time()
+        while not self._stop.is_set():
+            try:
+                item = source.get(timeout=0.1)
+                stats.wait_seconds += time.time() - wait_start
+                return item
+            except queue.Empty:
+                continue
+        return _END
+
+    def _run_stage(self, stats: StageStats, produce, output: queue.Queue):
+        """Thread body: push the items returned by produce() downstream, then _END"""
+        stats.started_at = time.time()
+        items = produce()
+        try:
+            for item in items:
+                if not self._put(output, item, stats):
+                    break
+        except Exception as e:
+            self._error = e
+            self._stop.set()
+        finally:
+            items.close()  # An item that was not delivered is abandoned at its yield
+            stats.finished_at = time.time()
+            # Make sure the next stage always sees the end of the stream
+            try:
+                output.put_nowait(_END)
+            except queue.Full:
+                self._put(output, _END, stats)
+
+    def _decode(self, cap, stride, start_frame, end_frame):
+        stats = self.stats['decode']
+        frames = self.analyzer.read_frames(cap, stride, start_frame, end_frame)
+        while not self._stop.is_set():
+            work_start = time.time()
+            item = next(frames, _END)
+            stats.busy_seconds += time.time() - work_start
+            if item is _END:
+                return
+            stats.items += 1
+            yield item
+
+    def _landmarks(self, source: queue.Queue):
+        stats = self.stats['landmarks']
+        while True:
+            item = self._get(source, stats)
+            if item is _END:
+                return
+            frame_index, timestamp, frame = item
+            work_start = time.time()
+            results = self.analyzer.new_frame_result(timestamp, frame_index)
+            faces = self.analyzer.detect_faces(frame, results)
+            expired = self.analyzer.take_expired_tracks()
+            stats.busy_seconds += time.time() - work_start
+            stats.items += 1
+            try:
+                yield frame, results, faces, expired
+            except GeneratorExit:
+                # Not delivered: give the expired ids back for stop() to evict
+                self.analyzer.expired_tracks.extend(expired)
+                raise
+
+    def _emotions(self, source: queue.Queue):
+        stats = self.stats['emotions']
+        while True:
+            item = self._get(source, stats)
+            if item is _END:
+                return
+            frame, results, faces, expired = item
+            work_start = time.time()
+            if expired:
+                self.analyzer.emotion_cache.evict(expired)
+            self.analyzer.analyze_emotions(faces)
+            self.analyzer.score_faces(results, faces)
+            self.analyzer.store_result(results)
+            stats.busy_seconds += time.time() - work_start
+            stats.items += 1
+            yield frame, results
+
+    def run(self, cap, stride: int = 1, start_frame: int = 0, end_frame: int = None):
+        """
+        Start the worker stages and yield (frame, analysis) in frame order
+
+        The caller is the output stage; it should report its own work through
+        record_output() and call stop() (or close the generator) if it ends
+        early, so the stages are shut down before the results are saved.
+        """
+        # Expired tracks are evicted by the emotion stage (see _emotions)
+        self.analyzer.expired_tracks = []
+        decoded = queue.Queue(maxsize=self.queue_size)
+        detected = self._detected = queue.Queue(maxsize=self.queue_size)
+        analyzed = queue.Queue(maxsize=self.queue_size)
+
+        stages = [
+            (self.stats['decode'], lambda: self._decode(cap, stride, start_frame, end_frame), decoded),
+            (self.stats['landmarks'], lambda: self._landmarks(decoded), detected),
+            (self.stats['emotions'], lambda: self._emotions(detected), analyzed)
+        ]
+        for stats, produce, output in stages:
+            thread = threading.Thread(target=self._run_stage, args=(stats, produce, output),
+                                      name=f"analysis-{stats.name}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+        output_stats = self.stats['output']
+        output_stats.started_at = time.time()
+        try:
+            while True:
+                item = self._get(analyzed, output_stats)
+                if item is _END:
+                    break
+                output_stats.items += 1
+                yield item
+        finally:
+            self.stop()
+
+        if self._error is not None:
+            raise self._error
+
+    def record_output(self, seconds: float):
+        """Account time spent by the caller drawing, displaying or encoding"""
+        self.stats['output'].busy_seconds += seconds
+
+    def stop(self):
+        """
+        Stop all stages, wait for their threads and hand the tracker and
+        emotion cache back to the calling thread (safe to call repeatedly)
+        """
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        output_stats = self.stats['output']
+        if output_stats.started_at is not None and output_stats.finished_at is None:
+            output_stats.finished_at = time.time()
+        # Back to immediate eviction. Tracks expired by the landmark stage that
+        # the emotion stage did not get to (still pending, or travelling with a
+        # frame that will not be analyzed) are evicted here.
+        if self.analyzer.expired_tracks is not None:
+            leftover, self.analyzer.expired_tracks = self.analyzer.expired_tracks, None
+            while self._detected is not None:
+                try:
+                    item = self._detected.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _END:
+                    leftover.extend(item[3])
+            if leftover:
+                self.analyzer.emotion_cache.evict(leftover)
+
+    def stats_summary(self) -> list:
+        return [stats.as_dict() for stats in self.stats.values()]
@@ -0,0 +1,171 @@
+"""
+Real-time analysis of live sources under a latency budget
+
+In the regular loop every frame is analyzed in order, so when analysis is
+slower than the camera the backlog, and with it the latency, grows without
+bound. In real-time mode a capture thread keeps reading the camera and only
+holds on to the newest frame; the analyzer always takes the freshest frame,
+and frames that were replaced before the analyzer got to them are dropped.
+A frame that is already older than the latency budget when it is picked up
+is dropped as well.
+
+Under load the controller degrades the emotion refresh rate (see
+EmotionCache.set_load_factor) so that the per-frame work shrinks, and
+restores it when latency is back well under budget.
+"""
+
+import threading
+import time
+
+from instrumentation import LatencyHistogram
+
+
+class LatestFrameGrabber:
+    """Capture thread that keeps only the newest frame of a source"""
+
+    def __init__(self, cap, pace_fps: float = None):
+        """
+        Args:
+            cap: Opened cv2.VideoCapture
+            pace_fps: Read at most this many frames per second (used to play
+                video files back at their native rate, like a camera)
+        """
+        self.cap = cap
+        self.pace_fps = pace_fps
+        self.captured = 0  # Frames read from the source
+        self.replaced = 0  # Frames overwritten before the analyzer took them
+        self._latest = None
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._finished = False
+        self._thread = threading.Thread(target=self._run, name='realtime-capture', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        interval = 1.0 / self.pace_fps if self.pace_fps else 0.0
+        next_read = time.perf_counter()
+        frame_index = 0
+        while not self._stopped:
+            if interval:
+                delay = next_read - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                next_read += interval
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            captured_at = time.perf_counter()
+            with self._condition:
+                if self._latest is not None:
+                    self.replaced += 1
+                self._latest = (frame_index, captured_at, frame)
+                self.captured += 1
+                self._condition.notify()
+            frame_index += 1
+        with self._condition:
+            self._finished = True
+            self._condition.notify_all()
+
+    def next_frame(self, timeout: float = 1.0):
+        """
+        Newest frame not handed out yet, as (frame_index, captured_at, frame)
+
+        Blocks until a frame arrives; returns None when the source ended.
+        """
+        with self._condition:
+            while self._latest is None:
+                if self._finished or self._stopped:
+                    return None
+                self._condition.wait(timeout)
+            item, self._latest = self._latest, None
+            return item
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self._thread.join(timeout=5)
+
+
+class RealtimeController:
+    """Track end-to-end latency against a budget and pick the degradation level"""
+
+    def __init__(self, latency_budget: float = 0.25, max_level: int = 4, smoothing: float = 0.2,
+                 recover_fraction: float = 0.6):
+        """
+        Args:
+            latency_budget: Target capture-to-result latency in seconds
+            max_level: Highest degradation level (load factor 2 ** level)
+            smoothing: Weight of the newest sample in the latency moving average
+            recover_fraction: Step back down once the average is below this
+                fraction of the budget
+        """
+        self.latency_budget = latency_budget
+        self.max_level = max_level
+        self.smoothing = smoothing
+        self.recover_fraction = recover_fraction
+        self.level = 0
+        self.average_latency = None
+        self.stale_dropped = 0
+        self.analyzed = 0
+        self.within_budget = 0
+        self.level_frames = [0] * (max_level + 1)
+        self.latency = LatencyHistogram()
+
+    @property
+    def load_factor(self) -> float:
+        return float(2 ** self.level)
+
+    def is_stale(self, captured_at: float) -> bool:
+        """True (and counted) if a frame is already past the budget when picked up"""
+        if time.perf_counter() - captured_at > self.latency_budget:
+            self.stale_dropped += 1
+            return True
+        return False
+
+    def record(self, captured_at: float) -> bool:
+        """
+        Account one analyzed frame
+
+        Returns:
+            True when the degradation level changed
+        """
+        latency = time.perf_counter() - captured_at
+        self.latency.record(latency)
+        self.analyzed += 1
+        if latency <= self.latency_budget:
+            self.within_budget += 1
+        self.level_frames[self.level] += 1
+
+        if self.average_latency is None:
+            self.average_latency = latency
+        else:
+            self.average_latency += self.smoothing * (latency - self.average_latency)
+
+        previous = self.level
+        if self.average_latency > self.latency_budget and self.level < self.max_level:
+            self.level += 1
+            self.average_latency = self.latency_budget  # Give the new level time to take effect
+        elif self.average_latency < self.recover_fraction * self.latency_budget and self.level > 0:
+            self.level -= 1
+            self.average_latency = self.recover_fraction * self.latency_budget
+        return self.level != previous
+
+    def summary(self, grabber: LatestFrameGrabber) -> dict:
+        latency = self.latency.as_dict()
+        latency.pop('buckets', None)
+        return {
+            'latency_budget': self.latency_budget,
+            'captured_frames': grabber.captured,
+            'analyzed_frames': self.analyzed,
+            'dropped_frames': grabber.replaced + self.stale_dropped,
+            'dropped_replaced': grabber.replaced,
+            'dropped_stale': self.stale_dropped,
+            'latency': latency,
+            'within_budget_fraction': self.within_budget / self.analyzed if self.analyzed else None,
+            'degradation_level': self.level,
+            'frames_per_level': list(self.level_frames)
+        }
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Offline re-scoring of stored analyzer results
+
+The confusion / disengagement / engagement scores are sums of weighted
+threshold rules over the raw per-face inputs (emotion probabilities, eye
+aspect ratio, gaze flag and head tilt). The rules live in a scoring config
+shared by SimplifiedAnalyzer and by the vectorized evaluator below, so a
+stored session (columnar, JSON or JSONL) can be re-scored with new
+thresholds without re-running the vision pipeline.
+
+A rule is a dict {'feature', 'op', 'threshold', 'weight'}; ops are
+'>', '<', 'between' (exclusive, threshold = [low, high]), 'is_true' and
+'is_false'. Features are emotion names or engagement metric names.
+"""
+
+import copy
+import json
+import os
+import shutil
+
+import numpy as np
+
+from columnar_results import STATE_LABELS
+from emotion_model import EMOTION_LABELS
+
+DEFAULT_SCORING_CONFIG = {
+    'confusion': {
+        'rules': [
+            # Emotion-based confusion indicators (angry, disgust, fear)
+            {'feature': 'angry', 'op': '>', 'threshold': 0.3, 'weight': 0.4},
+            {'feature': 'disgust', 'op': '>', 'threshold': 0.2, 'weight': 0.3},
+            {'feature': 'fear', 'op': '>', 'threshold': 0.2, 'weight': 0.3},
+            # Head tilting indicates confusion
+            {'feature': 'head_tilt', 'op': '>', 'threshold': 0.3, 'weight': 0.4},
+            # Sadness can indicate confusion
+            {'feature': 'sad', 'op': '>', 'threshold': 0.3, 'weight': 0.2}
+        ],
+        'min': None,
+        'max': 1.0
+    },
+    'disengagement': {
+        'rules': [
+            # Gaze off screen is primary disengagement indicator
+            {'feature': 'gaze_off_screen', 'op': 'is_true', 'threshold': None, 'weight': 0.5},
+            {'feature': 'neutral', 'op': '>', 'threshold': 0.8, 'weight': 0.3},
+            {'feature': 'sad', 'op': '>', 'threshold': 0.2, 'weight': 0.2},
+            {'feature': 'happy', 'op': '<', 'threshold': 0.1, 'weight': 0.2},
+            # Eyes half-closed, looking away
+            {'feature': 'eye_aspect_ratio', 'op': '<', 'threshold': 0.15, 'weight': 0.3},
+            {'feature': 'head_tilt', 'op': '>', 'threshold': 0.2, 'weight': 0.2}
+        ],
+        'min': None,
+        'max': 1.0
+    },
+    'engagement': {
+        'rules': [
+            # Moderate neutral is engaged, some happiness / surprise
+            {'feature': 'neutral', 'op': 'between', 'threshold': [0.3, 0.7], 'weight': 0.4},
+            {'feature': 'happy', 'op': '>', 'threshold': 0.2, 'weight': 0.3},
+            {'feature': 'surprise', 'op': '>', 'threshold': 0.1, 'weight': 0.2},
+            # Forward gaze, looking forward, eyes open and alert
+            {'feature': 'gaze_off_screen', 'op': 'is_false', 'threshold': None, 'weight': 0.4},
+            {'feature': 'head_tilt', 'op': '<', 'threshold': 0.2, 'weight': 0.3},
+            {'feature': 'eye_aspect_ratio', 'op': '>', 'threshold': 0.2, 'weight': 0.3},
+            # Low negative emotions
+            {'feature': 'angry', 'op': '<', 'threshold': 0.2, 'weight': 0.1},
+            {'feature': 'sad', 'op': '<', 'threshold': 0.2, 'weight': 0.1}
+        ],
+        'min': 0.0,
+        'max': 1.0
+    },
+    'dominant_state': {
+        # If no state is strong enough, default to engaged
+        'min_confidence': 0.2,
+        'default_state': 'engaged',
+        'default_confidence': 0.5
+    }
+}
+
+
+def load_scoring_config(path: str = None) -> dict:
+    """Default scoring config, with sections overridden from a JSON file"""
+    config = copy.deepcopy(DEFAULT_SCORING_CONFIG)
+    if path:
+        with open(path) as f:
+            overrides = json.load(f)
+        for section, values in overrides.items():
+            config.setdefault(section, {}).update(values)
+    return config
+
+
+def _feature_value(feature: str, emotions: dict, engagement_metrics: dict):
+    if feature in EMOTION_LABELS:
+        return emotions.get(feature, 0)
+    if feature == 'gaze_off_screen':
+        return engagement_metrics.get(feature, False)
+    return engagement_metrics.get(feature, 0)
+
+
+def _rule_matches(op: str, value, threshold):
+    """Rule test; works on scalars and on NumPy arrays"""
+    if op == '>':
+        return value > threshold
+    if op == '<':
+        return value < threshold
+    if op == 'between':
+        return (threshold[0] < value) & (value < threshold[1])
+    if op == 'is_true':
+        return value == True  # noqa: E712 - also used element-wise on arrays
+    if op == 'is_false':
+        return value == False  # noqa: E712
+    raise ValueError(f"Unknown rule op: {op}")
+
+
+def _clamp(score, section: dict):
+    if section.get('max') is not None:
+        score = np.minimum(score, section['max']) if isinstance(score, np.ndarray) else min(score, section['max'])
+    if section.get('min') is not None:
+        score = np.maximum(score, section['min']) if isinstance(score, np.ndarray) else max(section['min'], score)
+    return score
+
+
+def score_face(section: dict, emotions: dict, engagement_metrics: dict) -> float:
+    """Evaluate one score section for a single face"""
+    score = 0.0
+    for rule in section['rules']:
+        value = _feature_value(rule['feature'], emotions, engagement_metrics)
+        if _rule_matches(rule['op'], value, rule['threshold']):
+            score += rule['weight']
+    return _clamp(score, section)
+
+
+def dominant_state(config: dict, confusion: float, disengagement: float, engagement: float) -> tuple:
+    """Pick the dominant state for a single face"""
+    states = {
+        'confused': confusion,
+        'disengaged': disengagement,
+        'engaged': engagement
+    }
+    state = max(states, key=states.get)
+    confidence = states[state]
+
+    rules = config['dominant_state']
+    if confidence < rules['min_confidence']:
+        return rules['default_state'], rules['default_confidence']
+    return state, confidence
+
+
+def score_arrays(features: dict, config: dict = None) -> dict:
+    """
+    Vectorized scoring of many faces at once
+
+    Args:
+        features: Dict with 'emotions' (N, 7, EMOTION_LABELS order),
+            'eye_aspect_ratio', 'gaze_off_screen' and 'head_tilt' (N,)
+        config: Scoring config (default: DEFAULT_SCORING_CONFIG)
+
+    Returns:
+        Dict of (N,) arrays: confusion_score, disengagement_score,
+        engagement_score, state (STATE_LABELS index) and state_confidence
+    """
+    config = config or DEFAULT_SCORING_CONFIG
+    emotions = np.asarray(features['emotions'], dtype=np.float64)
+    count = len(emotions)
+
+    def column(feature):
+        if feature in EMOTION_LABELS:
+            return emotions[:, EMOTION_LABELS.index(feature)]
+        if feature == 'gaze_off_screen':
+            return np.asarray(features[feature], dtype=bool)
+        return np.asarray(features[feature], dtype=np.float64)
+
+    scores = {}
+    for name in ('confusion', 'disengagement', 'engagement'):
+        section = config[name]
+        score = np.zeros(count, dtype=np.float64)
+        for rule in section['rules']:
+            score += np.where(_rule_matches(rule['op'], column(rule['feature']), rule['threshold']), rule['weight'], 0.0)
+        scores[f"{name}_score"] = _clamp(score, section)
+
+    # Same tie-breaking order as dominant_state: confused, disengaged, engaged
+    stacked = np.stack([scores['confusion_score'], scores['disengagement_score'], scores['engagement_score']], axis=1)
+    order = ['confused', 'disengaged', 'engaged']
+    best = np.argmax(stacked, axis=1) if count else np.empty(0, dtype=np.int64)
+    confidence = stacked[np.arange(count), best] if count else np.empty(0)
+
+    rules = config['dominant_state']
+    state_codes = np.array([STATE_LABELS.index(state) for state in order], dtype=np.int8)[best]
+    weak = confidence < rules['min_confidence']
+    state_codes[weak] = STATE_LABELS.index(rules['default_state'])
+    confidence = np.where(weak, rules['default_confidence'], confidence)
+
+    scores['state'] = state_codes
+    scores['state_confidence'] = confidence
+    return scores
+
+
+def load_features(path: str) -> dict:
+    """Raw per-face scoring inputs of a result set (columnar, JSON or JSONL)"""
+    from columnar_results import is_columnar, load_columnar
+    from result_io import iter_results
+
+    if is_columnar(path):
+        faces = load_columnar(path)['faces']
+        return {name: faces[name] for name in ('face_id', 'emotions', 'eye_aspect_ratio', 'gaze_off_screen', 'head_tilt')}
+
+    rows = {'face_id': [], 'emotions': [], 'eye_aspect_ratio': [], 'gaze_off_screen': [], 'head_tilt': []}
+    for frame in iter_results(path):
+        for face in frame.get('faces', []):
+            metrics = face.get('engagement_metrics', {})
+            rows['face_id'].append(face['face_id'])
+            rows['emotions'].append([face['emotions'].get(label, 0.0) for label in EMOTION_LABELS])
+            rows['eye_aspect_ratio'].append(metrics.get('eye_aspect_ratio', 0.0))
+            rows['gaze_off_screen'].append(metrics.get('gaze_off_screen', False))
+            rows['head_tilt'].append(metrics.get('head_tilt', 0.0))
+    return {
+        'face_id': np.asarray(rows['face_id'], dtype=np.int32),
+        'emotions': np.asarray(rows['emotions'], dtype=np.float64).reshape(-1, len(EMOTION_LABELS)),
+        'eye_aspect_ratio': np.asarray(rows['eye_aspect_ratio'], dtype=np.float64),
+        'gaze_off_screen': np.asarray(rows['gaze_off_screen'], dtype=bool),
+        'head_tilt': np.asarray(rows['head_tilt'], dtype=np.float64)
+    }
+
+
+def state_percentages(face_ids: np.ndarray, states: np.ndarray) -> dict:
+    """Share of frames (in %) spent in each state, per face_id"""
+    ids, inverse = np.unique(face_ids, return_inverse=True)
+    counts = np.zeros((len(ids), len(STATE_LABELS)), dtype=np.int64)
+    np.add.at(counts, (inverse, states.astype(np.int64)), 1)
+    totals = counts.sum(axis=1, keepdims=True)
+    shares = 100.0 * counts / np.maximum(totals, 1)
+    return {str(face_id): {label: float(shares[i, j]) for j, label in enumerate(STATE_LABELS)}
+            for i, face_id in enumerate(ids)}
+
+
+def rescore_session(path: str, config: dict = None) -> dict:
+    """Re-score a stored session; returns the new score arrays plus face_id"""
+    features = load_features(path)
+    scores = score_arrays(features, config)
+    scores['face_id'] = np.asarray(features['face_id'])
+    return scores
+
+
+def write_rescored(source: str, destination: str, scores: dict, config: dict):
+    """Copy a columnar result set, replacing its score and state columns"""
+    from columnar_results import FACE_COLUMNS
+
+    shutil.copytree(source, destination, dirs_exist_ok=True)
+    for name in ('confusion_score', 'disengagement_score', 'engagement_score', 'state', 'state_confidence'):
+        np.save(os.path.join(destination, f"faces.{name}.npy"), scores[name].astype(FACE_COLUMNS[name]))
+
+    meta_path = os.path.join(destination, 'meta.json')
+    with open(meta_path) as f:
+        meta = json.load(f)
+    meta['scoring_config'] = config
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f, indent=2)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Re-score stored analysis sessions with a new threshold configuration')
+    parser.add_argument('sessions', nargs='+', help='Columnar (.cols), JSON or JSONL result sets')
+    parser.add_argument('--config', type=str, help='JSON file overriding sections of the default scoring config')
+    parser.add_argument('--output-dir', type=str, help='Write re-scored columnar copies of columnar sessions here')
+    parser.add_argument('--dump-default-config', action='store_true', help='Print the default scoring config and exit')
+    args = parser.parse_args()
+
+    if args.dump_default_config:
+        print(json.dumps(DEFAULT_SCORING_CONFIG, indent=2))
+        return
+
+    from columnar_results import is_columnar
+
+    config = load_scoring_config(args.config)
+    for path in args.sessions:
+        scores = rescore_session(path, config)
+        print(f"{path}: {len(scores['state'])} face rows")
+        for face_id, shares in state_percentages(scores['face_id'], scores['state']).items():
+            print(f"  face {face_id}: E={shares['engaged']:.1f}% D={shares['disengaged']:.1f}% C={shares['confused']:.1f}%")
+
+        if args.output_dir and is_columnar(path):
+            destination = os.path.join(args.output_dir, os.path.basename(path.rstrip('/\\')))
+            write_rescored(path, destination, scores, config)
+            print(f"  re-scored copy written to {destination}")
+
+
+if __name__ == "__main__":
+    main()
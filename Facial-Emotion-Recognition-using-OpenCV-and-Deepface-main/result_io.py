@@ -0,0 +1,225 @@
+"""
+Result writers and readers for the simplified analyzer
+
+Three on-disk formats are supported:
+- JSON: one pretty-printed array of frame records (the original format)
+- JSONL: one compact frame record per line, appended as frames are produced
+- columnar: a directory of typed .npy columns (see columnar_results)
+
+The JSONL writer keeps nothing in memory, so memory use stays flat however
+long the recording is. write_results also writes JSON arrays record by
+record, so a record stream (e.g. merged worker outputs) is never
+materialized. iter_results reads any format record by record.
+
+Instrumented runs end with a run summary record (record_type 'run_summary')
+holding stage latency histograms; iter_results only yields frame records,
+read_run_summary returns the summary.
+"""
+
+import json
+import os
+import time
+
+# record_type of the run summary appended after the frame records
+RUN_SUMMARY_TYPE = 'run_summary'
+
+
+def detect_format(path: str) -> str:
+    """Output format implied by a file name ('jsonl', 'columnar' or 'json')"""
+    path = path.rstrip('/\\')
+    if path.endswith('.jsonl'):
+        return 'jsonl'
+    if path.endswith('.cols'):
+        return 'columnar'
+    return 'json'
+
+
+def open_result_writer(path: str, output_format: str = None):
+    """Open a streaming writer (JSONL or columnar) for frame records"""
+    output_format = output_format or detect_format(path)
+    if output_format == 'jsonl':
+        return JsonlResultWriter(path)
+    if output_format == 'columnar':
+        from columnar_results import ColumnarResultWriter
+        return ColumnarResultWriter(path)
+    raise ValueError(f"No streaming writer for output format '{output_format}'")
+
+
+class JsonlResultWriter:
+    """Append one compact JSON record per frame and flush periodically"""
+
+    def __init__(self, path: str, flush_every: int = 100, flush_interval: float = 5.0, append: bool = False):
+        """
+        Args:
+            path: Output file path
+            flush_every: Flush after this many records
+            flush_interval: Flush when this many seconds passed since the last flush
+            append: Append to an existing file instead of truncating it
+        """
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.records_written = 0
+        self._file = open(path, 'a' if append else 'w', encoding='utf-8')
+        self._pending = 0
+        self._last_flush = time.time()
+
+    def write(self, record: dict):
+        self._file.write(json.dumps(record, separators=(',', ':')))
+        self._file.write('\n')
+        self.records_written += 1
+        self._pending += 1
+
+        if self._pending >= self.flush_every or time.time() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self._file.flush()
+        self._pending = 0
+        self._last_flush = time.time()
+
+    def tell(self) -> int:
+        """Flush and return the number of bytes written so far"""
+        self.flush()
+        return self._file.tell()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_json_results(path: str, records):
+    """
+    Write frame records as one JSON array (the original format)
+
+    records can be any iterable; it is written one record at a time, with
+    the same layout as json.dump(records, indent=2).
+    """
+    with open(path, 'w') as f:
+        f.write('[')
+        empty = True
+        for record in records:
+            f.write('\n  ' if empty else ',\n  ')
+            # json.dumps escapes newlines inside strings, so every newline here is layout
+            f.write(json.dumps(record, indent=2).replace('\n', '\n  '))
+            empty = False
+        f.write(']' if empty else '\n]')
+
+
+def write_results(path: str, records, output_format: str = None):
+    """Write frame records in the format implied by output_format or the file name"""
+    output_format = output_format or detect_format(path)
+    if output_format == 'json':
+        write_json_results(path, records)
+        return
+
+    with open_result_writer(path, output_format) as writer:
+        for record in records:
+            writer.write(record)
+
+
+def _is_json_array(path: str) -> bool:
+    with open(path, 'r', encoding='utf-8') as f:
+        while True:
+            char = f.read(1)
+            if not char:
+                return False
+            if not char.isspace():
+                return char == '['
+
+
+def is_run_summary(record: dict) -> bool:
+    return record.get('record_type') == RUN_SUMMARY_TYPE
+
+
+def iter_results(path: str, include_summary: bool = False):
+    """
+    Yield frame records from a JSON, JSONL or columnar result set one at a time
+
+    JSONL files are streamed line by line; JSON arrays are parsed as a whole.
+    Run summary records are skipped unless include_summary is set.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+
+    if os.path.isdir(path):
+        from columnar_results import iter_columnar_records
+        yield from iter_columnar_records(path)
+        return
+
+    if _is_json_array(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for record in json.load(f):
+                if include_summary or not is_run_summary(record):
+                    yield record
+        return
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                record = json.loads(line)
+                if include_summary or not is_run_summary(record):
+                    yield record
+
+
+def read_run_summary(path: str) -> dict:
+    """Run summary of an instrumented result set (None if the run was not instrumented)"""
+    if os.path.isdir(path):
+        with open(os.path.join(path, 'meta.json')) as f:
+            return json.load(f).get(RUN_SUMMARY_TYPE)
+
+    summary = None
+    for record in iter_results(path, include_summary=True):
+        if is_run_summary(record):
+            summary = record
+    return summary
+
+
+def summarize_session(path: str) -> dict:
+    """
+    Per-face dominant state counts and the time span of a result set
+
+    Columnar result sets are aggregated with array operations; JSON and
+    JSONL files are read one record at a time.
+
+    Returns:
+        Dict with num_frames, first_timestamp, last_timestamp,
+        state_counts ({face_id: {state: frames}}) and frame_counts
+        ({face_id: frames})
+    """
+    if os.path.isdir(path):
+        from columnar_results import summarize_columnar
+        return summarize_columnar(path)
+
+    state_counts = {}
+    frame_counts = {}
+    num_frames = 0
+    first_timestamp = last_timestamp = None
+
+    for frame in iter_results(path):
+        if first_timestamp is None:
+            first_timestamp = frame.get("timestamp", 0)
+        last_timestamp = frame.get("timestamp", num_frames)
+        num_frames += 1
+
+        for face in frame.get("faces", []):
+            face_id = str(face["face_id"])
+            counts = state_counts.setdefault(face_id, {})
+            counts[face["dominant_state"]] = counts.get(face["dominant_state"], 0) + 1
+            frame_counts[face_id] = frame_counts.get(face_id, 0) + 1
+
+    return {
+        'num_frames': num_frames,
+        'first_timestamp': first_timestamp,
+        'last_timestamp': last_timestamp,
+        'state_counts': state_counts,
+        'frame_counts': frame_counts
+    }
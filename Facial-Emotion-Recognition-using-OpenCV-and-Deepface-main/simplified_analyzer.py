@@ -6,147 +6,166 @@ States: Engaged, Disengaged, Confused
 
 import cv2
 import numpy as np
-from deepface import DeepFace
-import mediapipe as mp
-from collections import defaultdict, deque
+import os
 import time
-import json
+
+import landmark_features
+from detection_frames import TILE_FACE_MESH_OPTIONS, DetectionFrameConverter
+from face_tracker import FaceTracker
+from emotion_cache import EmotionCache
+from realtime import LatestFrameGrabber, RealtimeController
+from checkpoint import (DEFAULT_CHECKPOINT_INTERVAL, REPLAY_FRAMES, checkpoint_path, load_checkpoint,
+                        remove_checkpoint, save_checkpoint)
+from instrumentation import RunInstrumentation
+from rescoring import DEFAULT_SCORING_CONFIG, dominant_state, load_scoring_config, score_face
+from pipeline import AnalysisPipeline
+from result_io import RUN_SUMMARY_TYPE, JsonlResultWriter, detect_format, open_result_writer, write_json_results
+from emotion_model import EMOTION_BACKENDS, default_emotion_result
+from model_registry import models
 
 class SimplifiedAnalyzer:
-    def __init__(self, video_source: str = None, output_file: str = "simplified_analysis.json"):
+    def __init__(self, video_source: str = None, output_file: str = "simplified_analysis.json",
+                 batch_emotions: bool = True, output_format: str = None,
+                 emotion_refresh: str = 'adaptive', max_staleness: int = 30,
+                 scoring_config: dict = None, detection_scale: float = 1.0,
+                 tiles: dict = None, emotion_backend: str = 'deepface',
+                 onnx_model: str = None, onnx_threads: int = None, instrument: bool = False):
         """
         Initialize the simplified analyzer with 3 states only
         
         Args:
             video_source: Path to MP4 file or 0 for webcam
             output_file: Path to save analysis results
+            batch_emotions: Run one emotion forward pass for all faces of a frame
+                instead of one DeepFace.analyze call (with re-detection) per face
+            output_format: 'json' (one array written at the end), 'jsonl'
+                (one record per frame streamed to disk, nothing kept in
+                memory) or 'columnar' (typed .npy columns in a directory).
+                Defaults to the format implied by output_file.
+            emotion_refresh: 'adaptive' refreshes a face's emotions when its
+                landmarks or ROI change enough or the result is older than
+                max_staleness steps; 'fixed' refreshes every 3rd frame
+            max_staleness: Longest time (analysis steps) an emotion result is reused
+            scoring_config: Rule thresholds for the 3 states (see rescoring);
+                defaults to DEFAULT_SCORING_CONFIG
+            detection_scale: Resolution of the Face Mesh input relative to the
+                frame (e.g. 0.5); emotion ROIs are still cropped at full resolution
+            tiles: Gallery mode, {tile_index: (x, y, w, h)} participant tiles
+                (see gallery_layout). Each tile gets its own single-face Face
+                Mesh and its tile index as face_id instead of tracking.
+            emotion_backend: Batched emotion backend, 'deepface' (Keras) or
+                'onnx' (ONNX Runtime, no TensorFlow import)
+            onnx_model: ONNX export of the emotion model (onnx backend)
+            onnx_threads: ONNX Runtime intra-op threads (onnx backend)
+            instrument: Time every stage into histograms and count emotion
+                inferences per face; the summary is appended to the output
+                as a run_summary record
         """
+        if emotion_backend != 'deepface' and not batch_emotions:
+            raise ValueError("The per-face DeepFace.analyze path only supports the deepface emotion backend")
         self.video_source = video_source or 0
         self.output_file = output_file
+        self.output_format = output_format or detect_format(output_file)
+        self.result_writer = None  # Streaming writer for the jsonl / columnar formats
         
-        # Initialize MediaPipe Face Mesh for engagement metrics
-        self.mp_face_mesh = mp.solutions.face_mesh
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
-            static_image_mode=False,
-            max_num_faces=5,
-            refine_landmarks=False,
-            min_detection_confidence=0.4,
-            min_tracking_confidence=0.4
-        )
+        # MediaPipe Face Mesh for engagement metrics, leased warmed up from the
+        # process-wide model registry (release_models() hands it back)
+        self.detection_scale = detection_scale
+        self.tiles = {int(index): tuple(int(v) for v in box) for index, box in tiles.items()} if tiles else None
+        if self.tiles:
+            # One participant per tile, so the face cap does not limit class size
+            self.face_mesh = None
+            self.tile_meshes = {index: models.acquire_face_mesh(TILE_FACE_MESH_OPTIONS) for index in self.tiles}
+            self.tile_frames = {index: DetectionFrameConverter(detection_scale) for index in self.tiles}
+        else:
+            self.face_mesh = models.acquire_face_mesh()
+            self.tile_meshes = {}
+            self.detection_frames = DetectionFrameConverter(detection_scale)  # Reused resize/RGB buffers
         
         # Face tracking and analysis storage
-        self.face_tracks = {}  # Track faces across frames
-        self.analysis_data = []  # Store time-series data
-        self.frame_count = 0
+        self.tracker = FaceTracker(on_expire=self.evict_tracks)
+        self.face_tracks = self.tracker.tracks  # Track faces across frames
+        self.expired_tracks = None  # Expired ids awaiting eviction by the emotion stage (pipelined runs)
+        self.analysis_data = []  # Store time-series data (json format only)
+        self.frame_count = 0  # Index of the current frame in the source video
+        self.analysis_step = 0  # Number of frames analyzed so far (tracking clock)
         self.start_time = time.time()
+        self.pipeline_stats = None  # Per-stage counters of the last pipelined run
+        self.realtime_stats = None  # Dropped frames and latency of the last real-time run
+        self.instrumentation = RunInstrumentation(enabled=instrument)  # Stage timers (no-op when disabled)
         
         # Performance optimization
-        self.emotion_analysis_interval = 3  # Analyze emotions every 3 frames
-        self.last_emotion_analysis = {}  # Cache last emotion results
+        self.emotion_analysis_interval = 3  # Refresh period of the fixed policy
+        self.emotion_cache = EmotionCache(  # Cache last emotion results per track
+            policy=emotion_refresh,
+            interval=self.emotion_analysis_interval,
+            max_staleness=max_staleness
+        )
         
         # Simplified thresholds for 3 states
+        self.scoring_config = scoring_config or DEFAULT_SCORING_CONFIG
         self.confusion_threshold = 0.4
         self.disengagement_threshold = 0.4
         self.engagement_threshold = 0.5
         
         # Model configuration
-        self.detector_backend = "opencv"  # Fast detector
+        self.detector_backend = "opencv"  # Fast detector (per-face path only)
+        self.batch_emotions = batch_emotions
+        self.emotion_options = {
+            'emotion_backend': emotion_backend,
+            'onnx_model': onnx_model,
+            'onnx_threads': onnx_threads
+        }
+        # Shared, already warmed up
+        self.emotion_model = models.emotion_model(**self.emotion_options) if batch_emotions else None
         
-        print(f"Using detector backend: {self.detector_backend}")
+        if batch_emotions:
+            print(f"Using batched emotion inference ({emotion_backend} backend)")
+        else:
+            print(f"Using detector backend: {self.detector_backend}")
         print("Simplified analyzer: Engaged, Disengaged, Confused")
         
+    def release_models(self):
+        """Hand the leased Face Mesh instances back to the model registry"""
+        if self.face_mesh is not None:
+            models.release_face_mesh(self.face_mesh)
+            self.face_mesh = None
+        for face_mesh in self.tile_meshes.values():
+            models.release_face_mesh(face_mesh, TILE_FACE_MESH_OPTIONS)
+        self.tile_meshes = {}
+    
     def calculate_eye_aspect_ratio(self, landmarks, eye_indices):
         """Calculate Eye Aspect Ratio for blink detection"""
-        eye_points = np.array([[landmarks[i].x, landmarks[i].y] for i in eye_indices])
-        
-        # Calculate distances
-        vertical_1 = np.linalg.norm(eye_points[1] - eye_points[5])
-        vertical_2 = np.linalg.norm(eye_points[2] - eye_points[4])
-        horizontal = np.linalg.norm(eye_points[0] - eye_points[3])
-        
-        ear = (vertical_1 + vertical_2) / (2.0 * horizontal)
-        return ear
+        return float(landmark_features.eye_aspect_ratio(
+            landmark_features.landmarks_to_array(landmarks), eye_indices))
     
     def calculate_gaze_direction(self, landmarks):
         """Calculate gaze direction from eye landmarks"""
-        # Simplified gaze calculation
-        left_eye_center = np.mean([
-            [landmarks[33].x, landmarks[33].y],
-            [landmarks[7].x, landmarks[7].y]
-        ], axis=0)
-        
-        right_eye_center = np.mean([
-            [landmarks[362].x, landmarks[362].y],
-            [landmarks[382].x, landmarks[382].y]
-        ], axis=0)
-        
-        # Calculate gaze vector
-        gaze_vector = right_eye_center - left_eye_center
-        return gaze_vector
+        return landmark_features.gaze_direction(landmark_features.landmarks_to_array(landmarks))
     
     def calculate_head_pose(self, landmarks):
         """Calculate head pose from facial landmarks"""
-        # Simplified head pose calculation
-        nose_tip = [landmarks[1].x, landmarks[1].y]
-        chin = [landmarks[152].x, landmarks[152].y]
-        
-        # Calculate head tilt
-        head_vector = np.array(chin) - np.array(nose_tip)
-        head_tilt = np.arctan2(head_vector[1], head_vector[0])
-        
-        return head_tilt
+        return float(landmark_features.head_pose(landmark_features.landmarks_to_array(landmarks)))
     
     def detect_confusion(self, emotions: dict, engagement_metrics: dict) -> float:
         """
         Detect confusion based on your requirements:
         - Combination of angry, disgust, fear
         - Head tilting
-        """
-        confusion_score = 0.0
-        
-        # Emotion-based confusion indicators (angry, disgust, fear)
-        if emotions.get('angry', 0) > 0.3:
-            confusion_score += 0.4
-        if emotions.get('disgust', 0) > 0.2:
-            confusion_score += 0.3
-        if emotions.get('fear', 0) > 0.2:
-            confusion_score += 0.3
-        
-        # Head tilting indicates confusion
-        if engagement_metrics.get('head_tilt', 0) > 0.3:  # Significant head tilt
-            confusion_score += 0.4
         
-        # Additional confusion indicators
-        if emotions.get('sad', 0) > 0.3:  # Sadness can indicate confusion
-            confusion_score += 0.2
-            
-        return min(confusion_score, 1.0)
+        Thresholds come from the 'confusion' section of the scoring config.
+        """
+        return score_face(self.scoring_config['confusion'], emotions, engagement_metrics)
     
     def detect_disengagement(self, emotions: dict, engagement_metrics: dict) -> float:
         """
         Detect disengagement based on your requirements:
         - Gaze off screen
         - Other disengagement factors
+        
+        Thresholds come from the 'disengagement' section of the scoring config.
         """
-        disengagement_score = 0.0
-        
-        # Gaze off screen is primary disengagement indicator
-        if engagement_metrics.get('gaze_off_screen', False):
-            disengagement_score += 0.5
-        
-        # Other disengagement factors
-        if emotions.get('neutral', 0) > 0.8:  # Very high neutral indicates disengagement
-            disengagement_score += 0.3
-        if emotions.get('sad', 0) > 0.2:  # Low-level sadness
-            disengagement_score += 0.2
-        if emotions.get('happy', 0) < 0.1:  # Very low happiness
-            disengagement_score += 0.2
-        if engagement_metrics.get('eye_aspect_ratio', 0) < 0.15:  # Eyes half-closed
-            disengagement_score += 0.3
-        if engagement_metrics.get('head_tilt', 0) > 0.2:  # Looking away
-            disengagement_score += 0.2
-            
-        return min(disengagement_score, 1.0)
+        return score_face(self.scoring_config['disengagement'], emotions, engagement_metrics)
     
     def detect_engagement(self, emotions: dict, engagement_metrics: dict) -> float:
         """
@@ -154,32 +173,10 @@ class SimplifiedAnalyzer:
         - Looking at camera normally (neutral is good)
         - Forward gaze
         - Alert eyes
+        
+        Thresholds come from the 'engagement' section of the scoring config.
         """
-        engagement_score = 0.0
-        
-        # Neutral emotion is good for engagement (as you specified)
-        if 0.3 < emotions.get('neutral', 0) < 0.7:  # Moderate neutral is engaged
-            engagement_score += 0.4
-        if emotions.get('happy', 0) > 0.2:  # Some happiness
-            engagement_score += 0.3
-        if emotions.get('surprise', 0) > 0.1:  # Some interest/surprise
-            engagement_score += 0.2
-        
-        # Looking at camera normally (forward gaze)
-        if not engagement_metrics.get('gaze_off_screen', False):
-            engagement_score += 0.4
-        if engagement_metrics.get('head_tilt', 0) < 0.2:  # Looking forward
-            engagement_score += 0.3
-        if engagement_metrics.get('eye_aspect_ratio', 0) > 0.2:  # Eyes open and alert
-            engagement_score += 0.3
-        
-        # Low negative emotions
-        if emotions.get('angry', 0) < 0.2:  # Low anger
-            engagement_score += 0.1
-        if emotions.get('sad', 0) < 0.2:  # Low sadness
-            engagement_score += 0.1
-            
-        return max(0.0, min(engagement_score, 1.0))
+        return score_face(self.scoring_config['engagement'], emotions, engagement_metrics)
     
     def get_dominant_state(self, confusion: float, disengagement: float, engagement: float) -> tuple:
         """
@@ -193,72 +190,47 @@ class SimplifiedAnalyzer:
         Returns:
             Tuple of (state_name, confidence)
         """
-        states = {
-            'confused': confusion,
-            'disengaged': disengagement,
-            'engaged': engagement
-        }
-        
-        # Find the state with highest score
-        dominant_state = max(states, key=states.get)
-        confidence = states[dominant_state]
-        
-        # Apply thresholds
-        if confidence < 0.2:  # If no state is strong enough, default to engaged
-            return 'engaged', 0.5
-        
-        return dominant_state, confidence
+        return dominant_state(self.scoring_config, confusion, disengagement, engagement)
     
     def track_face(self, face_bbox: tuple, face_id: int = None) -> int:
-        """Track face across frames with simplified spatial continuity"""
+        """Track a single face across frames (see track_faces for whole frames)"""
         if face_id is not None and face_id in self.face_tracks:
             # Update existing track
             self.face_tracks[face_id]['bbox'] = face_bbox
-            self.face_tracks[face_id]['last_seen'] = self.frame_count
+            self.face_tracks[face_id]['last_seen'] = self.analysis_step
             return face_id
         
-        # Find closest existing track
-        best_match = None
-        best_distance = float('inf')
-        
-        for track_id, track_data in self.face_tracks.items():
-            if self.frame_count - track_data['last_seen'] > 5:
-                continue
-                
-            # Calculate distance between centers
-            old_center = (track_data['bbox'][0] + track_data['bbox'][2]//2, 
-                         track_data['bbox'][1] + track_data['bbox'][3]//2)
-            new_center = (face_bbox[0] + face_bbox[2]//2, 
-                         face_bbox[1] + face_bbox[3]//2)
-            
-            distance = np.sqrt((old_center[0] - new_center[0])**2 + 
-                             (old_center[1] - new_center[1])**2)
-            
-            if distance < best_distance and distance < 80:
-                best_distance = distance
-                best_match = track_id
+        return self.track_faces([face_bbox])[0]
+    
+    def track_faces(self, face_bboxes) -> list:
+        """Assign track ids to all face bounding boxes of the current frame"""
+        return self.tracker.update(face_bboxes, self.analysis_step)
+    
+    def evict_tracks(self, track_ids: list):
+        """
+        Drop cached per-track state of expired tracks
         
-        if best_match is not None:
-            # Update existing track
-            self.face_tracks[best_match]['bbox'] = face_bbox
-            self.face_tracks[best_match]['last_seen'] = self.frame_count
-            return best_match
+        In pipelined runs tracks expire in the landmark thread while the
+        emotion thread uses the cache, so the ids are queued instead and the
+        emotion stage evicts them (see take_expired_tracks).
+        """
+        if self.expired_tracks is not None:
+            self.expired_tracks.extend(track_ids)
         else:
-            # Create new track
-            new_id = max(self.face_tracks.keys(), default=-1) + 1
-            self.face_tracks[new_id] = {
-                'bbox': face_bbox,
-                'last_seen': self.frame_count,
-                'emotion_history': deque(maxlen=10),
-                'engagement_history': deque(maxlen=10)
-            }
-            return new_id
+            self.emotion_cache.evict(track_ids)
     
-    def analyze_frame(self, frame: np.ndarray) -> dict:
-        """Analyze a single frame with simplified 3-state detection"""
-        results = {
-            'timestamp': time.time() - self.start_time,
-            'frame_count': self.frame_count,
+    def take_expired_tracks(self) -> list:
+        """Track ids expired since the last call (pipelined runs)"""
+        expired, self.expired_tracks = self.expired_tracks, []
+        return expired
+    
+    def new_frame_result(self, timestamp: float = None, frame_count: int = None) -> dict:
+        """Create the empty per-frame result record"""
+        if timestamp is None:
+            timestamp = time.time() - self.start_time
+        return {
+            'timestamp': timestamp,
+            'frame_count': self.frame_count if frame_count is None else frame_count,
             'faces': [],
             'summary': {
                 'total_faces': 0,
@@ -267,139 +239,387 @@ class SimplifiedAnalyzer:
                 'confused_count': 0
             }
         }
+    
+    def detect_faces(self, frame: np.ndarray, results: dict) -> list:
+        """
+        Landmark stage: run Face Mesh, compute engagement metrics and track faces
         
-        # Convert BGR to RGB for MediaPipe
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        Advances analysis_step, the clock used by tracking and the emotion
+        cache, so skipped (not analyzed) frames do not age tracks.
+        
+        Returns:
+            List of face dicts with face_id, bbox, engagement_metrics and roi,
+            ready for the emotion stage
+        """
+        if self.tiles:
+            return self.detect_tile_faces(frame, results)
+        
+        # Convert BGR to RGB for MediaPipe (downscaled to detection_scale);
+        # landmarks are normalized, so they map back onto the full frame
+        with self.instrumentation.stage('color_conversion'):
+            rgb_frame = self.detection_frames(frame)
         
         # Process with MediaPipe Face Mesh
-        face_mesh_results = self.face_mesh.process(rgb_frame)
+        with self.instrumentation.stage('face_mesh'):
+            face_mesh_results = self.face_mesh.process(rgb_frame)
+        
+        faces = []
+        if not face_mesh_results.multi_face_landmarks:
+            self.tracker.expire(self.analysis_step)
+            self.analysis_step += 1
+            return faces
+        
+        results['summary']['total_faces'] = len(face_mesh_results.multi_face_landmarks)
         
-        if face_mesh_results.multi_face_landmarks:
-            results['summary']['total_faces'] = len(face_mesh_results.multi_face_landmarks)
+        # One landmark array per face, all engagement features in one batch
+        with self.instrumentation.stage('landmark_math'):
+            face_points = landmark_features.stack_faces(face_mesh_results.multi_face_landmarks)
+            features = landmark_features.compute_face_features(
+                face_points, frame.shape[1], frame.shape[0]
+            )
+        
+        # Match all faces of the frame to tracks at once
+        with self.instrumentation.stage('tracking'):
+            face_ids = self.track_faces(features['bbox'])
+        
+        for face_index, face_id in enumerate(face_ids):
+            # Get face bounding box from landmarks
+            x_min, y_min, width, height = (int(v) for v in features['bbox'][face_index])
+            face_bbox = (x_min, y_min, width, height)
             
-            for face_landmarks in face_mesh_results.multi_face_landmarks:
-                # Calculate engagement metrics
-                left_ear = self.calculate_eye_aspect_ratio(face_landmarks.landmark, 
-                                                         [33, 7, 163, 144, 145, 153, 154, 155, 133, 173, 157, 158, 159, 160, 161, 246])
-                right_ear = self.calculate_eye_aspect_ratio(face_landmarks.landmark, 
-                                                          [362, 382, 381, 380, 374, 373, 390, 249, 263, 466, 388, 387, 386, 385, 384, 398])
-                
-                gaze_vector = self.calculate_gaze_direction(face_landmarks.landmark)
-                head_tilt = self.calculate_head_pose(face_landmarks.landmark)
+            # Extract face ROI for emotion analysis
+            face_roi = frame[y_min:y_min + height, x_min:x_min + width]
+            if face_roi.size == 0:
+                continue
+            
+            faces.append({
+                'face_id': face_id,
+                'analysis_step': self.analysis_step,
+                'bbox': face_bbox,
+                'engagement_metrics': landmark_features.engagement_metrics_at(features, face_index),
+                'landmarks': face_points[face_index],
+                'roi': face_roi
+            })
+        
+        self.analysis_step += 1
+        return faces
+    
+    def detect_tile_faces(self, frame: np.ndarray, results: dict) -> list:
+        """
+        Landmark stage of gallery mode: run each tile's Face Mesh on its crop
+        
+        The tile index is the face_id, so a participant keeps the same id for
+        the whole recording. Bounding boxes are in full-frame coordinates.
+        """
+        faces = []
+        for tile_index, (tile_x, tile_y, tile_w, tile_h) in self.tiles.items():
+            tile = frame[tile_y:tile_y + tile_h, tile_x:tile_x + tile_w]
+            if tile.size == 0:
+                continue
+            
+            with self.instrumentation.stage('color_conversion'):
+                rgb_tile = self.tile_frames[tile_index](tile)
+            with self.instrumentation.stage('face_mesh'):
+                face_mesh_results = self.tile_meshes[tile_index].process(rgb_tile)
+            if not face_mesh_results.multi_face_landmarks:
+                continue
+            
+            with self.instrumentation.stage('landmark_math'):
+                face_points = landmark_features.stack_faces(face_mesh_results.multi_face_landmarks[:1])
+                features = landmark_features.compute_face_features(face_points, tile.shape[1], tile.shape[0])
+            x_min, y_min, width, height = (int(v) for v in features['bbox'][0])
+            
+            face_roi = tile[y_min:y_min + height, x_min:x_min + width]
+            if face_roi.size == 0:
+                continue
+            
+            faces.append({
+                'face_id': tile_index,
+                'tile_index': tile_index,
+                'analysis_step': self.analysis_step,
+                'bbox': (tile_x + x_min, tile_y + y_min, width, height),
+                'engagement_metrics': landmark_features.engagement_metrics_at(features, 0),
+                'landmarks': face_points[0],
+                'roi': face_roi
+            })
+        
+        results['summary']['total_faces'] = len(faces)
+        self.analysis_step += 1
+        return faces
+    
+    def analyze_emotions(self, faces: list):
+        """
+        Emotion stage: fill 'emotions' and 'dominant_emotion' for each face
+        
+        Faces may come from one frame or from a window of frames. All faces
+        the emotion cache marks for a refresh are analyzed together in one
+        batch; the others reuse the cached result of their track.
+        """
+        instrumentation = self.instrumentation
+        pending = []
+        with instrumentation.stage('emotion_cache'):
+            for face in faces:
+                face_id = face['face_id']
+                refresh, reason = self.emotion_cache.needs_refresh(
+                    face_id, face['analysis_step'], face['landmarks'], face['roi']
+                )
+                if refresh:
+                    face['refresh_reason'] = reason
+                    pending.append(face)
+                else:
+                    # Use cached emotion results
+                    cached = self.emotion_cache.get(face_id, face['analysis_step']) or default_emotion_result()
+                    face['emotions'] = cached['emotions']
+                    face['dominant_emotion'] = cached['dominant_emotion']
+                    instrumentation.count_inference(face_id, 'cached')
+        
+        if not pending:
+            return
+        
+        with instrumentation.stage('emotion_inference'):
+            if self.batch_emotions:
+                try:
+                    emotion_results = self.emotion_model.predict([face['roi'] for face in pending])
+                except Exception as e:
+                    print(f"Batched emotion analysis error for {len(pending)} faces: {e}")
+                    emotion_results = [dict(default_emotion_result(), failed=True) for _ in pending]
+            else:
+                emotion_results = [self.analyze_face_emotions(face['face_id'], face['roi']) for face in pending]
+        
+        for face, emotion_result in zip(pending, emotion_results):
+            instrumentation.count_inference(face['face_id'], 'failed' if emotion_result.get('failed') else 'run')
+            # Cache the result
+            self.emotion_cache.put(
+                face['face_id'], face['analysis_step'], emotion_result,
+                reason=face['refresh_reason'], landmarks=face['landmarks'], face_roi=face['roi']
+            )
+            face['emotions'] = emotion_result['emotions']
+            face['dominant_emotion'] = emotion_result['dominant_emotion']
+    
+    def analyze_face_emotions(self, face_id: int, face_roi: np.ndarray) -> dict:
+        """Analyze one face ROI with DeepFace.analyze (per-face path)"""
+        # Imported here so the batched backends never load TensorFlow through DeepFace
+        from deepface import DeepFace
+        
+        try:
+            emotion_result = DeepFace.analyze(
+                face_roi, 
+                actions=['emotion'], 
+                enforce_detection=False,
+                silent=True,
+                detector_backend=self.detector_backend
+            )
+            
+            emotions = emotion_result[0]['emotion']
+            return {
+                'emotions': emotions,
+                'dominant_emotion': max(emotions, key=emotions.get)
+            }
+            
+        except Exception as e:
+            print(f"Emotion analysis error for face {face_id}: {e}")
+            # Use default emotions if analysis fails
+            return dict(default_emotion_result(), failed=True)
+    
+    def score_faces(self, results: dict, faces: list) -> dict:
+        """Scoring stage: compute the 3 states for each face and fill the frame result"""
+        with self.instrumentation.stage('scoring'):
+            for face in faces:
+                face_id = face['face_id']
+                emotions = face['emotions']
+                engagement_metrics = face['engagement_metrics']
                 
-                # Determine if gaze is off-screen
-                gaze_off_screen = abs(gaze_vector[0]) > 0.25 or abs(gaze_vector[1]) > 0.25
+                # Calculate all 3 states
+                confusion_score = self.detect_confusion(emotions, engagement_metrics)
+                disengagement_score = self.detect_disengagement(emotions, engagement_metrics)
+                engagement_score = self.detect_engagement(emotions, engagement_metrics)
                 
-                # Calculate blink rate
-                avg_ear = (left_ear + right_ear) / 2
-                blink_rate = 1.0 if avg_ear < 0.2 else 0.0
+                # Get dominant state
+                dominant_state, confidence = self.get_dominant_state(
+                    confusion_score, disengagement_score, engagement_score
+                )
                 
-                engagement_metrics = {
-                    'eye_aspect_ratio': float(avg_ear),
-                    'gaze_off_screen': bool(gaze_off_screen),
-                    'head_tilt': float(abs(head_tilt)),
-                    'blink_rate': float(blink_rate)
-                }
+                # Update summary
+                if dominant_state == 'engaged':
+                    results['summary']['engaged_count'] += 1
+                elif dominant_state == 'disengaged':
+                    results['summary']['disengaged_count'] += 1
+                elif dominant_state == 'confused':
+                    results['summary']['confused_count'] += 1
                 
-                # Get face bounding box from landmarks
-                x_coords = [lm.x for lm in face_landmarks.landmark]
-                y_coords = [lm.y for lm in face_landmarks.landmark]
-                x_min, x_max = int(min(x_coords) * frame.shape[1]), int(max(x_coords) * frame.shape[1])
-                y_min, y_max = int(min(y_coords) * frame.shape[0]), int(max(y_coords) * frame.shape[0])
+                # Store in face track (a single lookup: in pipelined runs the
+                # landmark thread may expire the track meanwhile)
+                track = self.face_tracks.get(face_id)
+                if track is not None:
+                    track['emotion_history'].append(emotions)
+                    track['engagement_history'].append(engagement_score)
                 
-                face_bbox = (x_min, y_min, x_max - x_min, y_max - y_min)
-                face_id = self.track_face(face_bbox)
+                face_result = {
+                    'face_id': int(face_id),
+                    'bbox': [int(x) for x in face['bbox']],
+                    'emotions': {k: float(v) for k, v in emotions.items()},
+                    'dominant_emotion': str(face['dominant_emotion']),
+                    'confusion_score': float(confusion_score),
+                    'disengagement_score': float(disengagement_score),
+                    'engagement_score': float(engagement_score),
+                    'dominant_state': str(dominant_state),
+                    'state_confidence': float(confidence),
+                    'engagement_metrics': engagement_metrics
+                }
+                if 'tile_index' in face:
+                    face_result['tile_index'] = int(face['tile_index'])
                 
-                # Extract face ROI for emotion analysis
-                face_roi = frame[y_min:y_max, x_min:x_max]
-                if face_roi.size > 0:
-                    # Only analyze emotions every few frames for performance
-                    should_analyze_emotions = (
-                        self.frame_count % self.emotion_analysis_interval == 0 or
-                        face_id not in self.last_emotion_analysis
-                    )
-                    
-                    if should_analyze_emotions:
-                        try:
-                            # Analyze emotions with DeepFace
-                            emotion_result = DeepFace.analyze(
-                                face_roi, 
-                                actions=['emotion'], 
-                                enforce_detection=False,
-                                silent=True,
-                                detector_backend=self.detector_backend
-                            )
-                            
-                            emotions = emotion_result[0]['emotion']
-                            dominant_emotion = max(emotions, key=emotions.get)
-                            
-                            # Cache the result
-                            self.last_emotion_analysis[face_id] = {
-                                'emotions': emotions,
-                                'dominant_emotion': dominant_emotion
-                            }
-                            
-                        except Exception as e:
-                            print(f"Emotion analysis error for face {face_id}: {e}")
-                            # Use default emotions if analysis fails
-                            emotions = {'neutral': 1.0, 'happy': 0.0, 'sad': 0.0, 'angry': 0.0, 'fear': 0.0, 'disgust': 0.0, 'surprise': 0.0}
-                            dominant_emotion = 'neutral'
-                            self.last_emotion_analysis[face_id] = {
-                                'emotions': emotions,
-                                'dominant_emotion': dominant_emotion
-                            }
-                    else:
-                        # Use cached emotion results
-                        cached = self.last_emotion_analysis.get(face_id, {
-                            'emotions': {'neutral': 1.0, 'happy': 0.0, 'sad': 0.0, 'angry': 0.0, 'fear': 0.0, 'disgust': 0.0, 'surprise': 0.0},
-                            'dominant_emotion': 'neutral'
-                        })
-                        emotions = cached['emotions']
-                        dominant_emotion = cached['dominant_emotion']
-                    
-                    # Calculate all 3 states
-                    confusion_score = self.detect_confusion(emotions, engagement_metrics)
-                    disengagement_score = self.detect_disengagement(emotions, engagement_metrics)
-                    engagement_score = self.detect_engagement(emotions, engagement_metrics)
-                    
-                    # Get dominant state
-                    dominant_state, confidence = self.get_dominant_state(
-                        confusion_score, disengagement_score, engagement_score
-                    )
-                    
-                    # Update summary
-                    if dominant_state == 'engaged':
-                        results['summary']['engaged_count'] += 1
-                    elif dominant_state == 'disengaged':
-                        results['summary']['disengaged_count'] += 1
-                    elif dominant_state == 'confused':
-                        results['summary']['confused_count'] += 1
-                    
-                    # Store in face track
-                    if face_id in self.face_tracks:
-                        self.face_tracks[face_id]['emotion_history'].append(emotions)
-                        self.face_tracks[face_id]['engagement_history'].append(engagement_score)
-                    
-                    face_result = {
-                        'face_id': int(face_id),
-                        'bbox': [int(x) for x in face_bbox],
-                        'emotions': {k: float(v) for k, v in emotions.items()},
-                        'dominant_emotion': str(dominant_emotion),
-                        'confusion_score': float(confusion_score),
-                        'disengagement_score': float(disengagement_score),
-                        'engagement_score': float(engagement_score),
-                        'dominant_state': str(dominant_state),
-                        'state_confidence': float(confidence),
-                        'engagement_metrics': engagement_metrics
-                    }
-                    
-                    results['faces'].append(face_result)
-        
-        # Store analysis data
-        self.analysis_data.append(results)
+                results['faces'].append(face_result)
+        
+        return results
+    
+    def analyze_frame(self, frame: np.ndarray, timestamp: float = None) -> dict:
+        """
+        Analyze a single frame with simplified 3-state detection
+        
+        Args:
+            frame: BGR frame
+            timestamp: Position of the frame in the video in seconds
+                (defaults to wall-clock time since the analyzer started)
+        """
+        results = self.new_frame_result(timestamp)
+        
+        with self.instrumentation.stage('analyze_frame'):
+            faces = self.detect_faces(frame, results)
+            self.analyze_emotions(faces)
+            self.score_faces(results, faces)
+            
+            self.store_result(results)
         
         return results
     
+    def store_result(self, results: dict):
+        """Store the analysis of one frame"""
+        with self.instrumentation.stage('output'):
+            if self.output_format != 'json':
+                if self.result_writer is None:
+                    self.result_writer = open_result_writer(self.output_file, self.output_format)
+                self.result_writer.write(results)
+            else:
+                self.analysis_data.append(results)
+    
+    def prime_face_mesh(self, frame: np.ndarray):
+        """Run Face Mesh on a frame only to restore its tracking state (resume)"""
+        if self.tiles:
+            for tile_index, (tile_x, tile_y, tile_w, tile_h) in self.tiles.items():
+                tile = frame[tile_y:tile_y + tile_h, tile_x:tile_x + tile_w]
+                if tile.size:
+                    self.tile_meshes[tile_index].process(self.tile_frames[tile_index](tile))
+        else:
+            self.face_mesh.process(self.detection_frames(frame))
+    
+    def write_checkpoint(self, path: str, next_frame: int, stride: int, analyzed_frames: int):
+        """
+        Checkpoint a sequential run (see checkpoint)
+        
+        Args:
+            path: Checkpoint file
+            next_frame: Index of the next frame to analyze
+            stride: Resolved analysis stride of the run
+            analyzed_frames: Number of frames analyzed so far
+        """
+        state = {
+            'video_source': self.video_source,
+            'output_format': self.output_format,
+            'stride': stride,
+            'next_frame': next_frame,
+            'analyzed_frames': analyzed_frames,
+            'frame_count': self.frame_count,
+            'analysis_step': self.analysis_step,
+            'tracks': self.tracker.tracks,
+            'next_track_id': self.tracker.next_id,
+            'emotion_cache': {'entries': self.emotion_cache.entries, 'stats': self.emotion_cache.stats}
+        }
+        if self.output_format == 'json':
+            state['analysis_data'] = self.analysis_data
+        elif self.output_format == 'jsonl':
+            state['output_bytes'] = self.result_writer.tell() if self.result_writer else 0
+            state['records_written'] = self.result_writer.records_written if self.result_writer else 0
+        else:
+            # Rows already appended to the column files (flushed by checkpoint_state)
+            state['columnar'] = self.result_writer.checkpoint_state() if self.result_writer else None
+        save_checkpoint(path, state)
+    
+    def restore_checkpoint(self, state: dict):
+        """Restore tracking, emotion cache and partial output from a checkpoint"""
+        if state['output_format'] != self.output_format:
+            raise ValueError(f"Checkpoint was written for {state['output_format']} output, not {self.output_format}")
+        self.frame_count = state['frame_count']
+        self.analysis_step = state['analysis_step']
+        # face_tracks aliases the tracker's dict, so restore it in place
+        self.tracker.tracks.clear()
+        self.tracker.tracks.update(state['tracks'])
+        self.tracker.next_id = state['next_track_id']
+        self.emotion_cache.entries.clear()
+        self.emotion_cache.entries.update(state['emotion_cache']['entries'])
+        self.emotion_cache.stats = state['emotion_cache']['stats']
+        
+        if self.output_format == 'json':
+            self.analysis_data = state['analysis_data']
+        elif self.output_format == 'jsonl':
+            # Drop the records written after the checkpoint
+            if os.path.exists(self.output_file):
+                with open(self.output_file, 'r+b') as f:
+                    f.truncate(state['output_bytes'])
+            self.result_writer = JsonlResultWriter(self.output_file, append=True)
+            self.result_writer.records_written = state['records_written']
+        elif state['columnar'] is not None:
+            from columnar_results import ColumnarResultWriter
+            # Drop the rows appended after the checkpoint
+            self.result_writer = ColumnarResultWriter(self.output_file, resume_state=state['columnar'])
+    
+    def resume_from_checkpoint(self, cap, state: dict) -> int:
+        """
+        Restore a checkpoint and position cap at its next frame
+        
+        The last REPLAY_FRAMES analyzed frames before the checkpoint are run
+        through Face Mesh again (without producing results) to re-prime its
+        tracking, which the checkpoint cannot hold (see checkpoint).
+        
+        Returns:
+            Index of the next frame to analyze
+        """
+        self.restore_checkpoint(state)
+        next_frame, stride = state['next_frame'], state['stride']
+        replay_start = max(0, next_frame - REPLAY_FRAMES * stride)
+        for _, _, frame in self.read_frames(cap, stride, replay_start, next_frame):
+            self.prime_face_mesh(frame)
+        print(f"Resumed from checkpoint at frame {next_frame} ({state['analyzed_frames']} frames analyzed before)")
+        return next_frame
+    
+    def iter_realtime(self, grabber: LatestFrameGrabber, controller: RealtimeController):
+        """
+        Analyze the freshest frame of a live source, yielding (frame, analysis)
+        
+        Frames replaced while a frame was being analyzed are dropped by the
+        grabber; frames already older than the budget are skipped here. The
+        emotion refresh rate follows the controller's degradation level.
+        """
+        while True:
+            item = grabber.next_frame()
+            if item is None:
+                return
+            frame_index, captured_at, frame = item
+            if controller.is_stale(captured_at):
+                continue
+            
+            self.frame_count = frame_index
+            analysis = self.analyze_frame(frame, time.time() - self.start_time)
+            if controller.record(captured_at):
+                self.emotion_cache.set_load_factor(controller.load_factor)
+            yield frame, analysis
+    
+    def iter_analysis(self, cap, stride: int = 1, start_frame: int = 0, end_frame: int = None):
+        """Analyze frames sequentially, yielding (frame, analysis)"""
+        for frame_index, timestamp, frame in self.read_frames(cap, stride, start_frame, end_frame):
+            self.frame_count = frame_index
+            yield frame, self.analyze_frame(frame, timestamp)
+    
     def draw_analysis(self, frame: np.ndarray, analysis: dict) -> np.ndarray:
         """Draw analysis results on frame with simplified 3-state color coding"""
         # Draw summary
@@ -438,8 +658,48 @@ class SimplifiedAnalyzer:
         
         return frame
     
-    def run_analysis(self, save_video: bool = False, output_video: str = "simplified_analysis_output.mp4"):
-        """Run the simplified analysis"""
+    def run_analysis(self, save_video: bool = False, output_video: str = "simplified_analysis_output.mp4",
+                     headless: bool = False, progress_callback=None, progress_interval: int = 100,
+                     stride: int = 1, analysis_fps: float = None,
+                     start_frame: int = 0, end_frame: int = None, save_results: bool = True,
+                     pipelined: bool = False, queue_size: int = 8, metrics_callback=None,
+                     realtime: bool = False, latency_budget: float = 0.25,
+                     checkpoint_interval: int = 0, checkpoint_file: str = None, resume: bool = False):
+        """
+        Run the simplified analysis
+        
+        Args:
+            save_video: Write the annotated frames to output_video
+            output_video: Path of the annotated output video
+            headless: Do not open a window or poll the keyboard; overlays are
+                only drawn when the video is saved
+            progress_callback: Called with a progress dict every
+                progress_interval frames and once at the end. Defaults to
+                printing progress in headless mode.
+            progress_interval: Number of analyzed frames between progress reports
+            stride: Analyze every stride-th frame; skipped frames are grabbed
+                but not decoded
+            analysis_fps: Target analysis rate; overrides stride using the
+                source frame rate
+            start_frame: First frame of the video to analyze
+            end_frame: Stop before this frame (default: end of the video)
+            save_results: Write the results to output_file when done
+            pipelined: Run decoding, landmarks and emotions in separate threads
+                connected by bounded queues
+            queue_size: Capacity of each pipeline queue
+            metrics_callback: Called with the run summary (stage histograms,
+                per-face inference counts) every progress_interval frames
+                and once at the end; requires instrument=True
+            realtime: Live mode: always analyze the freshest frame, drop frames
+                that went stale and reduce the emotion refresh rate under load
+                (stride, start/end frame and pipelined are ignored)
+            latency_budget: Target capture-to-result latency of the live mode (seconds)
+            checkpoint_interval: Checkpoint every this many analyzed frames
+                (0: never); sequential runs over a video file only
+            checkpoint_file: Checkpoint path (default: output_file + '.ckpt')
+            resume: Continue from the checkpoint if there is one; the
+                checkpoint is removed when the run finishes
+        """
         cap = cv2.VideoCapture(self.video_source)
         
         if not cap.isOpened():
@@ -450,10 +710,40 @@ class SimplifiedAnalyzer:
         fps = int(cap.get(cv2.CAP_PROP_FPS))
         width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         
         print(f"Video properties: {width}x{height} @ {fps}fps")
-        print(f"Using detector backend: {self.detector_backend}")
+        
+        stride = resolve_stride(cap.get(cv2.CAP_PROP_FPS), stride, analysis_fps)
+        if stride > 1:
+            print(f"Analyzing every {stride} frame(s)")
+        
+        checkpoint_file = checkpoint_file or checkpoint_path(self.output_file)
+        if (checkpoint_interval or resume) and (realtime or pipelined or isinstance(self.video_source, int)):
+            print("Checkpoints need a sequential run over a video file; checkpointing disabled")
+            checkpoint_interval, resume = 0, False
+        checkpoint = load_checkpoint(checkpoint_file) if resume else None
+        if resume and checkpoint is None:
+            print(f"No checkpoint at {checkpoint_file}, starting from the beginning")
+        if checkpoint and (checkpoint['video_source'] != self.video_source or checkpoint['stride'] != stride):
+            print(f"Error: checkpoint {checkpoint_file} belongs to another video or stride")
+            cap.release()
+            return
+        if self.batch_emotions:
+            print(f"Using batched emotion inference ({self.emotion_options['emotion_backend']} backend)")
+        else:
+            print(f"Using detector backend: {self.detector_backend}")
+            models.warm_up_deepface(self.detector_backend)
         print("Simplified analyzer: Engaged, Disengaged, Confused")
+        for name, timing in models.report()['timings'].items():
+            print(f"Model {name}: {timing['loads']} load(s), {timing['load_seconds']:.2f}s loading, "
+                  f"{timing['warmup_seconds']:.2f}s warm-up (once per process)")
+        
+        if headless and progress_callback is None:
+            progress_callback = print_progress
+        
+        # Overlays are only needed when something displays or saves the frame
+        draw_overlays = save_video or not headless
         
         # Setup video writer if saving
         if save_video:
@@ -461,50 +751,232 @@ class SimplifiedAnalyzer:
             out = cv2.VideoWriter(output_video, fourcc, fps, (width, height))
         
         print("Starting simplified analysis...")
-        print("Press 'q' to quit, 's' to save current analysis")
+        if not headless:
+            print("Press 'q' to quit, 's' to save current analysis")
         
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            # Analyze frame
-            analysis = self.analyze_frame(frame)
+        run_start = time.time()
+        analyzed_frames = 0
+        if checkpoint:
+            start_frame = self.resume_from_checkpoint(cap, checkpoint)
+            analyzed_frames = checkpoint['analyzed_frames']
+        quit_requested = False
+        
+        if realtime:
+            pipeline = None
+            # Files are played back at their native rate, like a camera
+            pace_fps = None if isinstance(self.video_source, int) else (cap.get(cv2.CAP_PROP_FPS) or None)
+            grabber = LatestFrameGrabber(cap, pace_fps).start()
+            controller = RealtimeController(latency_budget)
+            analyzed = self.iter_realtime(grabber, controller)
+            print(f"Real-time mode: latency budget {latency_budget * 1000:.0f} ms")
+        elif pipelined:
+            pipeline = AnalysisPipeline(self, queue_size)
+            analyzed = pipeline.run(cap, stride, start_frame, end_frame)
+        else:
+            pipeline = None
+            analyzed = self.iter_analysis(cap, stride, start_frame, end_frame)
+        
+        for frame, analysis in analyzed:
+            analyzed_frames += 1
+            self.frame_count = analysis['frame_count']
+            output_start = time.time()
             
-            # Draw analysis on frame
-            frame_with_analysis = self.draw_analysis(frame, analysis)
+            if draw_overlays:
+                # Draw analysis on frame
+                with self.instrumentation.stage('draw'):
+                    frame_with_analysis = self.draw_analysis(frame, analysis)
+                
+                # Display frame
+                if not headless:
+                    with self.instrumentation.stage('display'):
+                        cv2.imshow('Simplified Analysis', frame_with_analysis)
+                
+                # Save frame if requested
+                if save_video:
+                    with self.instrumentation.stage('encode'):
+                        out.write(frame_with_analysis)
             
-            # Display frame
-            cv2.imshow('Simplified Analysis', frame_with_analysis)
+            if not headless:
+                # Handle key presses
+                key = cv2.waitKey(1) & 0xFF
+                if key == ord('q'):
+                    quit_requested = True
+                    break
+                elif key == ord('s'):
+                    self.save_analysis()
+                    print("Analysis saved!")
             
-            # Save frame if requested
-            if save_video:
-                out.write(frame_with_analysis)
+            if pipeline:
+                pipeline.record_output(time.time() - output_start)
             
-            # Handle key presses
-            key = cv2.waitKey(1) & 0xFF
-            if key == ord('q'):
-                break
-            elif key == ord('s'):
-                self.save_analysis()
-                print("Analysis saved!")
+            if checkpoint_interval and analyzed_frames % checkpoint_interval == 0:
+                self.write_checkpoint(checkpoint_file, analysis['frame_count'] + stride, stride, analyzed_frames)
             
-            self.frame_count += 1
+            if analyzed_frames % progress_interval == 0:
+                if progress_callback:
+                    progress_callback(self.build_progress(analyzed_frames, total_frames, run_start))
+                if metrics_callback and self.instrumentation.enabled:
+                    metrics_callback(self.run_summary(analyzed_frames))
+        
+        # A 'q' break leaves the generator suspended: close it so its cleanup
+        # (stopping the pipeline stages) runs before the results are saved
+        analyzed.close()
         
         # Cleanup
+        if realtime:
+            grabber.stop()
+            self.realtime_stats = controller.summary(grabber)
+            latency = self.realtime_stats['latency']
+            print(f"Real-time: {self.realtime_stats['analyzed_frames']} analyzed, "
+                  f"{self.realtime_stats['dropped_frames']} dropped of {self.realtime_stats['captured_frames']} captured")
+            if latency['count']:
+                print(f"Latency: p50 {latency['p50_ms']:.0f} ms, p90 {latency['p90_ms']:.0f} ms, "
+                      f"max {latency['max_ms']:.0f} ms (budget {latency_budget * 1000:.0f} ms), "
+                      f"final degradation level {self.realtime_stats['degradation_level']}")
+        if pipeline:
+            pipeline.stop()
+            self.pipeline_stats = pipeline.stats_summary()
+            for stage in self.pipeline_stats:
+                print(f"Stage {stage['stage']}: {stage['items']} frames, "
+                      f"{stage['items_per_second']:.1f} fps, busy {stage['busy_seconds']:.1f}s, "
+                      f"waiting {stage['wait_seconds']:.1f}s")
         cap.release()
         if save_video:
             out.release()
-        cv2.destroyAllWindows()
+        if not headless:
+            cv2.destroyAllWindows()
         
         # Save final analysis
-        self.save_analysis()
-        print(f"Simplified analysis complete! Results saved to {self.output_file}")
+        summary = self.run_summary(analyzed_frames, finished=True) if self.instrumentation.enabled else None
+        if summary and metrics_callback:
+            metrics_callback(summary)
+        if save_results:
+            self.close_results(summary)
+        if (checkpoint_interval or resume) and not quit_requested:
+            remove_checkpoint(checkpoint_file)  # Finished, nothing left to resume
+        if progress_callback:
+            progress = self.build_progress(analyzed_frames, total_frames, run_start)
+            progress['finished'] = True
+            if self.realtime_stats:
+                progress['realtime'] = self.realtime_stats
+            progress_callback(progress)
+        cache_summary = self.emotion_cache.summary()
+        print(f"Emotion inference: {cache_summary['inferences']} run, {cache_summary['skipped']} reused from cache "
+              f"({cache_summary['skip_ratio'] * 100:.1f}% skipped)")
+        if save_results:
+            print(f"Simplified analysis complete! Results saved to {self.output_file}")
+        else:
+            print(f"Simplified analysis complete! {analyzed_frames} frames analyzed")
+    
+    def read_frames(self, cap, stride: int = 1, start_frame: int = 0, end_frame: int = None):
+        """
+        Yield (frame_index, timestamp, frame) for every stride-th frame
+        between start_frame (inclusive) and end_frame (exclusive)
+        
+        Frames in between are skipped with cap.grab(), which advances the
+        stream without decoding. Timestamps come from the video position
+        (CAP_PROP_POS_MSEC) for files and from the wall clock for cameras.
+        """
+        use_video_clock = not isinstance(self.video_source, int)
+        frame_index = start_frame
+        if start_frame > 0 and cap.get(cv2.CAP_PROP_POS_FRAMES) != start_frame:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        
+        while end_frame is None or frame_index < end_frame:
+            with self.instrumentation.stage('decode'):
+                ret, frame = cap.read()
+            if not ret:
+                break
+            
+            if use_video_clock:
+                timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            else:
+                timestamp = time.time() - self.start_time
+            
+            yield frame_index, timestamp, frame
+            
+            # Skip frames we won't analyze without decoding them
+            skipped = 0
+            with self.instrumentation.stage('skip'):
+                for _ in range(stride - 1):
+                    if not cap.grab():
+                        break
+                    skipped += 1
+            frame_index += skipped + 1
+    
+    def build_progress(self, analyzed_frames: int, total_frames: int, run_start: float) -> dict:
+        """Build the progress dict passed to progress callbacks"""
+        elapsed = time.time() - run_start
+        return {
+            'frame_count': self.frame_count,
+            'analyzed_frames': analyzed_frames,
+            'total_frames': total_frames,
+            'progress': min(1.0, (self.frame_count + 1) / total_frames) if total_frames > 0 else None,
+            'elapsed': elapsed,
+            'fps': analyzed_frames / elapsed if elapsed > 0 else 0.0,
+            'finished': False
+        }
+    
+    def run_summary(self, analyzed_frames: int, finished: bool = False) -> dict:
+        """Run summary record: stage histograms, inference counts and cache/pipeline statistics"""
+        summary = self.instrumentation.summary()
+        summary.update({
+            'record_type': RUN_SUMMARY_TYPE,
+            'finished': finished,
+            'analyzed_frames': analyzed_frames,
+            'last_frame_count': self.frame_count,
+            'emotion_cache': self.emotion_cache.summary(),
+            'pipeline': self.pipeline_stats,
+            'realtime': self.realtime_stats,
+            'models': models.report()['timings']
+        })
+        return summary
     
     def save_analysis(self):
-        """Save analysis results to JSON file"""
-        with open(self.output_file, 'w') as f:
-            json.dump(self.analysis_data, f, indent=2)
+        """Save analysis results to the output file (flushes the stream in streaming formats)"""
+        if self.output_format != 'json':
+            if self.result_writer is not None:
+                self.result_writer.flush()
+        else:
+            write_json_results(self.output_file, self.analysis_data)
+    
+    def close_results(self, run_summary: dict = None):
+        """
+        Write the final results and close the output stream
+        
+        A run summary is appended as a last record (json/jsonl) or stored
+        in meta.json (columnar)
+        """
+        if self.output_format != 'json':
+            if self.result_writer is None:
+                self.result_writer = open_result_writer(self.output_file, self.output_format)
+            if run_summary is None:
+                self.result_writer.close()
+            elif self.output_format == 'columnar':
+                self.result_writer.close(extra_meta={'run_summary': run_summary})
+            else:
+                self.result_writer.write(run_summary)
+                self.result_writer.close()
+            self.result_writer = None
+        elif run_summary is None:
+            self.save_analysis()
+        else:
+            write_json_results(self.output_file, self.analysis_data + [run_summary])
+
+def resolve_stride(source_fps: float, stride: int = 1, analysis_fps: float = None) -> int:
+    """Number of source frames per analyzed frame for a stride or a target analysis fps"""
+    if analysis_fps and source_fps > 0:
+        return max(1, int(round(source_fps / analysis_fps)))
+    return max(1, int(stride))
+
+def print_progress(progress: dict):
+    """Default progress callback for headless runs"""
+    if progress['progress'] is not None:
+        position = f"{progress['progress'] * 100:.1f}% ({progress['frame_count']}/{progress['total_frames']})"
+    else:
+        position = f"frame {progress['frame_count']}"
+    status = "done" if progress['finished'] else "progress"
+    print(f"Analysis {status}: {position} | {progress['fps']:.1f} fps | {progress['elapsed']:.1f}s elapsed")
 
 def main():
     """Main function to run the simplified analyzer"""
@@ -512,17 +984,115 @@ def main():
     
     parser = argparse.ArgumentParser(description='Simplified Meeting Engagement Analyzer - 3 States')
     parser.add_argument('--video', type=str, help='Path to video file (default: webcam)')
-    parser.add_argument('--output', type=str, default='simplified_analysis.json', help='Output JSON file')
+    parser.add_argument('--output', type=str, default='simplified_analysis.json', help='Output JSON file (.jsonl streams one record per frame, .cols writes columnar arrays)')
+    parser.add_argument('--output-format', type=str, choices=['json', 'jsonl', 'columnar'], help='Output format (default: from the --output extension)')
     parser.add_argument('--save-video', action='store_true', help='Save analyzed video')
     parser.add_argument('--output-video', type=str, default='simplified_analysis_output.mp4', help='Output video file')
-    parser.add_argument('--detector', type=str, default='opencv', choices=['opencv', 'mtcnn'], help='Face detector backend')
+    parser.add_argument('--detector', type=str, default='opencv', choices=['opencv', 'mtcnn'], help='Face detector backend (per-face emotion path)')
+    parser.add_argument('--headless', action='store_true', help='Run without a display window (for servers)')
+    parser.add_argument('--progress-interval', type=int, default=100, help='Frames between progress reports in headless mode')
+    sampling = parser.add_mutually_exclusive_group()
+    sampling.add_argument('--stride', type=int, default=1, help='Analyze every N-th frame (skipped frames are not decoded)')
+    sampling.add_argument('--analysis-fps', type=float, help='Target number of analyzed frames per second of video')
+    parser.add_argument('--workers', type=int, default=1, help='Analyze time segments of the video (or tile groups with --gallery) in N parallel processes')
+    parser.add_argument('--segment-seconds', type=float, default=300, help='Length of each segment in parallel mode')
+    parser.add_argument('--pipeline', action='store_true', help='Run decode, landmark, emotion and output stages in parallel threads')
+    parser.add_argument('--queue-size', type=int, default=8, help='Capacity of each pipeline queue')
+    parser.add_argument('--emotion-refresh', type=str, default='adaptive', choices=['adaptive', 'fixed'], help='Emotion refresh policy per tracked face')
+    parser.add_argument('--max-staleness', type=int, default=30, help='Longest number of analyzed frames an emotion result is reused (adaptive policy)')
+    parser.add_argument('--scoring-config', type=str, help='JSON file overriding the state scoring thresholds')
+    parser.add_argument('--detection-scale', type=float, default=1.0, help='Run Face Mesh on a frame downscaled by this factor (e.g. 0.5); ROIs stay full resolution')
+    parser.add_argument('--gallery', action='store_true', help='Gallery-view recording: split frames into participant tiles (face_id = tile index)')
+    parser.add_argument('--gallery-layout', type=str, help='JSON tile layout to use instead of detecting it (implies --gallery)')
+    parser.add_argument('--emotion-backend', type=str, default='deepface', choices=EMOTION_BACKENDS, help='Batched emotion inference backend')
+    parser.add_argument('--onnx-model', type=str, help='ONNX emotion model for --emotion-backend onnx (see emotion_onnx.py export)')
+    parser.add_argument('--onnx-threads', type=int, help='ONNX Runtime intra-op threads (default: runtime choice)')
+    parser.add_argument('--instrument', action='store_true', help='Time every stage and append a run summary with latency histograms to the output (single-process runs)')
+    parser.add_argument('--realtime', action='store_true', help='Live mode: analyze the freshest frame and drop stale ones to stay within --latency-budget')
+    parser.add_argument('--latency-budget', type=float, default=0.25, help='Target capture-to-result latency in seconds (real-time mode)')
+    parser.add_argument('--checkpoint-interval', type=int, default=0, help='Checkpoint tracking state and partial output every N analyzed frames')
+    parser.add_argument('--checkpoint-file', type=str, help='Checkpoint path (default: <output>.ckpt)')
+    parser.add_argument('--resume', action='store_true', help='Continue an interrupted run from its last checkpoint (sequential runs over --video)')
+    parser.add_argument('--per-face-emotions', action='store_true', help='Call DeepFace.analyze per face instead of batched inference')
     
     args = parser.parse_args()
     
+    if args.emotion_backend == 'onnx' and not args.onnx_model:
+        parser.error('--emotion-backend onnx requires --onnx-model')
+    emotion_options = {
+        'emotion_backend': args.emotion_backend,
+        'onnx_model': args.onnx_model,
+        'onnx_threads': args.onnx_threads
+    }
+    if args.resume and not args.video:
+        parser.error('--resume requires --video')
+    # The segment and tile workers run the plain sequential loop
+    if args.gallery or args.gallery_layout or args.workers > 1:
+        single_process = [flag for flag, value in (('--instrument', args.instrument), ('--realtime', args.realtime),
+                                                   ('--pipeline', args.pipeline), ('--save-video', args.save_video),
+                                                   ('--checkpoint-interval', args.checkpoint_interval),
+                                                   ('--resume', args.resume)) if value]
+        if single_process:
+            mode = '--gallery' if args.gallery or args.gallery_layout else '--workers'
+            parser.error(f"{', '.join(single_process)} cannot be combined with {mode}")
+    if args.resume and not args.checkpoint_interval:
+        args.checkpoint_interval = DEFAULT_CHECKPOINT_INTERVAL
+    
+    if args.gallery or args.gallery_layout:
+        if not args.video:
+            parser.error('--gallery requires --video')
+        from gallery_layout import load_layout
+        from parallel_analysis import analyze_gallery_parallel
+        analyze_gallery_parallel(
+            args.video,
+            output_file=args.output,
+            num_workers=args.workers,
+            layout=load_layout(args.gallery_layout) if args.gallery_layout else None,
+            stride=args.stride,
+            analysis_fps=args.analysis_fps,
+            batch_emotions=not args.per_face_emotions,
+            output_format=args.output_format,
+            emotion_refresh=args.emotion_refresh,
+            max_staleness=args.max_staleness,
+            scoring_config=load_scoring_config(args.scoring_config),
+            detection_scale=args.detection_scale,
+            emotion_options=emotion_options
+        )
+        return
+    
+    if args.workers > 1:
+        if not args.video:
+            parser.error('--workers requires --video')
+        from parallel_analysis import analyze_video_parallel
+        analyze_video_parallel(
+            args.video,
+            output_file=args.output,
+            num_workers=args.workers,
+            segment_seconds=args.segment_seconds,
+            stride=args.stride,
+            analysis_fps=args.analysis_fps,
+            batch_emotions=not args.per_face_emotions,
+            output_format=args.output_format,
+            emotion_refresh=args.emotion_refresh,
+            max_staleness=args.max_staleness,
+            scoring_config=load_scoring_config(args.scoring_config),
+            detection_scale=args.detection_scale,
+            emotion_options=emotion_options
+        )
+        return
+    
     # Initialize analyzer
     analyzer = SimplifiedAnalyzer(
         video_source=args.video,
-        output_file=args.output
+        output_file=args.output,
+        batch_emotions=not args.per_face_emotions,
+        output_format=args.output_format,
+        emotion_refresh=args.emotion_refresh,
+        max_staleness=args.max_staleness,
+        scoring_config=load_scoring_config(args.scoring_config),
+        detection_scale=args.detection_scale,
+        instrument=args.instrument,
+        **emotion_options
     )
     
     # Override detector if specified
@@ -531,8 +1101,20 @@ def main():
     # Run analysis
     analyzer.run_analysis(
         save_video=args.save_video,
-        output_video=args.output_video
+        output_video=args.output_video,
+        headless=args.headless,
+        progress_interval=args.progress_interval,
+        stride=args.stride,
+        analysis_fps=args.analysis_fps,
+        pipelined=args.pipeline,
+        queue_size=args.queue_size,
+        realtime=args.realtime,
+        latency_budget=args.latency_budget,
+        checkpoint_interval=args.checkpoint_interval,
+        checkpoint_file=args.checkpoint_file,
+        resume=args.resume
     )
+    analyzer.release_models()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Test that a resumed run writes the same results as an uninterrupted one
+
+The landmark stage is replaced by synthetic faces drifting across the frame
+(one of them leaving and coming back), so tracking, the adaptive emotion
+cache and scoring all carry state across the checkpoint while Face Mesh,
+whose internal state cannot be saved, does not affect the records.
+"""
+import os
+import sys
+import tempfile
+from collections import OrderedDict, deque
+
+import cv2
+import numpy as np
+
+from checkpoint import load_checkpoint, save_checkpoint
+from result_io import iter_results
+from simplified_analyzer import SimplifiedAnalyzer
+
+FRAMES = 40
+CHECKPOINT_AT = 17  # Analyzed frames before the checkpoint
+CRASH_AT = CHECKPOINT_AT + 6  # The interrupted run writes a few more records
+WIDTH, HEIGHT = 320, 240
+
+
+def write_video(path: str):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 30, (WIDTH, HEIGHT))
+    x = np.arange(WIDTH, dtype=np.float32)[None, :, None]
+    y = np.arange(HEIGHT, dtype=np.float32)[:, None, None]
+    for i in range(FRAMES):
+        frame = 127 + 100 * np.sin((x + 3 * i) / 40.0) * np.cos((y - 2 * i) / 30.0) + np.zeros((1, 1, 3))
+        writer.write(frame.astype(np.uint8))
+    writer.release()
+
+
+class DriftingFacesAnalyzer(SimplifiedAnalyzer):
+    """Analyzer with deterministic synthetic faces and emotions"""
+
+    def detect_faces(self, frame, results):
+        step = self.analysis_step
+        bboxes = [(20 + step, 40, 60, 60), (200 - step, 120 + step // 3, 50, 50)]
+        if 10 <= step % 25 < 14:
+            bboxes.pop()  # Lost for a few frames, then re-acquired
+        face_ids = self.track_faces(bboxes)
+        faces = []
+        for face_id, (x, y, w, h) in zip(face_ids, bboxes):
+            faces.append({
+                'face_id': face_id,
+                'analysis_step': step,
+                'bbox': (x, y, w, h),
+                'engagement_metrics': {'eye_aspect_ratio': 0.2 + 0.01 * (step % 7), 'gaze_off_screen': step % 5 == 0,
+                                       'head_tilt': float(step % 11), 'blink_rate': 12.0},
+                'landmarks': np.array([[x, y], [x + w, y + h], [x + w / 2, y + h / 3]], dtype=np.float32),
+                'roi': frame[y:y + h, x:x + w]
+            })
+        results['summary']['total_faces'] = len(faces)
+        self.analysis_step += 1
+        return faces
+
+    def analyze_face_emotions(self, face_id, face_roi):
+        happy = np.float32(face_roi.mean() / 2.55)
+        emotions = {'angry': np.float32(0.0), 'disgust': np.float32(0.0), 'fear': np.float32(0.0),
+                    'happy': happy, 'sad': np.float32(0.0), 'surprise': np.float32(0.0),
+                    'neutral': np.float32(100.0) - happy}
+        return {'emotions': emotions, 'dominant_emotion': 'happy' if happy > 50 else 'neutral'}
+
+
+def make_analyzer(video: str, output: str) -> DriftingFacesAnalyzer:
+    return DriftingFacesAnalyzer(video_source=video, output_file=output, batch_emotions=False,
+                                 emotion_refresh='adaptive', max_staleness=6)
+
+
+def uninterrupted_run(video: str, output: str):
+    analyzer = make_analyzer(video, output)
+    cap = cv2.VideoCapture(video)
+    try:
+        for _ in analyzer.iter_analysis(cap):
+            pass
+        analyzer.close_results()
+    finally:
+        cap.release()
+        analyzer.release_models()
+
+
+def interrupted_run(video: str, output: str, checkpoint_file: str):
+    """Checkpoint after CHECKPOINT_AT frames, then stop without closing the output"""
+    analyzer = make_analyzer(video, output)
+    cap = cv2.VideoCapture(video)
+    try:
+        analyzed_frames = 0
+        for _, analysis in analyzer.iter_analysis(cap):
+            analyzed_frames += 1
+            if analyzed_frames == CHECKPOINT_AT:
+                analyzer.write_checkpoint(checkpoint_file, analysis['frame_count'] + 1, 1, analyzed_frames)
+            if analyzed_frames == CRASH_AT:
+                break
+        if analyzer.result_writer is not None:
+            analyzer.result_writer.flush()  # Records after the checkpoint reached the disk
+    finally:
+        cap.release()
+        analyzer.release_models()
+
+
+def resumed_run(video: str, output: str, checkpoint_file: str):
+    analyzer = make_analyzer(video, output)
+    cap = cv2.VideoCapture(video)
+    try:
+        start_frame = analyzer.resume_from_checkpoint(cap, load_checkpoint(checkpoint_file))
+        assert start_frame == CHECKPOINT_AT
+        for _ in analyzer.iter_analysis(cap, 1, start_frame):
+            pass
+        analyzer.close_results()
+    finally:
+        cap.release()
+        analyzer.release_models()
+
+
+def test_resumed_run_matches_uninterrupted_run():
+    with tempfile.TemporaryDirectory() as directory:
+        video = os.path.join(directory, 'drifting.avi')
+        write_video(video)
+        for extension in ('json', 'jsonl', 'cols'):
+            expected = os.path.join(directory, f'expected.{extension}')
+            resumed = os.path.join(directory, f'resumed.{extension}')
+            checkpoint_file = resumed + '.ckpt'
+            uninterrupted_run(video, expected)
+            interrupted_run(video, resumed, checkpoint_file)
+            resumed_run(video, resumed, checkpoint_file)
+
+            expected_records = list(iter_results(expected))
+            assert len(expected_records) == FRAMES
+            assert list(iter_results(resumed)) == expected_records, extension
+
+
+def test_state_round_trip():
+    state = {
+        'tracks': {3: {'bbox': (1, 2, 3, 4), 'emotion_history': deque([{'happy': np.float32(0.1)}], maxlen=10)}},
+        'entries': OrderedDict([(7, {'landmarks': np.ones((2, 3), dtype=np.float32) / 3}), (2, {'landmarks': None})]),
+        'video_source': 'talk.mp4'
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'run.ckpt')
+        save_checkpoint(path, state)
+        restored = load_checkpoint(path)
+
+    track = restored['tracks'][3]
+    assert track['bbox'] == (1, 2, 3, 4)
+    assert track['emotion_history'].maxlen == 10
+    happy = track['emotion_history'][0]['happy']
+    assert type(happy) is np.float32 and happy == np.float32(0.1)
+    assert list(restored['entries']) == [7, 2] and isinstance(restored['entries'], OrderedDict)
+    landmarks = restored['entries'][7]['landmarks']
+    assert landmarks.dtype == np.float32 and np.array_equal(landmarks, state['entries'][7]['landmarks'])
+    assert restored['video_source'] == 'talk.mp4'
+
+
+def test_foreign_file_is_rejected():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'run.ckpt')
+        with open(path, 'wb') as f:
+            f.write(b'\x80\x05\x95not json')
+        try:
+            load_checkpoint(path)
+        except ValueError as e:
+            assert 'checkpoint' in str(e)
+        else:
+            raise AssertionError("expected ValueError")
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e!r}")
+    if failures:
+        print(f"\n💥 {failures} test(s) failed!")
+        sys.exit(1)
+    print("\n🎉 All checkpoint tests passed!")
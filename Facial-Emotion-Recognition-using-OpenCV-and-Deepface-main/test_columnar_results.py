@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test that the columnar writer appends rows to disk as it goes
+"""
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from columnar_results import ColumnarResultWriter, iter_columnar_records, load_columnar
+from emotion_model import EMOTION_LABELS
+
+
+def record(frame_count, faces=2):
+    return {
+        'timestamp': frame_count / 30.0,
+        'frame_count': frame_count,
+        'faces': [{
+            'face_id': face_id,
+            'bbox': [face_id * 60, 10, 50, 50],
+            'emotions': {label: (1.0 if label == 'happy' else 0.0) for label in EMOTION_LABELS},
+            'dominant_emotion': 'happy',
+            'confusion_score': 0.25,
+            'disengagement_score': 0.5,
+            'engagement_score': 0.75,
+            'dominant_state': 'engaged',
+            'state_confidence': 0.5,
+            'engagement_metrics': {'eye_aspect_ratio': 0.25, 'gaze_off_screen': False,
+                                   'head_tilt': 2.0, 'blink_rate': 10.0}
+        } for face_id in range(faces)],
+        'summary': {'total_faces': faces, 'engaged_count': faces, 'disengaged_count': 0, 'confused_count': 0}
+    }
+
+
+def test_chunks_are_on_disk_before_close():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'session.cols')
+        writer = ColumnarResultWriter(path, chunk_size=8)
+        for i in range(10):
+            writer.write(record(i))
+
+        # Full chunks were appended as they filled; only the rest is in memory
+        assert os.path.getsize(os.path.join(path, 'faces.frame.npy')) == 128 + 16 * 8
+        assert len(writer._frame_rows['frame_count']) == 2
+
+        writer.flush()
+        data = load_columnar(path)
+        assert data['meta']['complete'] is False
+        assert data['meta']['num_frames'] == 10 and data['meta']['num_faces'] == 20
+        assert list(data['frames']['frame_count']) == list(range(10))
+        assert data['faces']['bbox'].shape == (20, 4)
+        assert data['faces']['emotions'].shape == (20, len(EMOTION_LABELS))
+
+        writer.write(record(10))
+        writer.close(extra_meta={'run_summary': {'frames': 11}})
+        assert [r['frame_count'] for r in iter_columnar_records(path)] == list(range(11))
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        assert meta['complete'] is True and meta['run_summary'] == {'frames': 11}
+
+
+def test_round_trip():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'session.cols')
+        records = [record(i, faces=i % 3) for i in range(7)]
+        with ColumnarResultWriter(path, chunk_size=4) as writer:
+            for r in records:
+                writer.write(r)
+        assert list(iter_columnar_records(path)) == records
+        assert np.load(os.path.join(path, 'faces.face_id.npy')).dtype == np.int32
+
+
+def test_resume_drops_rows_after_checkpoint():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'session.cols')
+        writer = ColumnarResultWriter(path, chunk_size=2)
+        for i in range(5):
+            writer.write(record(i))
+        state = writer.checkpoint_state()
+        for i in range(5, 9):
+            writer.write(record(i))
+        writer.flush()  # Interrupted here, after the checkpoint
+
+        resumed = ColumnarResultWriter(path, chunk_size=2, resume_state=state)
+        assert resumed.records_written == 5
+        for i in range(5, 7):
+            resumed.write(record(i))
+        resumed.close()
+        assert [r['frame_count'] for r in iter_columnar_records(path)] == list(range(7))
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e!r}")
+    if failures:
+        print(f"\n💥 {failures} test(s) failed!")
+        sys.exit(1)
+    print("\n🎉 All columnar result tests passed!")
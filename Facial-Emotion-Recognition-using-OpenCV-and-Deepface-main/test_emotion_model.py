@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Test the emotion backend errors that do not need a model
+"""
+import sys
+
+from emotion_model import create_emotion_model
+
+
+def test_onnx_backend_without_onnxruntime():
+    saved = sys.modules.get('onnxruntime')
+    sys.modules['onnxruntime'] = None  # Makes "import onnxruntime" raise ImportError
+    try:
+        create_emotion_model('onnx', onnx_model='emotion.onnx')
+    except ImportError as e:
+        assert 'requirements-onnx.txt' in str(e)
+    else:
+        raise AssertionError("expected ImportError")
+    finally:
+        if saved is None:
+            del sys.modules['onnxruntime']
+        else:
+            sys.modules['onnxruntime'] = saved
+
+
+def test_onnx_backend_needs_a_model():
+    try:
+        create_emotion_model('onnx')
+    except ValueError as e:
+        assert 'ONNX model' in str(e)
+    else:
+        raise AssertionError("expected ValueError")
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e!r}")
+    if failures:
+        print(f"\n💥 {failures} test(s) failed!")
+        sys.exit(1)
+    print("\n🎉 All emotion model tests passed!")
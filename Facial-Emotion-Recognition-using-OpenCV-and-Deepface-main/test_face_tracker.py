@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Test the frame-wide face assignment of the tracker
+"""
+import sys
+
+import numpy as np
+
+from face_tracker import _INFEASIBLE, FaceTracker, _assign
+
+
+def test_assignment_is_optimal():
+    # Greedy would take the cheapest pair (0, 0) and be left with (1, 1): total 101
+    cost = np.array([[1.0, 2.0], [2.0, 100.0]])
+    assert sorted(_assign(cost)) == [(0, 1), (1, 0)]
+
+
+def test_infeasible_pairs_are_dropped():
+    cost = np.array([[0.5, _INFEASIBLE], [_INFEASIBLE, _INFEASIBLE]])
+    assert _assign(cost) == [(0, 0)]
+    assert _assign(np.empty((0, 3))) == []
+
+
+def test_crossing_faces_keep_their_ids():
+    tracker = FaceTracker()
+    first = tracker.update([(100, 100, 40, 40), (150, 100, 40, 40)], step=0)
+    # Both faces move right; the left one lands nearest to where the right one was
+    second = tracker.update([(135, 100, 40, 40), (190, 100, 40, 40)], step=1)
+    assert second == first
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e!r}")
+    if failures:
+        print(f"\n💥 {failures} test(s) failed!")
+        sys.exit(1)
+    print("\n🎉 All face tracker tests passed!")
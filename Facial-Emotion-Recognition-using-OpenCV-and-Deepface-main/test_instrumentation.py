@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Test that stage timings recorded from several threads are not lost
+"""
+import sys
+import threading
+
+from instrumentation import RunInstrumentation
+
+THREADS = 4
+SAMPLES = 5000
+
+
+def test_concurrent_stages_keep_every_sample():
+    instrumentation = RunInstrumentation(enabled=True)
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # Switch threads as often as possible
+    try:
+        def work(index):
+            for i in range(SAMPLES):
+                with instrumentation.stage('shared'):
+                    pass
+                instrumentation.record(f'stage-{index}-{i % 7}', 0.001)
+                instrumentation.count_inference(index * SAMPLES + i, 'run')  # A new face every time
+
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        while any(thread.is_alive() for thread in threads):
+            instrumentation.summary()  # Snapshots while the stages add samples and histograms
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    summary = instrumentation.summary()
+    shared = summary['stages']['shared']
+    assert shared['count'] == THREADS * SAMPLES
+    assert sum(count for _, count in shared['buckets']) == THREADS * SAMPLES
+    assert len(summary['stages']) == 1 + THREADS * 7
+    assert summary['inferences']['totals']['run'] == THREADS * SAMPLES
+    assert len(summary['inferences']['faces']) == THREADS * SAMPLES
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e!r}")
+    if failures:
+        print(f"\n💥 {failures} test(s) failed!")
+        sys.exit(1)
+    print("\n🎉 All instrumentation tests passed!")
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test the track stitching and merging of the parallel analysis on synthetic results
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+
+from parallel_analysis import TrackStitcher, merge_tile_groups, stitch_segments, write_merged
+from result_io import iter_results, write_results
+
+
+def frame(frame_count, *faces):
+    """Frame record with (face_id, bbox) faces"""
+    return {
+        'frame_count': frame_count,
+        'timestamp': frame_count / 30.0,
+        'faces': [{'face_id': face_id, 'bbox': list(bbox)} for face_id, bbox in faces],
+        'summary': {'total_faces': len(faces)}
+    }
+
+
+def face_ids(frames):
+    return [[face['face_id'] for face in f['faces']] for f in frames]
+
+
+def test_reacquired_within_segment_keeps_id():
+    """A face lost for longer than the tracker's expiry comes back with a new local id"""
+    seat = (100, 100, 50, 50)
+    other = (400, 100, 50, 50)
+    gap = 20  # Empty frames, longer than expire_after
+    frames = [frame(i, (0, seat), (1, other)) for i in range(5)]
+    frames += [frame(5 + i, (1, other)) for i in range(gap)]
+    # Local track 0 expired; the tracker numbers the re-acquired face 2
+    frames += [frame(5 + gap + i, (2, (104, 98, 50, 50)), (1, other)) for i in range(5)]
+
+    stitcher = TrackStitcher(expire_after=10)
+    merged = [stitcher.map_frame(f) for f in frames]
+    assert face_ids(merged[-5:]) == [[0, 1]] * 5
+    assert stitcher.next_id == 2
+
+
+def test_live_track_is_not_taken_over():
+    """A new local id near a face that is only briefly missing gets its own id"""
+    seat = (100, 100, 50, 50)
+    frames = [frame(0, (0, seat)), frame(1), frame(2, (1, (110, 100, 50, 50)))]
+    stitcher = TrackStitcher(expire_after=10)
+    merged = [stitcher.map_frame(f) for f in frames]
+    assert face_ids(merged) == [[0], [], [1]]
+
+
+def test_far_face_gets_new_id():
+    frames = [frame(0, (0, (100, 100, 50, 50)))] + [frame(i) for i in range(1, 20)]
+    frames.append(frame(20, (1, (500, 300, 50, 50))))
+    stitcher = TrackStitcher(expire_after=10)
+    merged = [stitcher.map_frame(f) for f in frames]
+    assert face_ids(merged)[-1] == [1]
+
+
+def test_segments_are_stitched_at_boundaries():
+    first = [frame(i, (0, (100, 100, 50, 50)), (1, (300, 100, 50, 50))) for i in range(3)]
+    # The next worker numbers its tracks from 0 again, in another order
+    second = [frame(3 + i, (0, (302, 101, 50, 50)), (1, (98, 99, 50, 50)), (2, (600, 400, 50, 50)))
+              for i in range(3)]
+    merged = list(stitch_segments([first, second]))
+    assert face_ids(merged) == [[0, 1]] * 3 + [[1, 0, 2]] * 3
+
+
+def test_part_files_are_merged_record_by_record():
+    """Segment part files are stitched straight into the output file"""
+    with tempfile.TemporaryDirectory() as directory:
+        parts = [os.path.join(directory, f'segment-{i}.jsonl') for i in range(2)]
+        write_results(parts[0], [frame(i, (0, (100, 100, 50, 50))) for i in range(3)])
+        write_results(parts[1], [frame(3 + i, (0, (101, 100, 50, 50)), (1, (500, 100, 50, 50))) for i in range(2)])
+
+        for output in ('merged.json', 'merged.jsonl'):
+            path = os.path.join(directory, output)
+            written = write_merged(path, stitch_segments(iter_results(part) for part in parts))
+            assert written == {'output_file': path, 'frames': 5, 'last_frame_count': 4}
+            records = list(iter_results(path))
+            assert [r['frame_count'] for r in records] == list(range(5))
+            assert face_ids(records) == [[0]] * 3 + [[0, 1]] * 2
+
+
+def test_tile_groups_are_merged_by_frame():
+    group_a = [frame(i, (0, (0, 0, 50, 50)), (2, (200, 0, 50, 50))) for i in (0, 2, 4)]
+    group_b = [frame(i, (1, (100, 0, 50, 50))) for i in (0, 2, 4)]
+    merged = list(merge_tile_groups([iter(group_a), iter(group_b)]))
+    assert [r['frame_count'] for r in merged] == [0, 2, 4]
+    assert face_ids(merged) == [[0, 1, 2]] * 3
+    assert all(r['summary']['total_faces'] == 3 for r in merged)
+
+
+def test_single_process_options_are_rejected():
+    """The segment and tile workers would quietly ignore these flags"""
+    from simplified_analyzer import main
+    for argv, message in [(['--workers', '4', '--instrument'], '--instrument cannot be combined with --workers'),
+                          (['--workers', '2', '--realtime', '--pipeline'],
+                           '--realtime, --pipeline cannot be combined with --workers'),
+                          (['--gallery', '--instrument'], '--instrument cannot be combined with --gallery')]:
+        stderr = io.StringIO()
+        sys_argv = sys.argv
+        sys.argv = ['simplified_analyzer.py', '--video', 'talk.mp4'] + argv
+        try:
+            with contextlib.redirect_stderr(stderr):
+                main()
+        except SystemExit as e:
+            assert e.code == 2
+        else:
+            raise AssertionError(f"expected a usage error for {argv}")
+        finally:
+            sys.argv = sys_argv
+        assert message in stderr.getvalue(), stderr.getvalue()
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e!r}")
+    if failures:
+        print(f"\n💥 {failures} test(s) failed!")
+        sys.exit(1)
+    print("\n🎉 All parallel analysis tests passed!")
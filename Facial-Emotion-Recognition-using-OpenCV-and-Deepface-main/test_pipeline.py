@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Test the pipelined analyzer with tracks expiring on every frame
+
+The landmark stage is replaced by synthetic faces that jump to a new place on
+every frame, so every track expires almost immediately while the emotion
+stage keeps filling and expiring the emotion cache.
+"""
+import os
+import sys
+import tempfile
+import threading
+
+import cv2
+import numpy as np
+
+from emotion_cache import EmotionCache
+from emotion_model import default_emotion_result
+from pipeline import AnalysisPipeline
+from result_io import iter_results
+from simplified_analyzer import SimplifiedAnalyzer
+
+FRAMES = 120
+FACES_PER_FRAME = 24
+WIDTH, HEIGHT = 320, 240
+
+
+def write_video(path: str, frames: int = FRAMES):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 30, (WIDTH, HEIGHT))
+    rng = np.random.default_rng(0)
+    for _ in range(frames):
+        writer.write(rng.integers(0, 255, (HEIGHT, WIDTH, 3), dtype=np.uint8))
+    writer.release()
+
+
+class ThreadRecordingCache(EmotionCache):
+    """Emotion cache remembering which threads modified it"""
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.threads = set()
+
+    def put(self, *args, **kwargs):
+        self.threads.add(threading.current_thread().name)
+        super().put(*args, **kwargs)
+
+    def evict(self, face_ids):
+        self.threads.add(threading.current_thread().name)
+        super().evict(face_ids)
+
+
+class JumpingFacesAnalyzer(SimplifiedAnalyzer):
+    """Analyzer whose faces move too far to be matched, so tracks expire constantly"""
+
+    def detect_faces(self, frame, results):
+        offset = (self.analysis_step % 2) * 160  # Alternate halves: no match is within range
+        bboxes = [(offset + (i % 6) * 12, (i // 6) * 55, 10, 10) for i in range(FACES_PER_FRAME)]
+        face_ids = self.track_faces(bboxes)
+        faces = []
+        for face_id, (x, y, w, h) in zip(face_ids, bboxes):
+            faces.append({
+                'face_id': face_id,
+                'analysis_step': self.analysis_step,
+                'bbox': (x, y, w, h),
+                'engagement_metrics': {'eye_aspect_ratio': 0.3, 'gaze_off_screen': False,
+                                       'head_tilt': 0.0, 'blink_rate': 0.0},
+                'landmarks': np.array([[x, y], [x + w, y + h]], dtype=np.float32),
+                'roi': frame[y:y + h, x:x + w]
+            })
+        results['summary']['total_faces'] = len(faces)
+        self.analysis_step += 1
+        return faces
+
+    def analyze_face_emotions(self, face_id, face_roi):
+        return default_emotion_result()
+
+
+def test_pipelined_run_with_forced_expiry():
+    with tempfile.TemporaryDirectory() as directory:
+        video = os.path.join(directory, 'jumping.avi')
+        output = os.path.join(directory, 'results.jsonl')
+        write_video(video)
+
+        analyzer = JumpingFacesAnalyzer(video_source=video, output_file=output, batch_emotions=False)
+        analyzer.tracker.max_age = 0
+        analyzer.tracker.expire_after = 1
+        analyzer.emotion_cache = ThreadRecordingCache(ttl=1)
+        cap = cv2.VideoCapture(video)
+        try:
+            pipeline = AnalysisPipeline(analyzer, queue_size=2)
+            analyzed = [analysis for _, analysis in pipeline.run(cap)]
+            analyzer.close_results()
+        finally:
+            cap.release()
+            analyzer.release_models()
+
+        records = list(iter_results(output))
+        assert records == analyzed
+        assert len(records) == FRAMES
+        assert [r['frame_count'] for r in records] == list(range(FRAMES))
+        assert all(len(r['faces']) == FACES_PER_FRAME for r in records)
+        assert analyzer.expired_tracks is None
+        # Only the emotion stage touched the cache, and every expired track was evicted
+        assert analyzer.emotion_cache.threads == {'analysis-emotions'}
+        assert set(analyzer.emotion_cache.entries) <= set(analyzer.tracker.tracks)
+        assert analyzer.emotion_cache.stats['evicted'] > 0
+        assert analyzer.tracker.next_id == FRAMES * FACES_PER_FRAME
+
+
+def run_until(video: str, output: str, frames: int, close: bool):
+    """
+    Leave the pipeline after frames results, by stop() or by closing the
+    generator, which is returned so that it is not collected (and finalized)
+    before the checks
+    """
+    analyzer = JumpingFacesAnalyzer(video_source=video, output_file=output, batch_emotions=False)
+    analyzer.tracker.max_age = 0
+    analyzer.tracker.expire_after = 1
+    analyzer.emotion_cache = ThreadRecordingCache(ttl=1)
+    cap = cv2.VideoCapture(video)
+    try:
+        pipeline = AnalysisPipeline(analyzer, queue_size=2)
+        analyzed = pipeline.run(cap)
+        for count, _ in enumerate(analyzed, 1):
+            if count == frames:
+                break
+        if close:
+            analyzed.close()
+        else:
+            pipeline.stop()
+        return analyzer, pipeline, analyzed
+    finally:
+        cap.release()
+        analyzer.release_models()
+
+
+def test_early_exit_stops_the_stages():
+    with tempfile.TemporaryDirectory() as directory:
+        video = os.path.join(directory, 'jumping.avi')
+        write_video(video)
+        for close in (False, True):
+            analyzer, pipeline, _analyzed = run_until(video, os.path.join(directory, 'results.jsonl'), 10, close)
+            assert not any(thread.is_alive() for thread in pipeline._threads)
+            # Tracker and cache are back with the caller, with no expired track left in the cache
+            assert analyzer.expired_tracks is None
+            assert set(analyzer.emotion_cache.entries) <= set(analyzer.tracker.tracks)
+            assert pipeline.stats['output'].finished_at is not None
+            pipeline.stop()  # Idempotent
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e!r}")
+    if failures:
+        print(f"\n💥 {failures} test(s) failed!")
+        sys.exit(1)
+    print("\n🎉 All pipeline tests passed!")
@@ -1,74 +1,45 @@
-import requests
 import os
 import sys
 import time
-import urllib3
 from dotenv import load_dotenv
 
+from recall_client import RecallAPIError, get_client
+
 # Load environment variables from .env file
 load_dotenv()
 
 def create_bot(meeting_url, bot_name=None):
     """Create a new bot and return bot data"""
-    region = os.getenv('RECALLAI_REGION', 'us')
-    api_key = os.getenv('RECALLAI_API_KEY')
-    
-    if not api_key:
+    if not os.getenv('RECALLAI_API_KEY'):
         print("Error: RECALLAI_API_KEY environment variable is required")
         return None
     
     if not bot_name:
         bot_name = f"Bot-{int(time.time())}"
     
-    url = f"https://{region}.recall.ai/api/v1/bot"
-    headers = {"Authorization": f"Token {api_key}"}
-    
-    config = {
-        "meeting_url": meeting_url,
-        "bot_name": bot_name,
-        "recording_config": {
-            "transcript": {
-                "provider": {"meeting_captions": {}}
-            },
-            "video_mixed_layout": "gallery_view_v2",
-            "video_mixed_participant_video_when_screenshare": "overlap"
-        }
-    }
-    
     try:
         print(f"Creating bot for: {meeting_url}")
-        resp = requests.post(url, headers=headers, json=config)
-        
-        if resp.status_code == 201:
-            bot_data = resp.json()
-            print(f"Bot created! ID: {bot_data['id']}")
-            return bot_data
-        else:
-            print(f"Failed to create bot: {resp.status_code}")
-            print(resp.text)
-            return None
-            
+        bot_data = get_client().create_bot(meeting_url, bot_name)
+        print(f"Bot created! ID: {bot_data['id']}")
+        return bot_data
+    
+    except RecallAPIError as e:
+        print(f"Failed to create bot: {e.status_code or e}")
+        if e.body:
+            print(e.body)
+        return None
     except Exception as e:
         print(f"Error: {e}")
         return None
 
 def get_bot(bot_id):
     """Get bot details by ID"""
-    region = os.getenv('RECALLAI_REGION', 'us')
-    api_key = os.getenv('RECALLAI_API_KEY')
-    
-    url = f"https://{region}.recall.ai/api/v1/bot/{bot_id}"
-    headers = {"Authorization": f"Token {api_key}"}
-    
     try:
-        resp = requests.get(url, headers=headers)
-        
-        if resp.status_code == 200:
-            return resp.json()
-        else:
-            print(f" Failed to get bot: {resp.status_code}")
-            return None
-            
+        return get_client().get_bot(bot_id)
+    
+    except RecallAPIError as e:
+        print(f" Failed to get bot: {e.status_code or e}")
+        return None
     except Exception as e:
         print(f" Error: {e}")
         return None
@@ -1,8 +1,9 @@
-import requests
 import os
 import sys
 from dotenv import load_dotenv
 
+from recall_client import RecallAPIError, RecallClient
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -23,23 +24,11 @@ if len(sys.argv) < 2:
 
 meeting_url = str(sys.argv[1])
 
-url = f"https://{os.getenv('RECALLAI_REGION')}.recall.ai/api/v1/bot"
-headers = {
-    "Authorization": f"Token {os.getenv('RECALLAI_API_KEY')}",
-    "Content-Type": "application/json"
-}
-data = {
-    "meeting_url": meeting_url,
-    "bot_name": os.getenv("BOT_NAME", "My Recording Bot"),
-    "recording_config": {
-        "transcript": {
-            "provider": {"meeting_captions": {}}
-        },
-        "video_mixed_layout": "gallery_view_v2",
-        "video_mixed_participant_video_when_screenshare": "overlap"
-    }
-}
-
-resp = requests.post(url, headers=headers, json=data)
-print(resp.status_code)
-print(resp.json())
+with RecallClient(api_key=os.getenv('RECALLAI_API_KEY'), region=os.getenv('RECALLAI_REGION')) as client:
+    try:
+        bot_data = client.create_bot(meeting_url, os.getenv("BOT_NAME", "My Recording Bot"))
+        print(f"Bot created! ID: {bot_data['id']}")
+        print(bot_data)
+    except RecallAPIError as e:
+        print(e.status_code or e)
+        print(e.body)
@@ -1,8 +1,9 @@
-import requests
 import os
 import sys
 from dotenv import load_dotenv
 
+from recall_client import RecallAPIError, RecallClient
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -26,21 +27,14 @@ else:
     print("Or set RECALLAI_BOT_ID in your .env file")
     sys.exit(1)
 
-url = f"https://{region}.recall.ai/api/v1/bot/{bot_id}"
-headers = {"Authorization": f"Token {api_key}"}
-
 try:
-    resp = requests.get(url, headers=headers)
-    print(f"Status Code: {resp.status_code}")
+    with RecallClient(api_key=api_key, region=region) as client:
+        bot_data = client.get_bot(bot_id)
+    print(bot_data)
     
-    if resp.status_code == 200:
-        bot_data = resp.json()
-        print(bot_data)
-    else:
-        print(f"Error: {resp.status_code}")
-        print(resp.text)
-        
-except requests.exceptions.RequestException as e:
-    print(f"Request failed: {e}")
+except RecallAPIError as e:
+    print(f"Error: {e.status_code or e}")
+    if e.body:
+        print(e.body)
 except Exception as e:
     print(f"Unexpected error: {e}")
@@ -0,0 +1,263 @@
+"""
+Recall.ai API client
+
+One pooled httpx.AsyncClient per client instance: connections to the Recall
+API are kept alive and reused across calls, every request has connect and
+read timeouts, and rate limiting (429) or server errors (5xx) are retried
+with exponentially growing, fully jittered delays (Retry-After is honoured
+when Recall sends it).
+
+Requests that create something (POST) are only retried when Recall did not
+process them: on 429 and on connection errors. A 5xx or a read timeout on a
+POST could mean the bot was created anyway, so those are raised instead of
+risking a duplicate bot.
+
+AsyncRecallClient is for async code. RecallClient is a synchronous facade
+for scripts and worker threads: it runs an AsyncRecallClient on a private
+event loop thread, so the pooled connections outlive each call.
+get_client() returns the process-wide RecallClient.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+
+import httpx
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+DEFAULT_TIMEOUT = httpx.Timeout(connect=5.0, read=30.0, write=30.0, pool=10.0)
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Methods that can be repeated without side effects
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+# Longest Retry-After (seconds) we are willing to wait
+MAX_RETRY_AFTER = 60.0
+
+
+class RecallAPIError(Exception):
+    """A Recall API call failed (status_code is None for network errors)"""
+
+    def __init__(self, status_code, message, body=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = body
+
+
+# Webhook events sent once a bot's recording is complete and downloadable;
+# bot.status_change is the legacy event, done when data.status.code is "done"
+RECORDING_DONE_EVENTS = {"recording.done", "bot.done"}
+
+
+def is_recording_done(webhook_data):
+    """Whether a Recall webhook announces a finished recording"""
+    event = webhook_data.get("event")
+    if event in RECORDING_DONE_EVENTS:
+        return True
+    if event == "bot.status_change":
+        status = (webhook_data.get("data") or {}).get("status") or {}
+        return status.get("code") == "done"
+    return False
+
+
+def recall_base_url(region=None):
+    """Base URL of the Recall API (RECALLAI_BASE_URL overrides the region URL)"""
+    base_url = os.getenv('RECALLAI_BASE_URL')
+    if base_url:
+        return base_url.rstrip('/')
+    region = region or os.getenv('RECALLAI_REGION', 'us')
+    return f"https://{region}.recall.ai/api/v1"
+
+
+def bot_config(meeting_url, bot_name):
+    """Bot creation payload: captions transcript and a gallery-view mixed video"""
+    return {
+        "meeting_url": meeting_url,
+        "bot_name": bot_name,
+        "recording_config": {
+            "transcript": {
+                "provider": {"meeting_captions": {}}
+            },
+            "video_mixed_layout": "gallery_view_v2",
+            "video_mixed_participant_video_when_screenshare": "overlap"
+        }
+    }
+
+
+def _retry_after(response):
+    """Delay requested by a Retry-After header in seconds, or None"""
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return min(max(0.0, float(value)), MAX_RETRY_AFTER)
+    except ValueError:
+        return None  # HTTP-date form; fall back to our own backoff
+
+
+class AsyncRecallClient:
+    """Async Recall API client with pooled keep-alive connections and retries"""
+
+    def __init__(self, api_key=None, region=None, base_url=None, timeout=DEFAULT_TIMEOUT,
+                 max_retries=4, backoff_base=0.5, backoff_max=10.0, max_connections=10):
+        """
+        Args:
+            api_key: Recall API key (default: RECALLAI_API_KEY)
+            region: Recall region (default: RECALLAI_REGION or 'us')
+            base_url: API base URL, overrides the region (e.g. a test server)
+            timeout: httpx.Timeout or seconds for connect/read/write/pool
+            max_retries: Retries after the first attempt
+            backoff_base: Upper bound of the first retry delay in seconds;
+                doubled on every retry
+            backoff_max: Upper bound of any retry delay in seconds
+            max_connections: Size of the connection pool
+        """
+        api_key = api_key or os.getenv('RECALLAI_API_KEY')
+        if not api_key:
+            raise ValueError("RECALLAI_API_KEY environment variable is required")
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retries = 0  # Retries made over the client's lifetime
+        self._client = httpx.AsyncClient(
+            base_url=(base_url or recall_base_url(region)).rstrip('/'),
+            headers={"Authorization": f"Token {api_key}", "Accept": "application/json"},
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        )
+
+    def _backoff(self, attempt):
+        """Full-jitter exponential backoff delay for a retry attempt (0-based)"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def request(self, method, path, **kwargs):
+        """
+        Send a request and return the decoded JSON body
+
+        Raises:
+            RecallAPIError: Non-2xx response after the retries, or a network
+                error / timeout that could not be retried
+        """
+        method = method.upper()
+        idempotent = method in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            try:
+                response = await self._client.request(method, path, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                # The request never reached Recall, so any method can be retried
+                error, delay = e, None
+            except httpx.TransportError as e:
+                if not idempotent:
+                    raise RecallAPIError(None, f"{method} {path} failed: {e!r}") from e
+                error, delay = e, None
+            else:
+                if response.is_success:
+                    return response.json() if response.content else None
+                retryable = response.status_code == 429 or (idempotent and response.status_code in RETRY_STATUSES)
+                if not retryable or attempt >= self.max_retries:
+                    raise RecallAPIError(
+                        response.status_code,
+                        f"{method} {path} returned {response.status_code}",
+                        response.text
+                    )
+                error, delay = None, _retry_after(response)
+
+            if attempt >= self.max_retries:
+                raise RecallAPIError(None, f"{method} {path} failed after {attempt + 1} attempts: {error!r}") from error
+            await asyncio.sleep(self._backoff(attempt) if delay is None else delay)
+            attempt += 1
+            self.retries += 1
+
+    async def create_bot(self, meeting_url, bot_name=None):
+        """Create a bot that joins meeting_url and records it"""
+        bot_name = bot_name or f"Bot-{int(time.time())}"
+        return await self.request("POST", "/bot", json=bot_config(meeting_url, bot_name))
+
+    async def get_bot(self, bot_id):
+        """Bot details, including its recordings and their download URLs"""
+        return await self.request("GET", f"/bot/{bot_id}")
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+
+class RecallClient:
+    """Synchronous facade over AsyncRecallClient, running on its own event loop thread"""
+
+    def __init__(self, **options):
+        """
+        Args:
+            **options: AsyncRecallClient arguments
+        """
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="recall-client", daemon=True)
+        self._thread.start()
+        try:
+            self._client = self._call(self._create(options))
+        except Exception:
+            self._stop_loop()
+            raise
+
+    async def _create(self, options):
+        # Built on the loop thread so the pool belongs to that loop
+        return AsyncRecallClient(**options)
+
+    def _call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    @property
+    def retries(self):
+        return self._client.retries
+
+    def request(self, method, path, **kwargs):
+        return self._call(self._client.request(method, path, **kwargs))
+
+    def create_bot(self, meeting_url, bot_name=None):
+        return self._call(self._client.create_bot(meeting_url, bot_name))
+
+    def get_bot(self, bot_id):
+        return self._call(self._client.get_bot(bot_id))
+
+    def _stop_loop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop.close()
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        self._call(self._client.aclose())
+        self._stop_loop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_shared_client = None
+_shared_lock = threading.Lock()
+
+
+def get_client():
+    """Process-wide RecallClient, created on first use"""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = RecallClient()
+        return _shared_client
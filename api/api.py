@@ -1,4 +1,4 @@
-from fastapi import FastAPI, Request, HTTPException, Depends, status
+from fastapi import FastAPI, Request, HTTPException, Depends, Query, status
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, EmailStr
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -18,10 +18,17 @@ from mastra_agent import MastraEngagementAgent
 
 # Add the GoogleMeetAPI directory to the path so we can import from create_and_monitor
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'GoogleMeetAPI'))
+# Add the analyzer directory to the path so we can read its result files
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'Facial-Emotion-Recognition-using-OpenCV-and-Deepface-main'))
 
 # Import the get_bot function from create_and_monitor
 from create_and_monitor import get_bot
-from video_downloader import download_video_from_s3, list_downloaded_videos
+from recall_client import is_recording_done
+from video_downloader import stream_and_analyze, list_downloaded_videos
+from result_io import summarize_session
+from jobs import Job, JobQueue, QueueFullError
+from response_cache import ResponseCache
+import student_pages
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -32,8 +39,16 @@ load_dotenv()
 
 SUPABASE_URL = os.environ["SUPABASE_URL"]
 SUPABASE_KEY = os.environ["SUPABASE_KEY"]
+# Store the full recording on disk as well (analysis always streams from the URL)
+KEEP_RECORDINGS = os.environ.get("KEEP_RECORDINGS", "false").lower() in ("1", "true", "yes")
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+# Dashboard responses only change when a session is ingested (see process_json_and_store)
+response_cache = ResponseCache(
+    ttl=float(os.environ.get("RESPONSE_CACHE_TTL", "300")),
+    max_entries=int(os.environ.get("RESPONSE_CACHE_SIZE", "256"))
+)
+
 # Create the FastAPI app
 app = FastAPI(
     title="Student Engagement Dashboard API",
@@ -57,27 +72,65 @@ def read_root():
 def health_check():
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
-# Student engagement dashboard routes
+# Student engagement dashboard routes (cached per endpoint and query parameters)
 @app.get("/students")
-async def list_students(session: AsyncSession = Depends(get_session)):
-    res = await session.execute(text(
-        "SELECT s.id, first_name, last_name, email, AVG(engaged_percentage), COUNT(*), string_agg(name, ',') FROM public.students as s LEFT JOIN public.class_attendances as a on s.id = student_id JOIN public.class_sessions as c ON session_id = c.id GROUP BY s.id"
-    ))
-    return [{"id": row["id"], "email": row["email"], "first_name": row["first_name"], "last_name": row["last_name"], "average_engagement": row["avg"], "total_sessions": row["count"], 'classes': row['string_agg'] } for row in res.mappings().all()]
+async def list_students(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(student_pages.DEFAULT_PAGE_SIZE, ge=1, le=student_pages.MAX_PAGE_SIZE),
+    sort: str = student_pages.DEFAULT_SORT,
+    class_name: Optional[str] = None,
+    min_engagement: Optional[float] = Query(None, ge=0, le=100),
+    max_engagement: Optional[float] = Query(None, ge=0, le=100),
+    name_prefix: Optional[str] = None,
+    include_total: bool = False,
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    One page of students, keyset-paginated (see student_pages.py)
+
+    Pass the returned next_cursor back as cursor for the following page; it
+    is None on the last page. include_total adds the number of matching
+    students (counted on every call, so only ask for it on the first page).
+    """
+    filters = dict(class_name=class_name, min_engagement=min_engagement,
+                   max_engagement=max_engagement, name_prefix=name_prefix)
+    try:
+        sql, params = student_pages.page_query(sort, cursor, limit, **filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def load():
+        res = await session.execute(text(sql), params)
+        page = student_pages.page_result(sort, res.mappings().all(), limit)
+        if include_total:
+            count_sql, count_params = student_pages.count_query(**filters)
+            page["total"] = (await session.execute(text(count_sql), count_params)).scalar() or 0
+        return page
+    return await response_cache.get_or_load("students", dict(request.query_params), load)
 
 @app.get("/students/at-risk")
-async def list_at_risk_students(session: AsyncSession = Depends(get_session)):
-    res = await session.execute(text(
-        "SELECT s.id, first_name, last_name, email, AVG(engaged_percentage) as avg, COUNT(*), string_agg(name, ',') FROM public.students as s LEFT JOIN public.class_attendances as a on s.id = student_id JOIN public.class_sessions as c ON session_id = c.id GROUP BY s.id ORDER BY avg ASC LIMIT 3"
-    ))
-    return [{"id": row["id"], "email": row["email"], "first_name": row["first_name"], "last_name": row["last_name"], "average_engagement": row["avg"], "total_sessions": row["count"], 'classes': row['string_agg'] } for row in res.mappings().all()]
+async def list_at_risk_students(request: Request, session: AsyncSession = Depends(get_session)):
+    async def load():
+        res = await session.execute(text(
+            "SELECT s.id, first_name, last_name, email, r.average_engagement, r.sessions_count, r.class_names FROM public.student_engagement_rollups as r JOIN public.students as s ON s.id = r.student_id WHERE r.sessions_count > 0 ORDER BY r.average_engagement ASC, r.student_id LIMIT 3"
+        ))
+        return [student_pages.student_to_dict(row) for row in res.mappings().all()]
+    return await response_cache.get_or_load("students_at_risk", dict(request.query_params), load)
 
 @app.get("/class-sessions")
-async def list_class_sessions(session: AsyncSession = Depends(get_session)):
-    res = await session.execute(text(
-        "SELECT id, name, AVG(engaged_percentage), COUNT(*), start_time, duration FROM public.class_sessions LEFT JOIN public.class_attendances ON id = session_id GROUP BY id"
-    ))
-    return [{"id": row["id"], "duration": row["duration"]} for row in res.mappings().all()]
+async def list_class_sessions(request: Request, session: AsyncSession = Depends(get_session)):
+    async def load():
+        res = await session.execute(text(
+            "SELECT id, name, r.average_engagement as avg, r.attendance_count as count, start_time, duration FROM public.class_sessions LEFT JOIN public.session_engagement_rollups as r ON id = r.session_id"
+        ))
+        return [{"id": row["id"], "duration": row["duration"]} for row in res.mappings().all()]
+    return await response_cache.get_or_load("class_sessions", dict(request.query_params), load)
+
+@app.get("/cache/stats")
+def cache_stats():
+    """Hit/miss counters of the dashboard response cache"""
+    return response_cache.summary()
 
 # Mastra Agent Endpoints
 @app.post("/mastra/process-engagement")
@@ -158,19 +211,94 @@ async def send_test_email(student_id: str, session_id: str):
         raise HTTPException(status_code=500, detail=f"Error sending test email: {str(e)}")
 
 @app.get("/metrics")
-async def list_metrics(session: AsyncSession = Depends(get_session)):
-    res = await session.execute(text(
-        "SELECT AVG(engaged_percentage) as engagement, COUNT(DISTINCT student_id) as num_students, AVG(confused_percentage) as confusion, AVG(duration) as duration FROM public.class_attendances JOIN public.class_sessions ON session_id = id"
-    ))
-    metrics = res.mappings().all()[0]
-    print(metrics)
-    return metrics
+async def list_metrics(request: Request, session: AsyncSession = Depends(get_session)):
+    async def load():
+        res = await session.execute(text(
+            "SELECT engaged_sum / NULLIF(attendance_count, 0) as engagement, student_count as num_students, confused_sum / NULLIF(attendance_count, 0) as confusion, duration_sum / NULLIF(attendance_count, 0) as duration FROM public.engagement_rollup_totals"
+        ))
+        metrics = dict(res.mappings().all()[0])
+        print(metrics)
+        return metrics
+    return await response_cache.get_or_load("metrics", dict(request.query_params), load)
+
+# Background jobs for webhook processing (fetch, download + analysis, ingest)
+job_queue = JobQueue(
+    max_workers=int(os.environ.get("JOB_WORKERS", "2")),
+    max_pending=int(os.environ.get("JOB_QUEUE_SIZE", "20"))
+)
+
+@app.on_event("shutdown")
+def stop_job_queue():
+    job_queue.shutdown(wait=False)
+
+def find_video_download_url(bot_data: Dict[str, Any]) -> Optional[str]:
+    """Mixed video download URL of the bot's first recording, if any"""
+    recordings = bot_data.get("recordings") or []
+    if not recordings:
+        logger.warning("❌ No recordings found in bot_data")
+        return None
+    
+    recording = recordings[0]  # Get first recording
+    logger.info(f"Found recording with ID: {recording.get('id')}")
+    video_mixed = recording.get("media_shortcuts", {}).get("video_mixed")
+    if not video_mixed:
+        logger.warning("❌ No video_mixed in media_shortcuts")
+        return None
+    download_url = (video_mixed.get("data") or {}).get("download_url")
+    if not download_url:
+        logger.warning("❌ No download_url in video_mixed.data")
+        return None
+    logger.info(f"✅ VIDEO DOWNLOAD URL FOUND: {download_url[:100]}...")
+    return download_url
+
+def process_recall_recording(job: Job) -> Dict[str, Any]:
+    """
+    Job handler: fetch the bot, analyze its recording while it downloads and
+    store the results
+    """
+    bot_id = job.key
+    
+    job.start_stage("fetch")
+    bot_data = get_bot(bot_id)
+    if not bot_data:
+        raise RuntimeError(f"Failed to retrieve bot data for {bot_id}")
+    video_download_url = find_video_download_url(bot_data)
+    if not video_download_url:
+        raise RuntimeError("No video download URL in the bot's recordings")
+    
+    # The recording is analyzed as it streams in, so download and analysis are one stage
+    job.start_stage("download_and_analysis")
+    analysis = stream_and_analyze(
+        video_download_url, bot_id, keep_video=KEEP_RECORDINGS,
+        progress_callback=lambda progress: job.set_progress(progress["progress"])
+    )
+    if analysis["status"] != "success":
+        raise RuntimeError(analysis["error"])
+    
+    job.start_stage("ingest")
+    session_id = process_json_and_store(analysis["results_path"], source_key=bot_id)
+    
+    result = {
+        "video_download_url": video_download_url,
+        "results_path": analysis["results_path"],
+        "frames_analyzed": analysis["frames_analyzed"],
+        "time_to_first_result": analysis["time_to_first_result"],
+        "analysis_time": analysis["analysis_time"],
+        "session_id": session_id
+    }
+    stored_video = analysis.get("download", {})
+    if stored_video.get("status") == "success":
+        result["video_path"] = stored_video["video_path"]
+        result["file_size"] = stored_video["file_size"]
+    return result
 
 # Main Recall webhook endpoint
 @app.post("/webhook/recall/", response_model=WebhookResponse)
 async def recall_webhook(request: Request):
     """
-    Handle Recall.ai webhook events and call get_bot with the bot_id
+    Handle Recall.ai webhook events: when a bot's recording is done, enqueue
+    a job that processes it and return immediately (poll /jobs/{job_id} for
+    its status). Other events are acknowledged and ignored.
     """
     try:
         # Get the raw body
@@ -205,161 +333,104 @@ async def recall_webhook(request: Request):
         
         logger.info(f"Received Recall webhook for bot_id: {bot_id}")
         
-        # Call get_bot function from create_and_monitor.py
-        bot_data = get_bot(bot_id)
-        
-        if bot_data:
-            logger.info(f"Successfully retrieved bot data for {bot_id}")
-            logger.info(f"Bot data keys: {list(bot_data.keys()) if isinstance(bot_data, dict) else 'Not a dict'}")
-            
-            # Extract video download URL from bot data
-            video_download_url = None
-            recording_id = None
-            
-            # Navigate through the nested structure to find video download URL
-            if "recordings" in bot_data and len(bot_data["recordings"]) > 0:
-                recording = bot_data["recordings"][0]  # Get first recording
-                recording_id = recording.get("id")
-                logger.info(f"Found recording with ID: {recording_id}")
-                logger.info(f"Recording keys: {list(recording.keys())}")
-                
-                if "media_shortcuts" in recording and "video_mixed" in recording["media_shortcuts"]:
-                    video_mixed = recording["media_shortcuts"]["video_mixed"]
-                    logger.info(f"Video mixed keys: {list(video_mixed.keys())}")
-                    if "data" in video_mixed and "download_url" in video_mixed["data"]:
-                        video_download_url = video_mixed["data"]["download_url"]
-                        logger.info(f"✅ VIDEO DOWNLOAD URL FOUND: {video_download_url[:100]}...")
-                        
-                        # Download the video
-                        logger.info(f"Starting video download for bot {bot_id}")
-                        download_result = download_video_from_s3(video_download_url, bot_id)
-                        
-                        if download_result["status"] == "success":
-                            logger.info(f"✅ Video downloaded successfully!")
-                            logger.info(f"File path: {download_result['video_path']}")
-                            logger.info(f"File size: {download_result['file_size']:,} bytes")
-                        else:
-                            logger.error(f"❌ Video download failed: {download_result['error']}")
-                    else:
-                        logger.warning("❌ No download_url in video_mixed.data")
-                else:
-                    logger.warning("❌ No video_mixed in media_shortcuts")
-            else:
-                logger.warning("❌ No recordings found in bot_data")
-            
-            # Extract transcript download URL as well
-            transcript_download_url = None
-            if "recordings" in bot_data and len(bot_data["recordings"]) > 0:
-                recording = bot_data["recordings"][0]
-                if "media_shortcuts" in recording and "transcript" in recording["media_shortcuts"]:
-                    transcript = recording["media_shortcuts"]["transcript"]
-                    if "data" in transcript and "download_url" in transcript["data"]:
-                        transcript_download_url = transcript["data"]["download_url"]
-                        logger.info(f"✅ TRANSCRIPT DOWNLOAD URL FOUND: {transcript_download_url[:100]}...")
-            
-            # Prepare response data
-            response_data = {
-                "video_download_url": video_download_url
-            }
-            
-            # Add download info if video was downloaded
-            if video_download_url and 'download_result' in locals():
-                response_data["download_status"] = download_result["status"]
-                if download_result["status"] == "success":
-                    response_data["video_path"] = download_result["video_path"]
-                    response_data["file_size"] = download_result["file_size"]
-                    response_data["download_time"] = download_result["download_time"]
-                else:
-                    response_data["download_error"] = download_result["error"]
-            
+        # Only a finished recording is processed; status changes and other
+        # events for the bot would otherwise analyze and ingest it again
+        if not is_recording_done(webhook_data):
+            logger.info(f"Ignoring {webhook_data.get('event')} event for bot {bot_id}")
             return WebhookResponse(
-                status="success",
-                message=f"Webhook processed successfully for bot {bot_id}",
-                processed_at=datetime.now().isoformat(),
-                bot_data=response_data
-            )
-        else:
-            logger.error(f"Failed to retrieve bot data for {bot_id}")
-            return WebhookResponse(
-                status="error",
-                message=f"Failed to retrieve bot data for {bot_id}",
+                status="ignored",
+                message=f"Event {webhook_data.get('event')} does not start processing",
                 processed_at=datetime.now().isoformat()
             )
-            
+        
+        try:
+            job, created = job_queue.submit(
+                "recall_recording", bot_id, process_recall_recording,
+                payload={"event": webhook_data.get("event")}
+            )
+        except QueueFullError as e:
+            logger.error(f"Job queue full, rejecting webhook for bot {bot_id}: {e}")
+            raise HTTPException(status_code=503, detail="Job queue is full, retry later")
+        
+        return WebhookResponse(
+            status="accepted",
+            message=f"Queued processing for bot {bot_id}" if created else f"Bot {bot_id} already has a {job.status} job",
+            processed_at=datetime.now().isoformat(),
+            bot_data={"job_id": job.id, "job_status": job.status, "job_url": f"/jobs/{job.id}"}
+        )
+    
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing webhook: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Webhook processing failed: {str(e)}")
 
-def process_json_and_store(json_path):
-    with open(json_path, "r") as f:
-        data = json.load(f)
-
-    if not data:
+# Job status endpoints
+@app.get("/jobs")
+def list_jobs(status: Optional[str] = None, limit: int = 50):
+    """Recent background jobs, newest first"""
+    return {"counts": job_queue.counts(), "jobs": job_queue.list(status=status, limit=limit)}
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Stage, progress and timings of one background job"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+def process_json_and_store(json_path, source_key: Optional[str] = None):
+    # Count states per face; accepts JSON, JSONL or columnar (.cols) analysis output.
+    # source_key (the Recall bot id) makes the ingest idempotent: a recording
+    # that was already stored returns its existing session id
+    summary = summarize_session(json_path)
+
+    if not summary["num_frames"]:
         print("No frames found in file")
-        return
+        return None
+
+    state_counts = summary["state_counts"]
+    frame_counts = summary["frame_counts"]
 
     # Duration = last - first frame
-    first_frame = data[0].get("timestamp", 0)
-    last_frame = data[-1].get("timestamp", len(data) - 1)
+    first_frame = summary["first_timestamp"]
+    last_frame = summary["last_timestamp"]
     duration = (last_frame - first_frame)//60
 
-    # Create new session
+    # Create the session, its students and attendances and update the
+    # engagement rollups in one transaction (ingest_session, sql/rollups.sql)
     session_id = str(uuid.uuid4())
     session_name = os.path.basename(json_path)
 
-    supabase.table("class_sessions").insert({
-        "id": session_id,
-        "duration": duration,
-        # optional if you add a "name" column
-        # "name": session_name
-    }).execute()
-
-    print(f"✅ Created class session {session_name} ({session_id}), duration={duration}")
-
-    # Count states
-    state_counts = defaultdict(lambda: defaultdict(int))
-    frame_counts = defaultdict(int)
-
-    for frame in data:
-        for face in frame.get("faces", []):
-            face_id = str(face["face_id"])
-            state = face["dominant_state"]
-            state_counts[face_id][state] += 1
-            frame_counts[face_id] += 1
-
-    # Process each student
+    attendances = []
     for face_id, counts in state_counts.items():
         total = frame_counts[face_id]
-        engaged = (counts.get("engaged", 0) / total) * 100
-        disengaged = (counts.get("disengaged", 0) / total) * 100
-        confused = (counts.get("confused", 0) / total) * 100
+        attendances.append({
+            "face_id": face_id,
+            "engaged": (counts.get("engaged", 0) / total) * 100,
+            "disengaged": (counts.get("disengaged", 0) / total) * 100,
+            "confused": (counts.get("confused", 0) / total) * 100
+        })
 
-        # 1. Check if student exists by face_id
-        existing = supabase.table("students").select("id").eq("face_id", face_id).execute()
+    response = supabase.rpc("ingest_session", {
+        "p_session_id": session_id,
+        "p_duration": duration,
+        "p_attendances": attendances,
+        "p_name": session_name,  # Also files the students under this class (student_classes)
+        "p_source_key": source_key
+    }).execute()
+    if response.data and response.data != session_id:
+        print(f"⏭️ {source_key} was already ingested as class session {response.data}")
+        return response.data
 
-        if existing.data:
-            student_id = existing.data[0]["id"]
-        else:
-            student_id = str(uuid.uuid4())
-            supabase.table("students").insert({
-                "id": student_id,
-                "face_id": face_id,
-                "first_name": "Unknown",
-                "last_name": "Unknown",
-                "email": f"{face_id}@example.com"
-            }).execute()
-
-        # 2. Insert attendance
-        supabase.table("class_attendances").upsert({
-            "student_id": student_id,
-            "session_id": session_id,
-            "engaged_percentage": round(engaged, 2),
-            "disengaged_percentage": round(disengaged, 2),
-            "confused_percentage": round(confused, 2)
-        }).execute()
-
-        print(f"📊 Student {face_id} ({student_id}): "
-              f"E={engaged:.2f}%, D={disengaged:.2f}%, C={confused:.2f}%")
+    print(f"✅ Created class session {session_name} ({session_id}), duration={duration}")
+    for attendance in attendances:
+        print(f"📊 Student {attendance['face_id']}: "
+              f"E={attendance['engaged']:.2f}%, D={attendance['disengaged']:.2f}%, C={attendance['confused']:.2f}%")
+
+    # New attendances change every dashboard aggregate
+    response_cache.invalidate()
+    return session_id
 
 def log_email(student_id: str, session_id: str, email_text: str):
     """
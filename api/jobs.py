@@ -0,0 +1,206 @@
+# jobs.py
+"""
+Background jobs for Recall webhook processing
+
+Fetching the bot, streaming and analyzing the recording and storing the
+results take minutes and block on network and CPU, so the webhook only
+enqueues a job and returns. Jobs run in a bounded thread pool; the number of
+queued jobs is capped too, so a burst of webhooks cannot pile up unbounded
+work (submit raises QueueFullError, which the webhook reports as 503 so
+Recall retries later).
+
+A key (the bot id) gets one job: submitting it again while its job is
+queued, running or has succeeded returns that job, so redelivered webhooks
+do not process a recording twice. Succeeded jobs are only remembered until
+they are pruned.
+
+Each job records its current stage, a progress fraction for the stage and
+the duration of every finished stage. Job state is kept in memory; the most
+recent finished jobs are retained for the status endpoints.
+"""
+
+import logging
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Job status values
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+# A new job for a key with a job in one of these is a duplicate (failed jobs can be retried)
+DUPLICATE_STATUSES = ACTIVE_STATUSES + (SUCCEEDED,)
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue has no room for another job"""
+
+
+class Job:
+    """State of one background job"""
+
+    def __init__(self, kind: str, key: str, payload: Dict):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.key = key
+        self.payload = payload
+        self.status = QUEUED
+        self.stage = QUEUED
+        self.progress = None
+        self.stage_timings: Dict[str, float] = {}
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._stage_started: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def start_stage(self, stage: str):
+        """Finish the current stage (recording its duration) and enter the next one"""
+        now = time.time()
+        with self._lock:
+            if self._stage_started is not None:
+                self.stage_timings[self.stage] = now - self._stage_started
+            self.stage = stage
+            self.progress = None
+            self._stage_started = now
+
+    def set_progress(self, progress: Optional[float]):
+        """Progress of the current stage as a fraction (None if unknown)"""
+        with self._lock:
+            self.progress = progress
+
+    def _finish(self, status: str, result: Optional[Dict] = None, error: Optional[str] = None):
+        now = time.time()
+        with self._lock:
+            if self._stage_started is not None:
+                self.stage_timings[self.stage] = now - self._stage_started
+                self._stage_started = None
+            self.status = status
+            self.stage = status
+            self.result = result
+            self.error = error
+            self.finished_at = now
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            now = time.time()
+            current_stage_seconds = now - self._stage_started if self._stage_started is not None else None
+            return {
+                "id": self.id,
+                "kind": self.kind,
+                "key": self.key,
+                "status": self.status,
+                "stage": self.stage,
+                "progress": self.progress,
+                "stage_timings": dict(self.stage_timings),
+                "current_stage_seconds": current_stage_seconds,
+                "queued_seconds": (self.started_at or now) - self.created_at,
+                "total_seconds": (self.finished_at or now) - self.created_at,
+                "created_at": datetime.fromtimestamp(self.created_at).isoformat(),
+                "started_at": datetime.fromtimestamp(self.started_at).isoformat() if self.started_at else None,
+                "finished_at": datetime.fromtimestamp(self.finished_at).isoformat() if self.finished_at else None,
+                "result": self.result,
+                "error": self.error
+            }
+
+
+class JobQueue:
+    """Bounded thread pool running jobs, with an in-memory job table"""
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 20, keep_finished: int = 200):
+        """
+        Args:
+            max_workers: Jobs running at the same time
+            max_pending: Largest number of queued (not yet running) jobs
+            keep_finished: Finished jobs kept for the status endpoints
+        """
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.keep_finished = keep_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = OrderedDict()  # Job id -> Job, in submission order
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, key: str, handler: Callable[[Job], Optional[Dict]], payload: Optional[Dict] = None):
+        """
+        Enqueue a job, or return the existing job with the same kind and key
+
+        Args:
+            kind: Job type, e.g. "recall_recording"
+            key: Deduplication key (e.g. the bot id); repeated webhooks for a
+                key that is queued, running or already succeeded return the
+                existing job, only a failed job is run again
+            handler: Called with the Job in a worker thread; its return
+                value becomes the job result, an exception fails the job
+            payload: Input data shown with the job
+
+        Returns:
+            Tuple of (job, created)
+        """
+        with self._lock:
+            for job in self._jobs.values():
+                if job.kind == kind and job.key == key and job.status in DUPLICATE_STATUSES:
+                    return job, False
+            pending = sum(1 for job in self._jobs.values() if job.status == QUEUED)
+            if pending >= self.max_pending:
+                raise QueueFullError(f"{pending} jobs already queued")
+
+            job = Job(kind, key, payload or {})
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, handler)
+        logger.info(f"Queued {kind} job {job.id} for {key}")
+        return job, True
+
+    def _run(self, job: Job, handler: Callable[[Job], Optional[Dict]]):
+        job.started_at = time.time()
+        job.status = RUNNING
+        try:
+            result = handler(job)
+        except Exception as e:
+            logger.error(f"Job {job.id} failed in stage {job.stage}: {e}")
+            logger.debug(traceback.format_exc())
+            job._finish(FAILED, error=f"{job.stage}: {e}")
+        else:
+            job._finish(SUCCEEDED, result=result)
+            logger.info(f"Job {job.id} finished in {job.finished_at - job.created_at:.1f}s")
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond keep_finished (lock held)"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.status not in ACTIVE_STATUSES]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        """Jobs as dicts, newest first, optionally filtered by status"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        jobs.reverse()
+        if status:
+            jobs = [job for job in jobs if job.status == status]
+        return [job.to_dict() for job in jobs[:limit]]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            counts = dict.fromkeys((QUEUED, RUNNING, SUCCEEDED, FAILED), 0)
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return counts
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
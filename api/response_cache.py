@@ -0,0 +1,149 @@
+# response_cache.py
+"""
+In-process read-through cache for dashboard responses
+
+The dashboard endpoints aggregate the whole class_attendances table, but the
+data only changes when a session is ingested. Responses are cached per
+(endpoint, query parameters) for ttl seconds, the cache holds at most
+max_entries responses (least recently used are evicted first), and ingest
+calls invalidate() after writing so the next request sees the new session.
+
+Concurrent misses for the same key share one load instead of running the
+same query several times. A load that started before an invalidation is
+returned to its callers but not stored, so a response computed from
+pre-ingest data never outlives the invalidation. If the request running a
+load is cancelled (the client disconnected), the shared load is cancelled
+too and the requests that were waiting on it start a load of their own.
+
+The cache is per process: with several server processes, each one is
+invalidated only by ingests it runs itself, and the TTL bounds how stale the
+others can get.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class ResponseCache:
+    """TTL + LRU cache of endpoint responses with hit/miss counters"""
+
+    def __init__(self, ttl: float = 300.0, max_entries: int = 256):
+        """
+        Args:
+            ttl: Seconds a response stays valid
+            max_entries: Largest number of cached responses
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._inflight = {}  # key -> asyncio.Future of a running load (event loop only)
+        self._generation = 0  # Bumped by invalidate()
+        self._lock = threading.Lock()  # Ingest invalidates from worker threads
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0
+        }
+
+    @staticmethod
+    def make_key(endpoint: str, params: Optional[Dict[str, Any]] = None) -> tuple:
+        """Cache key of an endpoint and its query parameters (order-independent)"""
+        return (endpoint, tuple(sorted((params or {}).items())))
+
+    def get(self, key: tuple):
+        """Tuple of (found, value); counts a hit or a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return True, value
+                del self._entries[key]
+                self.stats["expirations"] += 1
+            self.stats["misses"] += 1
+            return False, None
+
+    def put(self, key: tuple, value: Any, generation: Optional[int] = None):
+        """Store a response unless the cache was invalidated since generation"""
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def invalidate(self):
+        """Drop every cached response (called after ingest writes)"""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self.stats["invalidations"] += 1
+
+    async def get_or_load(self, endpoint: str, params: Optional[Dict[str, Any]],
+                          loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Cached response of an endpoint, loading it on a miss
+
+        Args:
+            endpoint: Endpoint name
+            params: Query parameters the response depends on
+            loader: Coroutine function computing the response
+        """
+        key = self.make_key(endpoint, params)
+        found, value = self.get(key)
+        if found:
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            with self._lock:
+                self.stats["coalesced"] += 1
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise  # This request was cancelled, not the load
+                # The request running the load was cancelled; load again
+                return await self.get_or_load(endpoint, params, loader)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        with self._lock:
+            generation = self._generation
+        try:
+            value = await loader()
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else was waiting
+            raise
+        else:
+            future.set_result(value)
+            self.put(key, value, generation)
+            return value
+        finally:
+            if not future.done():
+                future.cancel()  # Cancelled loader: release the waiting requests
+            del self._inflight[key]
+
+    def summary(self) -> Dict[str, Any]:
+        """Counters, hit ratio and current size"""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return dict(
+                self.stats,
+                entries=len(self._entries),
+                max_entries=self.max_entries,
+                ttl_seconds=self.ttl,
+                hit_ratio=self.stats["hits"] / lookups if lookups else None
+            )
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Install or rebuild the engagement rollup tables (see sql/rollups.sql)
+
+    python rollups.py install   # create the tables and the ingest/rebuild functions
+    python rollups.py rebuild   # recompute every rollup from class_attendances (backfill)
+
+Both connect with DATABASE_URL. Ingest keeps the rollups up to date on its
+own (ingest_session updates them in the same transaction), so a rebuild is
+only needed after installing, or after attendances were written some other
+way.
+"""
+import argparse
+import os
+import time
+
+import psycopg2
+from dotenv import load_dotenv
+
+SQL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sql", "rollups.sql")
+
+
+def connect():
+    """psycopg2 connection to DATABASE_URL (also accepts the asyncpg URL form)"""
+    load_dotenv()
+    return psycopg2.connect(os.environ["DATABASE_URL"].replace("postgresql+asyncpg://", "postgresql://", 1))
+
+
+def install():
+    """Create the rollup tables and functions"""
+    with open(SQL_FILE) as f:
+        sql = f.read()
+    with connect() as connection, connection.cursor() as cursor:
+        cursor.execute(sql)
+    print(f"✅ Installed rollups from {SQL_FILE}")
+
+
+def rebuild():
+    """Recompute the rollups from the raw tables in one transaction"""
+    start = time.time()
+    with connect() as connection, connection.cursor() as cursor:
+        cursor.execute("SELECT public.rebuild_engagement_rollups()")
+        students = cursor.fetchone()[0]
+    print(f"✅ Rebuilt rollups for {students} students in {time.time() - start:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the engagement rollup tables")
+    parser.add_argument("command", choices=["install", "rebuild"], help="install the schema or rebuild the rollups")
+    args = parser.parse_args()
+
+    if args.command == "install":
+        install()
+    else:
+        rebuild()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+-- Engagement rollups
+--
+-- The dashboard aggregates (average engagement and session count per
+-- student, per session and overall) are kept in rollup tables instead of
+-- being recomputed from class_attendances on every request.
+--
+-- ingest_session() writes a class session, its students and attendances AND
+-- updates the rollups in one transaction, so readers never see attendances
+-- without the matching rollup change. rebuild_engagement_rollups()
+-- recomputes every rollup from the raw tables (backfills, or attendances
+-- written outside ingest_session).
+--
+-- ingest_session() is idempotent per source: a session ingested with a
+-- p_source_key (the Recall bot id of the recording) records it in
+-- class_sessions.source_key, and ingesting the same key again returns the
+-- existing session without writing anything, so a reprocessed recording is
+-- never counted twice.
+--
+-- The indexes below back the keyset-paginated /students endpoint (see
+-- api/student_pages.py): every sort and filter it offers seeks into one.
+--
+-- Apply with `python rollups.py install`, then `python rollups.py rebuild`
+-- to fill the tables from existing data.
+
+-- Per student: sums, so averages can be updated incrementally
+CREATE TABLE IF NOT EXISTS public.student_engagement_rollups (
+    student_id uuid PRIMARY KEY REFERENCES public.students (id) ON DELETE CASCADE,
+    sessions_count integer NOT NULL DEFAULT 0,
+    engaged_sum double precision NOT NULL DEFAULT 0,
+    disengaged_sum double precision NOT NULL DEFAULT 0,
+    confused_sum double precision NOT NULL DEFAULT 0,
+    class_names text,  -- Comma-separated session names, like string_agg(name, ',')
+    average_engagement double precision
+        GENERATED ALWAYS AS (engaged_sum / NULLIF(sessions_count, 0)) STORED,
+    updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+-- /students/at-risk reads the lowest averages first; the engagement sorts
+-- and the engagement range filter of /students seek into it (both directions)
+CREATE INDEX IF NOT EXISTS student_engagement_rollups_average_idx
+    ON public.student_engagement_rollups (average_engagement ASC, student_id);
+
+-- /students?sort=sessions_*
+CREATE INDEX IF NOT EXISTS student_engagement_rollups_sessions_idx
+    ON public.student_engagement_rollups (sessions_count, student_id);
+
+-- Distinct class (session name) per student, for the /students class filter
+CREATE TABLE IF NOT EXISTS public.student_classes (
+    class_name text NOT NULL,
+    student_id uuid NOT NULL REFERENCES public.students (id) ON DELETE CASCADE,
+    PRIMARY KEY (class_name, student_id)
+);
+
+-- /students?sort=name_* and the name prefix filter. C collation so the same
+-- index serves ORDER BY and LIKE 'prefix%'; names are coalesced to '' so
+-- students without one still compare in the keyset (same expressions as
+-- api/student_pages.py). Replaces the earlier uncoalesced indexes.
+DROP INDEX IF EXISTS public.students_name_sort_idx;
+DROP INDEX IF EXISTS public.students_first_name_prefix_idx;
+CREATE INDEX IF NOT EXISTS students_name_key_idx
+    ON public.students ((lower(coalesce(last_name, ''))) COLLATE "C", (lower(coalesce(first_name, ''))) COLLATE "C", id);
+CREATE INDEX IF NOT EXISTS students_first_name_key_idx
+    ON public.students ((lower(coalesce(first_name, ''))) COLLATE "C");
+
+-- Per class session
+CREATE TABLE IF NOT EXISTS public.session_engagement_rollups (
+    session_id uuid PRIMARY KEY REFERENCES public.class_sessions (id) ON DELETE CASCADE,
+    attendance_count integer NOT NULL DEFAULT 0,
+    engaged_sum double precision NOT NULL DEFAULT 0,
+    disengaged_sum double precision NOT NULL DEFAULT 0,
+    confused_sum double precision NOT NULL DEFAULT 0,
+    average_engagement double precision
+        GENERATED ALWAYS AS (engaged_sum / NULLIF(attendance_count, 0)) STORED,
+    updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+-- Whole dataset: a single row
+CREATE TABLE IF NOT EXISTS public.engagement_rollup_totals (
+    id boolean PRIMARY KEY DEFAULT true CHECK (id),
+    attendance_count bigint NOT NULL DEFAULT 0,
+    student_count bigint NOT NULL DEFAULT 0,  -- Students with at least one attendance
+    engaged_sum double precision NOT NULL DEFAULT 0,
+    confused_sum double precision NOT NULL DEFAULT 0,
+    duration_sum double precision NOT NULL DEFAULT 0,  -- Session duration summed per attendance
+    updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+INSERT INTO public.engagement_rollup_totals (id) VALUES (true) ON CONFLICT (id) DO NOTHING;
+
+
+-- Ingest one analyzed session.
+--   p_attendances: [{"face_id": ..., "engaged": .., "disengaged": .., "confused": ..}, ...]
+-- Returns the session id.
+-- Recording a session was ingested from (see ingest_session)
+ALTER TABLE public.class_sessions ADD COLUMN IF NOT EXISTS source_key text;
+CREATE UNIQUE INDEX IF NOT EXISTS class_sessions_source_key_idx
+    ON public.class_sessions (source_key);
+
+-- The signature gained p_source_key; drop the old one so calls stay unambiguous
+DROP FUNCTION IF EXISTS public.ingest_session(uuid, double precision, jsonb, text);
+
+CREATE OR REPLACE FUNCTION public.ingest_session(
+    p_session_id uuid,
+    p_duration double precision,
+    p_attendances jsonb,
+    p_name text DEFAULT NULL,
+    p_source_key text DEFAULT NULL
+) RETURNS uuid
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_existing_session_id uuid;
+    item jsonb;
+    candidate public.students;
+    v_student_id uuid;
+    v_engaged double precision;
+    v_disengaged double precision;
+    v_confused double precision;
+    v_new_students integer := 0;
+    v_count integer := 0;
+    v_engaged_sum double precision := 0;
+    v_disengaged_sum double precision := 0;
+    v_confused_sum double precision := 0;
+BEGIN
+    IF p_source_key IS NOT NULL THEN
+        -- Serialize ingests of the same recording, then skip it if it is already stored
+        PERFORM pg_advisory_xact_lock(hashtext('ingest_session:' || p_source_key));
+        SELECT id INTO v_existing_session_id FROM public.class_sessions WHERE source_key = p_source_key;
+        IF FOUND THEN
+            RETURN v_existing_session_id;
+        END IF;
+    END IF;
+
+    INSERT INTO public.class_sessions (id, duration, name, source_key)
+    VALUES (p_session_id, p_duration, p_name, p_source_key);
+
+    FOR item IN SELECT * FROM jsonb_array_elements(p_attendances) LOOP
+        -- Coerce face_id to the column's type
+        candidate := jsonb_populate_record(NULL::public.students, jsonb_build_object('face_id', item -> 'face_id'));
+        v_engaged := round((item ->> 'engaged')::numeric, 2);
+        v_disengaged := round((item ->> 'disengaged')::numeric, 2);
+        v_confused := round((item ->> 'confused')::numeric, 2);
+
+        SELECT id INTO v_student_id FROM public.students WHERE face_id = candidate.face_id LIMIT 1;
+        IF v_student_id IS NULL THEN
+            v_student_id := gen_random_uuid();
+            INSERT INTO public.students (id, face_id, first_name, last_name, email)
+            VALUES (v_student_id, candidate.face_id, 'Unknown', 'Unknown', (item ->> 'face_id') || '@example.com');
+        END IF;
+
+        INSERT INTO public.class_attendances
+            (student_id, session_id, engaged_percentage, disengaged_percentage, confused_percentage)
+        VALUES (v_student_id, p_session_id, v_engaged, v_disengaged, v_confused);
+
+        INSERT INTO public.student_engagement_rollups (student_id) VALUES (v_student_id)
+        ON CONFLICT (student_id) DO NOTHING;
+        IF FOUND THEN
+            v_new_students := v_new_students + 1;  -- First attendance of this student
+        END IF;
+        UPDATE public.student_engagement_rollups SET
+            sessions_count = sessions_count + 1,
+            engaged_sum = engaged_sum + v_engaged,
+            disengaged_sum = disengaged_sum + v_disengaged,
+            confused_sum = confused_sum + v_confused,
+            class_names = CASE WHEN p_name IS NULL THEN class_names ELSE concat_ws(',', class_names, p_name) END,
+            updated_at = now()
+        WHERE student_id = v_student_id;
+
+        IF p_name IS NOT NULL THEN
+            INSERT INTO public.student_classes (class_name, student_id) VALUES (p_name, v_student_id)
+            ON CONFLICT DO NOTHING;
+        END IF;
+
+        v_count := v_count + 1;
+        v_engaged_sum := v_engaged_sum + v_engaged;
+        v_disengaged_sum := v_disengaged_sum + v_disengaged;
+        v_confused_sum := v_confused_sum + v_confused;
+        v_student_id := NULL;
+    END LOOP;
+
+    INSERT INTO public.session_engagement_rollups
+        (session_id, attendance_count, engaged_sum, disengaged_sum, confused_sum)
+    VALUES (p_session_id, v_count, v_engaged_sum, v_disengaged_sum, v_confused_sum);
+
+    UPDATE public.engagement_rollup_totals SET
+        attendance_count = attendance_count + v_count,
+        student_count = student_count + v_new_students,
+        engaged_sum = engaged_sum + v_engaged_sum,
+        confused_sum = confused_sum + v_confused_sum,
+        duration_sum = duration_sum + v_count * (SELECT duration FROM public.class_sessions WHERE id = p_session_id),
+        updated_at = now()
+    WHERE id;
+
+    RETURN p_session_id;
+END;
+$$;
+
+
+-- Recompute every rollup from class_sessions / class_attendances.
+-- Returns the number of student rollup rows.
+CREATE OR REPLACE FUNCTION public.rebuild_engagement_rollups() RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_students integer;
+BEGIN
+    -- Block concurrent ingests so the rollups match the raw tables exactly
+    LOCK TABLE public.class_sessions, public.class_attendances IN SHARE MODE;
+
+    DELETE FROM public.student_engagement_rollups;
+    INSERT INTO public.student_engagement_rollups
+        (student_id, sessions_count, engaged_sum, disengaged_sum, confused_sum, class_names)
+    SELECT a.student_id, COUNT(*), COALESCE(SUM(a.engaged_percentage), 0),
+           COALESCE(SUM(a.disengaged_percentage), 0), COALESCE(SUM(a.confused_percentage), 0),
+           string_agg(c.name, ',')
+    FROM public.class_attendances AS a
+    JOIN public.class_sessions AS c ON c.id = a.session_id
+    GROUP BY a.student_id;
+    GET DIAGNOSTICS v_students = ROW_COUNT;
+
+    DELETE FROM public.student_classes;
+    INSERT INTO public.student_classes (class_name, student_id)
+    SELECT DISTINCT c.name, a.student_id
+    FROM public.class_attendances AS a
+    JOIN public.class_sessions AS c ON c.id = a.session_id
+    WHERE c.name IS NOT NULL;
+
+    DELETE FROM public.session_engagement_rollups;
+    INSERT INTO public.session_engagement_rollups
+        (session_id, attendance_count, engaged_sum, disengaged_sum, confused_sum)
+    SELECT c.id, COUNT(a.session_id), COALESCE(SUM(a.engaged_percentage), 0),
+           COALESCE(SUM(a.disengaged_percentage), 0), COALESCE(SUM(a.confused_percentage), 0)
+    FROM public.class_sessions AS c
+    LEFT JOIN public.class_attendances AS a ON a.session_id = c.id
+    GROUP BY c.id;
+
+    UPDATE public.engagement_rollup_totals AS t SET
+        attendance_count = totals.attendance_count,
+        student_count = totals.student_count,
+        engaged_sum = totals.engaged_sum,
+        confused_sum = totals.confused_sum,
+        duration_sum = totals.duration_sum,
+        updated_at = now()
+    FROM (
+        SELECT COUNT(*) AS attendance_count,
+               COUNT(DISTINCT a.student_id) AS student_count,
+               COALESCE(SUM(a.engaged_percentage), 0) AS engaged_sum,
+               COALESCE(SUM(a.confused_percentage), 0) AS confused_sum,
+               COALESCE(SUM(c.duration), 0) AS duration_sum
+        FROM public.class_attendances AS a
+        JOIN public.class_sessions AS c ON c.id = a.session_id
+    ) AS totals
+    WHERE t.id;
+
+    RETURN v_students;
+END;
+$$;
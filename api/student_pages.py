@@ -0,0 +1,186 @@
+# student_pages.py
+"""
+Keyset pagination and server-side filters for the /students endpoint
+
+Pages are ordered by a sort key that always ends with the student id, so
+the order is total. The cursor holds the key of the last row of a page, and
+the next page starts right after it with a row comparison:
+
+    WHERE (sort columns..., id) > (cursor values...) ORDER BY ... LIMIT n
+
+Every sort has a matching index (sql/rollups.sql), so Postgres seeks to the
+cursor instead of skipping the rows before it, and page 500 costs the same
+as page 1. The filters are index-backed as well: the class filter probes the
+student_classes primary key, the engagement range narrows the
+average_engagement index, and the name prefix is a C-collation LIKE prefix
+match on the lowercased name indexes.
+
+The total is only counted when asked for, because a count has to visit
+every matching row. Without filters it comes from engagement_rollup_totals
+instead.
+"""
+
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+DEFAULT_SORT = "engagement_desc"
+
+# Sort name -> (key columns as (expression, SQL type), descending)
+_ENGAGEMENT = [("r.average_engagement", "double precision"), ("r.student_id", "uuid")]
+_SESSIONS = [("r.sessions_count", "integer"), ("r.student_id", "uuid")]
+# Names are coalesced: a NULL would make the cursor's row comparison NULL
+# and end the listing at the first student without a name
+_LAST_NAME = 'lower(coalesce(s.last_name, \'\')) COLLATE "C"'
+_FIRST_NAME = 'lower(coalesce(s.first_name, \'\')) COLLATE "C"'
+_NAME = [(_LAST_NAME, "text"), (_FIRST_NAME, "text"), ("s.id", "uuid")]
+SORTS = {
+    "engagement_desc": (_ENGAGEMENT, True),
+    "engagement_asc": (_ENGAGEMENT, False),
+    "sessions_desc": (_SESSIONS, True),
+    "sessions_asc": (_SESSIONS, False),
+    "name_asc": (_NAME, False),
+    "name_desc": (_NAME, True),
+}
+
+_FROM = """
+FROM public.student_engagement_rollups AS r
+JOIN public.students AS s ON s.id = r.student_id
+"""
+
+
+class InvalidCursorError(ValueError):
+    """A cursor could not be decoded or belongs to another sort"""
+
+
+def encode_cursor(sort: str, key: List[Any]) -> str:
+    """Opaque cursor for the row whose sort key is key"""
+    payload = json.dumps({"sort": sort, "key": key}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(sort: str, cursor: str) -> List[Any]:
+    """Sort key stored in a cursor (InvalidCursorError if it is not a cursor of this sort)"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        key = payload["key"]
+        cursor_sort = payload["sort"]
+    except (ValueError, TypeError, KeyError) as e:
+        raise InvalidCursorError("Malformed cursor") from e
+    if cursor_sort != sort:
+        raise InvalidCursorError(f"Cursor belongs to sort '{cursor_sort}', not '{sort}'")
+    if not isinstance(key, list) or len(key) != len(SORTS[sort][0]):
+        raise InvalidCursorError("Malformed cursor")
+    return key
+
+
+def escape_like(value: str) -> str:
+    """Escape LIKE wildcards (backslash is Postgres' default escape character)"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _filters(class_name: Optional[str], min_engagement: Optional[float], max_engagement: Optional[float],
+             name_prefix: Optional[str]) -> Tuple[List[str], Dict[str, Any]]:
+    """WHERE conditions and their parameters"""
+    conditions = ["r.sessions_count > 0"]
+    params = {}
+    if class_name:
+        conditions.append(
+            "EXISTS (SELECT 1 FROM public.student_classes AS sc "
+            "WHERE sc.class_name = :class_name AND sc.student_id = r.student_id)"
+        )
+        params["class_name"] = class_name
+    if min_engagement is not None:
+        conditions.append("r.average_engagement >= :min_engagement")
+        params["min_engagement"] = min_engagement
+    if max_engagement is not None:
+        conditions.append("r.average_engagement <= :max_engagement")
+        params["max_engagement"] = max_engagement
+    if name_prefix and name_prefix.strip():
+        conditions.append(
+            f"({_LAST_NAME} LIKE :name_pattern OR {_FIRST_NAME} LIKE :name_pattern)"
+        )
+        params["name_pattern"] = escape_like(name_prefix.strip().lower()) + "%"
+    return conditions, params
+
+
+def page_query(sort: str = DEFAULT_SORT, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+               class_name: Optional[str] = None, min_engagement: Optional[float] = None,
+               max_engagement: Optional[float] = None,
+               name_prefix: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    SQL and parameters of one page of students
+
+    Selects limit + 1 rows, so page_result() can tell whether another page follows.
+
+    Raises:
+        ValueError: Unknown sort
+        InvalidCursorError: Bad cursor
+    """
+    if sort not in SORTS:
+        raise ValueError(f"Unknown sort '{sort}' (expected one of: {', '.join(SORTS)})")
+    columns, descending = SORTS[sort]
+    conditions, params = _filters(class_name, min_engagement, max_engagement, name_prefix)
+
+    if cursor:
+        key = decode_cursor(sort, cursor)
+        placeholders = []
+        for i, (_, sql_type) in enumerate(columns):
+            placeholders.append(f"CAST(:k{i} AS {sql_type})")
+            params[f"k{i}"] = key[i]
+        conditions.append("({}) {} ({})".format(
+            ", ".join(expression for expression, _ in columns),
+            "<" if descending else ">",
+            ", ".join(placeholders)
+        ))
+
+    direction = "DESC" if descending else "ASC"
+    params["limit"] = limit + 1
+    sql = (
+        "SELECT s.id, s.first_name, s.last_name, s.email, r.average_engagement, r.sessions_count, r.class_names, "
+        + ", ".join(f"{expression} AS k{i}" for i, (expression, _) in enumerate(columns))
+        + _FROM
+        + "WHERE " + " AND ".join(conditions)
+        + "\nORDER BY " + ", ".join(f"{expression} {direction}" for expression, _ in columns)
+        + "\nLIMIT :limit"
+    )
+    return sql, params
+
+
+def count_query(class_name: Optional[str] = None, min_engagement: Optional[float] = None,
+                max_engagement: Optional[float] = None,
+                name_prefix: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+    """SQL and parameters counting the students that match the filters"""
+    conditions, params = _filters(class_name, min_engagement, max_engagement, name_prefix)
+    if len(conditions) == 1:
+        # No filters: every student with an attendance, already counted at ingest
+        return "SELECT student_count FROM public.engagement_rollup_totals WHERE id", {}
+    return "SELECT COUNT(*)" + _FROM + "WHERE " + " AND ".join(conditions), params
+
+
+def student_to_dict(row) -> Dict[str, Any]:
+    """API representation of a student row"""
+    return {
+        "id": row["id"],
+        "email": row["email"],
+        "first_name": row["first_name"],
+        "last_name": row["last_name"],
+        "average_engagement": row["average_engagement"],
+        "total_sessions": row["sessions_count"],
+        "classes": row["class_names"]
+    }
+
+
+def page_result(sort: str, rows: List[Any], limit: int) -> Dict[str, Any]:
+    """Response body of a page: its students and the cursor of the next page (None on the last page)"""
+    columns = SORTS[sort][0]
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        key = [last[f"k{i}"] for i in range(len(columns))]
+        key[-1] = str(key[-1])  # The student id (uuid)
+        next_cursor = encode_cursor(sort, key)
+    return {"students": [student_to_dict(row) for row in rows], "next_cursor": next_cursor}
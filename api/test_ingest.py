@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Test that ingesting an analysis file fills the class filter's student_classes
+and that a recording ingested twice is stored once
+
+Runs process_json_and_store against the database in DATABASE_URL inside a
+transaction that is rolled back: the Supabase RPC is sent over the test's
+own connection with the same named arguments PostgREST would pass. Skipped
+when DATABASE_URL is not set.
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from dotenv import load_dotenv
+
+load_dotenv()
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+STATES = ["engaged", "engaged", "confused"]
+
+
+class ConnectionRpc:
+    """Stands in for the Supabase client's rpc(), calling the function on a psycopg2 connection"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.calls = []
+
+    def rpc(self, name, params):
+        self.calls.append((name, params))
+        connection = self.connection
+
+        class Call:
+            def execute(self):
+                arguments = ", ".join(f"{key} => %({key})s" for key in params)
+                values = {key: json.dumps(value) if isinstance(value, (list, dict)) else value
+                          for key, value in params.items()}
+                with connection.cursor() as cursor:
+                    cursor.execute(f"SELECT public.{name}({arguments})", values)
+                    return SimpleNamespace(data=str(cursor.fetchone()[0]))
+        return Call()
+
+
+def write_results(path, face_ids):
+    with open(path, "w") as f:
+        for frame_count, state in enumerate(STATES):
+            f.write(json.dumps({
+                "timestamp": frame_count * 30.0,
+                "frame_count": frame_count,
+                "faces": [{"face_id": face_id, "dominant_state": state} for face_id in face_ids],
+                "summary": {"total_faces": len(face_ids)}
+            }) + "\n")
+
+
+@contextmanager
+def ingest_connection():
+    """api with its RPCs sent over a connection that is rolled back afterwards"""
+    import api
+    from rollups import SQL_FILE, connect
+
+    connection = connect()
+    original_supabase = api.supabase
+    try:
+        with connection.cursor() as cursor, open(SQL_FILE) as f:
+            cursor.execute(f.read())  # Current ingest_session, rolled back with the rest
+        api.supabase = ConnectionRpc(connection)
+        yield api, connection
+    finally:
+        api.supabase = original_supabase
+        connection.rollback()
+        connection.close()
+
+
+def ingest(api, name, face_ids, source_key=None):
+    with tempfile.TemporaryDirectory() as directory:
+        results = os.path.join(directory, name)
+        write_results(results, face_ids)
+        return api.process_json_and_store(results, source_key=source_key)
+
+
+def test_ingest_populates_student_classes():
+    if not os.environ.get("DATABASE_URL"):
+        print("⏭️  DATABASE_URL is not set, skipping")
+        return
+
+    with ingest_connection() as (api, connection):
+        face_ids = random.sample(range(10**8, 10**9), 2)  # Not matching existing students
+        session_id = ingest(api, "algebra-1.jsonl", face_ids)
+
+        assert api.supabase.calls[0][1]["p_name"] == "algebra-1.jsonl"
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT sc.class_name FROM public.class_attendances AS a "
+                "LEFT JOIN public.student_classes AS sc ON sc.student_id = a.student_id "
+                "WHERE a.session_id = %s", (session_id,))
+            class_names = [row[0] for row in cursor.fetchall()]
+        assert class_names == ["algebra-1.jsonl"] * len(face_ids)
+
+
+def test_recording_is_ingested_once():
+    if not os.environ.get("DATABASE_URL"):
+        print("⏭️  DATABASE_URL is not set, skipping")
+        return
+
+    def counts(connection):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT (SELECT COUNT(*) FROM public.class_sessions), "
+                "(SELECT COUNT(*) FROM public.class_attendances), "
+                "(SELECT attendance_count FROM public.engagement_rollup_totals)")
+            return cursor.fetchone()
+
+    with ingest_connection() as (api, connection):
+        face_ids = random.sample(range(10**8, 10**9), 2)
+        source_key = f"bot-{random.getrandbits(64):x}"
+        session_id = ingest(api, "algebra-1.jsonl", face_ids, source_key)
+        stored = counts(connection)
+
+        # A redelivered webhook reprocesses the recording
+        assert ingest(api, "algebra-1.jsonl", face_ids, source_key) == session_id
+        assert counts(connection) == stored
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e!r}")
+    if failures:
+        print(f"\n💥 {failures} test(s) failed!")
+        sys.exit(1)
+    print("\n🎉 All ingest tests passed!")
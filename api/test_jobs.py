@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test the background job queue's deduplication and status tracking
+"""
+import sys
+import threading
+import time
+
+from jobs import FAILED, SUCCEEDED, JobQueue
+
+
+def wait_for(job, timeout=5.0):
+    """Block until a job has finished"""
+    deadline = time.time() + timeout
+    while job.finished_at is None:
+        assert time.time() < deadline, f"job {job.id} did not finish"
+        time.sleep(0.01)
+    return job
+
+
+def test_succeeded_job_is_not_run_again():
+    queue = JobQueue(max_workers=1)
+    runs = []
+    try:
+        job, created = queue.submit("recall_recording", "bot-1", lambda job: runs.append(job.id) or {"ok": True})
+        assert created
+        assert wait_for(job).status == SUCCEEDED
+
+        # A redelivered webhook for the same bot returns the finished job
+        again, created = queue.submit("recall_recording", "bot-1", lambda job: runs.append(job.id))
+        assert not created and again is job
+        assert runs == [job.id]
+    finally:
+        queue.shutdown(wait=True)
+
+
+def test_running_job_is_shared():
+    queue = JobQueue(max_workers=1)
+    release = threading.Event()
+    try:
+        job, _ = queue.submit("recall_recording", "bot-1", lambda job: release.wait(5))
+        again, created = queue.submit("recall_recording", "bot-1", lambda job: None)
+        assert not created and again is job
+        other, created = queue.submit("recall_recording", "bot-2", lambda job: None)
+        assert created and other is not job
+        release.set()
+        wait_for(job)
+        wait_for(other)
+    finally:
+        queue.shutdown(wait=True)
+
+
+def test_failed_job_can_be_retried():
+    queue = JobQueue(max_workers=1)
+
+    def fail(job):
+        job.start_stage("fetch")
+        raise RuntimeError("no recording yet")
+
+    try:
+        job, _ = queue.submit("recall_recording", "bot-1", fail)
+        assert wait_for(job).status == FAILED
+        assert job.error == "fetch: no recording yet"
+
+        retry, created = queue.submit("recall_recording", "bot-1", lambda job: {"ok": True})
+        assert created and retry is not job
+        assert wait_for(retry).status == SUCCEEDED
+    finally:
+        queue.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e!r}")
+    if failures:
+        print(f"\n💥 {failures} test(s) failed!")
+        sys.exit(1)
+    print("\n🎉 All job queue tests passed!")
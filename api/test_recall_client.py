@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Test the Recall.ai client against a local fake Recall server
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the GoogleMeetAPI directory to the path so we can import the client
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'GoogleMeetAPI'))
+
+from recall_client import AsyncRecallClient, RecallAPIError, RecallClient, is_recording_done
+
+API_KEY = "test-key"
+
+
+class FakeRecallHandler(BaseHTTPRequestHandler):
+    """Serves /api/v1/bot endpoints; failures are scripted per path"""
+    protocol_version = "HTTP/1.1"  # Keep-alive
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body=None, headers=None):
+        payload = json.dumps(body if body is not None else {}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _handle(self, method):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        with server.lock:
+            server.requests.append((method, self.path))
+            server.client_ports.add(self.client_address[1])
+            script = server.scripts.get((method, self.path), [])
+            step = script.pop(0) if script else None
+
+        if self.headers.get("Authorization") != f"Token {API_KEY}":
+            return self._reply(401, {"detail": "Invalid token"})
+        if step == "slow":
+            # Longer than the client's read timeout; the client has hung up by then
+            time.sleep(0.5)
+            self.close_connection = True
+            return
+        if step is not None:
+            status, headers = step
+            return self._reply(status, {"detail": "scripted failure"}, headers)
+
+        if method == "POST" and self.path == "/api/v1/bot":
+            return self._reply(201, {"id": "bot-1", "bot_name": body["bot_name"], "meeting_url": body["meeting_url"]})
+        if method == "GET" and self.path.startswith("/api/v1/bot/"):
+            return self._reply(200, {"id": self.path.rsplit("/", 1)[1], "status": "done", "recordings": []})
+        return self._reply(404, {"detail": "Not found"})
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+
+class FakeRecallServer:
+    def __init__(self):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), FakeRecallHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.lock = threading.Lock()
+        self.httpd.requests = []
+        self.httpd.client_ports = set()
+        self.httpd.scripts = {}
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/api/v1"
+
+    @property
+    def requests(self):
+        return self.httpd.requests
+
+    @property
+    def client_ports(self):
+        return self.httpd.client_ports
+
+    def script(self, method, path, steps):
+        """Responses to send before the normal one: (status, headers) or 'slow'"""
+        self.httpd.scripts[(method, f"/api/v1{path}")] = list(steps)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def make_client(server, **options):
+    options.setdefault("backoff_base", 0.01)
+    return RecallClient(api_key=API_KEY, base_url=server.base_url, **options)
+
+
+def test_get_bot_reuses_connection():
+    """Sequential calls share one keep-alive connection"""
+    with FakeRecallServer() as server, make_client(server) as client:
+        for _ in range(5):
+            assert client.get_bot("abc")["id"] == "abc"
+        assert len(server.requests) == 5
+        assert len(server.client_ports) == 1
+
+
+def test_retries_server_errors():
+    """GET is retried on 5xx and 429 until it succeeds"""
+    with FakeRecallServer() as server, make_client(server) as client:
+        server.script("GET", "/bot/abc", [(503, None), (429, {"Retry-After": "0"}), (502, None)])
+        assert client.get_bot("abc")["status"] == "done"
+        assert len(server.requests) == 4
+        assert client.retries == 3
+
+
+def test_gives_up_after_max_retries():
+    with FakeRecallServer() as server, make_client(server, max_retries=2) as client:
+        server.script("GET", "/bot/abc", [(500, None)] * 5)
+        try:
+            client.get_bot("abc")
+        except RecallAPIError as e:
+            assert e.status_code == 500
+        else:
+            raise AssertionError("expected RecallAPIError")
+        assert len(server.requests) == 3
+
+
+def test_create_bot_not_retried_on_server_error():
+    """A 5xx on POST may have created the bot, so it is not repeated"""
+    with FakeRecallServer() as server, make_client(server) as client:
+        server.script("POST", "/bot", [(500, None)])
+        try:
+            client.create_bot("https://meet.google.com/abc-defg-hij")
+        except RecallAPIError as e:
+            assert e.status_code == 500
+        else:
+            raise AssertionError("expected RecallAPIError")
+        assert len(server.requests) == 1
+
+
+def test_create_bot_retried_on_rate_limit():
+    with FakeRecallServer() as server, make_client(server) as client:
+        server.script("POST", "/bot", [(429, {"Retry-After": "0.05"})])
+        bot = client.create_bot("https://meet.google.com/abc-defg-hij", "Lecture bot")
+        assert bot["id"] == "bot-1"
+        assert bot["bot_name"] == "Lecture bot"
+        assert len(server.requests) == 2
+
+
+def test_client_errors_are_not_retried():
+    with FakeRecallServer() as server, make_client(server) as client:
+        server.script("GET", "/bot/missing", [(404, None)])
+        try:
+            client.get_bot("missing")
+        except RecallAPIError as e:
+            assert e.status_code == 404
+        else:
+            raise AssertionError("expected RecallAPIError")
+        assert len(server.requests) == 1
+
+
+def test_read_timeout():
+    """A slow response hits the read timeout and is retried (GET)"""
+    with FakeRecallServer() as server, make_client(server, timeout=0.2, max_retries=1) as client:
+        server.script("GET", "/bot/abc", ["slow"])
+        assert client.get_bot("abc")["id"] == "abc"
+
+        server.script("GET", "/bot/abc", ["slow", "slow"])
+        try:
+            client.get_bot("abc")
+        except RecallAPIError as e:
+            assert e.status_code is None
+        else:
+            raise AssertionError("expected RecallAPIError")
+
+
+def test_async_client_concurrent_requests():
+    async def fetch_all(base_url):
+        async with AsyncRecallClient(api_key=API_KEY, base_url=base_url, max_connections=4) as client:
+            return await asyncio.gather(*(client.get_bot(f"bot-{i}") for i in range(8)))
+
+    with FakeRecallServer() as server:
+        bots = asyncio.run(fetch_all(server.base_url))
+        assert [bot["id"] for bot in bots] == [f"bot-{i}" for i in range(8)]
+        assert len(server.client_ports) <= 4
+
+
+def test_only_done_events_start_processing():
+    assert is_recording_done({"event": "recording.done", "data": {"bot": {"id": "abc"}}})
+    assert is_recording_done({"event": "bot.done"})
+    assert is_recording_done({"event": "bot.status_change", "data": {"status": {"code": "done"}}})
+    assert not is_recording_done({"event": "bot.status_change", "data": {"status": {"code": "in_call_recording"}}})
+    assert not is_recording_done({"event": "bot.in_call_recording"})
+    assert not is_recording_done({"bot_id": "abc"})
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e!r}")
+    if failures:
+        print(f"\n💥 {failures} test(s) failed!")
+        sys.exit(1)
+    print("\n🎉 All Recall client tests passed!")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test the dashboard response cache: coalesced loads, invalidation and cancellation
+"""
+import asyncio
+import sys
+
+from response_cache import ResponseCache
+
+
+def test_concurrent_misses_share_one_load():
+    cache = ResponseCache()
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        await asyncio.sleep(0.01)
+        return {"students": len(loads)}
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_load("students", {"limit": 50}, loader) for _ in range(5)))
+
+    assert asyncio.run(main()) == [{"students": 1}] * 5
+    assert len(loads) == 1
+    assert cache.stats["coalesced"] == 4
+    assert cache.get(cache.make_key("students", {"limit": 50})) == (True, {"students": 1})
+
+
+def test_load_started_before_invalidation_is_not_stored():
+    cache = ResponseCache()
+
+    async def loader():
+        cache.invalidate()  # An ingest finished while the query ran
+        return "stale"
+
+    assert asyncio.run(cache.get_or_load("overview", None, loader)) == "stale"
+    assert cache.get(cache.make_key("overview")) == (False, None)
+
+
+def test_cancelled_loader_does_not_hang_waiters():
+    cache = ResponseCache()
+    started = []
+
+    async def loader():
+        started.append(1)
+        if len(started) == 1:
+            await asyncio.sleep(10)  # The first request's load, cancelled below
+        return "fresh"
+
+    async def main():
+        first = asyncio.create_task(cache.get_or_load("overview", None, loader))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_load("overview", None, loader))
+        await asyncio.sleep(0)
+        first.cancel()  # The client of the loading request disconnected
+        result = await asyncio.wait_for(waiter, timeout=2)
+        try:
+            await first
+        except asyncio.CancelledError:
+            pass
+        else:
+            raise AssertionError("expected the loading request to be cancelled")
+        return result
+
+    assert asyncio.run(main()) == "fresh"
+    assert len(started) == 2
+    assert cache.get(cache.make_key("overview")) == (True, "fresh")
+
+
+def test_cancelled_waiter_leaves_the_load_running():
+    cache = ResponseCache()
+
+    async def loader():
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def main():
+        first = asyncio.create_task(cache.get_or_load("overview", None, loader))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_load("overview", None, loader))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            pass
+        return await first
+
+    assert asyncio.run(main()) == "value"
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e!r}")
+    if failures:
+        print(f"\n💥 {failures} test(s) failed!")
+        sys.exit(1)
+    print("\n🎉 All response cache tests passed!")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test the /students keyset pagination helpers (no database needed)
+"""
+import sys
+import uuid
+
+from student_pages import (
+    InvalidCursorError, count_query, decode_cursor, encode_cursor, escape_like, page_query, page_result
+)
+
+
+def make_row(engagement, student_id=None):
+    student_id = student_id or uuid.uuid4()
+    return {
+        "id": student_id, "first_name": "Ada", "last_name": "Lovelace", "email": "ada@example.com",
+        "average_engagement": engagement, "sessions_count": 3, "class_names": "Math,Physics",
+        "k0": engagement, "k1": student_id
+    }
+
+
+def test_cursor_round_trip():
+    key = [72.25, "0b7e7c1e-3c55-4a8e-9d8e-2f6f1c1d2a3b"]
+    cursor = encode_cursor("engagement_desc", key)
+    assert "=" not in cursor
+    assert decode_cursor("engagement_desc", cursor) == key
+
+
+def test_cursor_of_another_sort_is_rejected():
+    cursor = encode_cursor("engagement_desc", [72.25, "id"])
+    for sort, bad in [("engagement_asc", cursor), ("engagement_desc", "not-a-cursor"),
+                      ("name_asc", encode_cursor("name_asc", ["lovelace", "id"]))]:
+        try:
+            decode_cursor(sort, bad)
+        except InvalidCursorError:
+            pass
+        else:
+            raise AssertionError(f"expected InvalidCursorError for {sort}")
+
+
+def test_first_page_query():
+    sql, params = page_query("engagement_desc", limit=20)
+    assert "ORDER BY r.average_engagement DESC, r.student_id DESC" in sql
+    assert "(r.average_engagement, r.student_id) <" not in sql
+    assert params == {"limit": 21}
+
+
+def test_next_page_seeks_past_cursor():
+    cursor = encode_cursor("name_asc", ["lovelace", "ada", "0b7e7c1e-3c55-4a8e-9d8e-2f6f1c1d2a3b"])
+    sql, params = page_query("name_asc", cursor, 10)
+    # Coalesced, so students without a name do not end the listing
+    assert ('(lower(coalesce(s.last_name, \'\')) COLLATE "C", lower(coalesce(s.first_name, \'\')) COLLATE "C", '
+            's.id) > (CAST(:k0 AS text), CAST(:k1 AS text), CAST(:k2 AS uuid))') in sql
+    assert params["k0"] == "lovelace" and params["k2"].startswith("0b7e7c1e")
+
+
+def test_filters():
+    sql, params = page_query("sessions_asc", class_name="Physics", min_engagement=40,
+                             max_engagement=70, name_prefix=" Lo_ ")
+    assert "sc.class_name = :class_name" in sql
+    assert "r.average_engagement >= :min_engagement" in sql
+    assert "r.average_engagement <= :max_engagement" in sql
+    assert params["name_pattern"] == "lo\\_%"
+    assert escape_like("100%\\") == "100\\%\\\\"
+
+
+def test_unknown_sort():
+    try:
+        page_query("popularity")
+    except ValueError as e:
+        assert "popularity" in str(e)
+    else:
+        raise AssertionError("expected ValueError")
+
+
+def test_page_result_cursor_points_at_last_row():
+    rows = [make_row(90 - i) for i in range(4)]
+    page = page_result("engagement_desc", rows, 3)
+    assert [s["average_engagement"] for s in page["students"]] == [90, 89, 88]
+    assert decode_cursor("engagement_desc", page["next_cursor"]) == [88, str(rows[2]["id"])]
+
+    last_page = page_result("engagement_desc", rows[:2], 3)
+    assert last_page["next_cursor"] is None
+    assert len(last_page["students"]) == 2
+
+
+def test_count_query():
+    sql, params = count_query()
+    assert "engagement_rollup_totals" in sql and params == {}
+    sql, params = count_query(class_name="Physics")
+    assert sql.startswith("SELECT COUNT(*)") and params == {"class_name": "Physics"}
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e!r}")
+    if failures:
+        print(f"\n💥 {failures} test(s) failed!")
+        sys.exit(1)
+    print("\n🎉 All student pagination tests passed!")
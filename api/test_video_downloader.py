@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test that a truncated video stream is not reported as a complete analysis
+"""
+import os
+import sys
+import tempfile
+
+import cv2
+import numpy as np
+
+from video_downloader import STREAM_END_TOLERANCE_FRAMES, check_stream_complete
+
+FRAMES = 60
+
+
+def read_counts(path):
+    """(last frame index, frames read, CAP_PROP_FRAME_COUNT) of a video file"""
+    cap = cv2.VideoCapture(path)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    frames_read = 0
+    while cap.read()[0]:
+        frames_read += 1
+    cap.release()
+    return frames_read - 1, frames_read, total_frames
+
+
+def test_truncated_file_is_detected():
+    with tempfile.TemporaryDirectory() as directory:
+        video = os.path.join(directory, 'recording.avi')
+        writer = cv2.VideoWriter(video, cv2.VideoWriter_fourcc(*'MJPG'), 30, (160, 120))
+        rng = np.random.default_rng(0)
+        for _ in range(FRAMES):
+            writer.write(rng.integers(0, 255, (120, 160, 3), dtype=np.uint8))
+        writer.release()
+
+        truncated = os.path.join(directory, 'truncated.avi')
+        with open(video, 'rb') as source, open(truncated, 'wb') as target:
+            target.write(source.read()[:os.path.getsize(video) // 2])
+
+        assert check_stream_complete(*read_counts(video)) is None
+        last_frame, frames_read, total_frames = read_counts(truncated)
+        assert total_frames == FRAMES and frames_read < FRAMES
+        assert f"after {frames_read} of {FRAMES} frames" in check_stream_complete(last_frame, frames_read, total_frames)
+
+
+def test_tolerance_and_unknown_length():
+    last = FRAMES - 1 - STREAM_END_TOLERANCE_FRAMES
+    assert check_stream_complete(last, last + 1, FRAMES) is None
+    assert check_stream_complete(last - 1, last, FRAMES) is not None
+    assert check_stream_complete(0, 0, FRAMES) is not None  # Nothing analyzed
+    assert check_stream_complete(10, 11, 0) is None  # No frame count to compare with
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__}: {e!r}")
+    if failures:
+        print(f"\n💥 {failures} test(s) failed!")
+        sys.exit(1)
+    print("\n🎉 All video downloader tests passed!")
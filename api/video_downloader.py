@@ -2,6 +2,7 @@ import requests
 import os
 import sys
 import logging
+import threading
 from datetime import datetime
 from typing import Dict, Optional
 from urllib.parse import urlparse
@@ -15,6 +16,60 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'Facial-Emotion-Re
 
 from simplified_analyzer import SimplifiedAnalyzer
 
+# Frames a finished stream may fall short of the container's frame count
+# (some muxers round the count, and the last frames can fail to decode)
+STREAM_END_TOLERANCE_FRAMES = 2
+
+def get_video_target(bot_id: str, custom_filename: Optional[str] = None) -> str:
+    """
+    Path under the Facial-Emotion-Recognition directory for a bot's video
+    
+    Args:
+        bot_id (str): The bot ID for naming the file
+        custom_filename (str, optional): Custom filename (without extension)
+    
+    Returns:
+        str: Path of the .mp4 file (the directory is created if needed)
+    """
+    project_root = os.path.dirname(os.path.dirname(__file__))
+    target_dir = os.path.join(project_root, 'Facial-Emotion-Recognition-using-OpenCV-and-Deepface')
+    os.makedirs(target_dir, exist_ok=True)
+    
+    if custom_filename:
+        video_filename = f"{custom_filename}.mp4"
+    else:
+        timestamp = int(datetime.now().timestamp())
+        video_filename = f"video_{bot_id}_{timestamp}.mp4"
+    return os.path.join(target_dir, video_filename)
+
+def write_video_stream(s3_url: str, video_path: str) -> int:
+    """
+    Stream an HTTP download to a file in 8 KB chunks
+    
+    Returns:
+        int: Number of bytes written
+    """
+    with requests.get(s3_url, stream=True, timeout=300) as response:
+        response.raise_for_status()
+        
+        # Get file size for progress tracking
+        total_size = int(response.headers.get('content-length', 0))
+        downloaded_size = 0
+        
+        logger.info(f"Starting download of {total_size} bytes to {video_path}")
+        
+        with open(video_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=8192):
+                if chunk:  # Filter out keep-alive chunks
+                    f.write(chunk)
+                    downloaded_size += len(chunk)
+                    
+                    # Log progress every 10MB
+                    if downloaded_size % (10 * 1024 * 1024) == 0:
+                        progress = (downloaded_size / total_size * 100) if total_size > 0 else 0
+                        logger.info(f"Download progress: {progress:.1f}% ({downloaded_size}/{total_size} bytes)")
+    return downloaded_size
+
 def download_video_from_s3(s3_url: str, bot_id: str, custom_filename: Optional[str] = None) -> Dict:
     """
     Download video from AWS S3 URL to Facial-Emotion-Recognition directory
@@ -28,21 +83,8 @@ def download_video_from_s3(s3_url: str, bot_id: str, custom_filename: Optional[s
         Dict: Result containing status, file path, and metadata
     """
     try:
-        # Set the target directory
-        project_root = os.path.dirname(os.path.dirname(__file__))
-        target_dir = os.path.join(project_root, 'Facial-Emotion-Recognition-using-OpenCV-and-Deepface')
-        
-        # Create directory if it doesn't exist
-        os.makedirs(target_dir, exist_ok=True)
-        
-        # Create unique filename
-        if custom_filename:
-            video_filename = f"{custom_filename}.mp4"
-        else:
-            timestamp = int(datetime.now().timestamp())
-            video_filename = f"video_{bot_id}_{timestamp}.mp4"
-        
-        video_path = os.path.join(target_dir, video_filename)
+        video_path = get_video_target(bot_id, custom_filename)
+        video_filename = os.path.basename(video_path)
         
         logger.info(f"Downloading video from S3 for bot {bot_id}")
         logger.info(f"S3 URL: {s3_url[:100]}...")
@@ -50,26 +92,7 @@ def download_video_from_s3(s3_url: str, bot_id: str, custom_filename: Optional[s
         
         # Download the video with progress tracking
         start_time = time.time()
-        
-        with requests.get(s3_url, stream=True, timeout=300) as response:
-            response.raise_for_status()
-            
-            # Get file size for progress tracking
-            total_size = int(response.headers.get('content-length', 0))
-            downloaded_size = 0
-            
-            logger.info(f"Starting download of {total_size} bytes to {video_path}")
-            
-            with open(video_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:  # Filter out keep-alive chunks
-                        f.write(chunk)
-                        downloaded_size += len(chunk)
-                        
-                        # Log progress every 10MB
-                        if downloaded_size % (10 * 1024 * 1024) == 0:
-                            progress = (downloaded_size / total_size * 100) if total_size > 0 else 0
-                            logger.info(f"Download progress: {progress:.1f}% ({downloaded_size}/{total_size} bytes)")
+        write_video_stream(s3_url, video_path)
         
         # Verify download
         file_size = os.path.getsize(video_path)
@@ -80,8 +103,6 @@ def download_video_from_s3(s3_url: str, bot_id: str, custom_filename: Optional[s
         logger.info(f"File size: {file_size:,} bytes")
         logger.info(f"Download time: {download_time:.2f} seconds")
         logger.info(f"Download speed: {file_size / download_time / 1024 / 1024:.2f} MB/s")
-
-        analysis = SimplifiedAnalyzer(video_path)
         
         return {
             "status": "success",
@@ -112,6 +133,141 @@ def download_video_from_s3(s3_url: str, bot_id: str, custom_filename: Optional[s
             "message": f"Failed to download video: {str(e)}"
         }
 
+def check_stream_complete(last_frame: int, analyzed_frames: int, total_frames: int) -> Optional[str]:
+    """
+    Compare where a streamed analysis stopped with the video's frame count
+    
+    OpenCV reads CAP_PROP_FRAME_COUNT from the container header, so it is
+    the length of the whole recording even when the connection drops and
+    decoding ends early.
+    
+    Args:
+        last_frame (int): Index of the last analyzed frame
+        analyzed_frames (int): Number of analyzed frames
+        total_frames (int): Frame count of the video (0 or less: unknown)
+    
+    Returns:
+        Optional[str]: Error message when the stream ended early, else None
+    """
+    if total_frames <= 0:
+        return None
+    frames_read = last_frame + 1 if analyzed_frames else 0
+    if total_frames - frames_read > STREAM_END_TOLERANCE_FRAMES:
+        return f"Video stream ended after {frames_read} of {total_frames} frames"
+    return None
+
+def stream_and_analyze(s3_url: str, bot_id: str, keep_video: bool = False,
+                       custom_filename: Optional[str] = None, output_file: Optional[str] = None,
+                       log_interval: int = 500, progress_callback=None, **analyzer_options) -> Dict:
+    """
+    Analyze a recording while it is still downloading
+    
+    The analyzer opens the URL directly: OpenCV's FFmpeg backend reads the
+    video over HTTP with range requests and decodes it as the bytes arrive,
+    so the first results are written after a few seconds instead of after
+    the whole download. Range requests also handle MP4 files whose index
+    (moov atom) is stored at the end, which a plain pipe could not decode.
+    
+    A stream that ends before the frame count in the video's header (a
+    dropped connection, an expired URL) is reported as an error rather than
+    a short success; the partial results file is left in place.
+    
+    With keep_video=False nothing but the results file is stored locally.
+    With keep_video=True the file is also downloaded to the usual location
+    in a background thread, so the recording is fetched twice. A single
+    fetch teed to disk would not do: FFmpeg seeks with its own range
+    requests (to the index at the end of non-faststart MP4s, which Recall
+    recordings can be), so it cannot decode a one-pass copy until that copy
+    is complete, and analysis would wait for the whole download again.
+    keep_video is an archival option (KEEP_RECORDINGS), off by default.
+    
+    Args:
+        s3_url (str): The AWS S3 download URL
+        bot_id (str): The bot ID for naming the files
+        keep_video (bool): Also store the full video on local disk
+        custom_filename (str, optional): Custom filename (without extension)
+        output_file (str, optional): Results file (default: a .jsonl next to
+            where the video would be stored)
+        log_interval (int): Analyzed frames between progress log lines
+        progress_callback (callable, optional): Called with the analyzer's
+            progress dict after every analyzed frame
+        **analyzer_options: Extra SimplifiedAnalyzer arguments
+    
+    Returns:
+        Dict: Result containing status, results path, timings and, with
+            keep_video, the video download result
+    """
+    video_path = get_video_target(bot_id, custom_filename)
+    output_file = output_file or os.path.splitext(video_path)[0] + '.jsonl'
+    
+    download = {}
+    download_thread = None
+    if keep_video:
+        def run_download():
+            download.update(download_video_from_s3(s3_url, bot_id, os.path.splitext(os.path.basename(video_path))[0]))
+        
+        download_thread = threading.Thread(target=run_download, name=f'download-{bot_id}', daemon=True)
+        download_thread.start()
+    
+    logger.info(f"Streaming analysis of bot {bot_id} recording to {output_file}")
+    start_time = time.time()
+    timings = {'first_result': None, 'finished': False, 'analyzed_frames': 0, 'last_frame': 0, 'total_frames': 0}
+    
+    def on_progress(progress):
+        if timings['first_result'] is None and progress['analyzed_frames']:
+            timings['first_result'] = time.time() - start_time
+            logger.info(f"First analysis result after {timings['first_result']:.2f} seconds")
+        timings['analyzed_frames'] = progress['analyzed_frames']
+        if progress_callback:
+            progress_callback(progress)
+        if progress['finished']:
+            timings['finished'] = True
+            timings['last_frame'] = progress['frame_count']
+            timings['total_frames'] = progress['total_frames']
+        elif progress['analyzed_frames'] % log_interval == 0:
+            logger.info(f"Analyzed {progress['analyzed_frames']} frames ({progress['fps']:.1f} fps)")
+    
+    analyzer = None
+    try:
+        analyzer = SimplifiedAnalyzer(s3_url, output_file=output_file, **analyzer_options)
+        # progress_interval=1 so the time to the first result is measured exactly
+        analyzer.run_analysis(headless=True, progress_callback=on_progress, progress_interval=1)
+        if not timings['finished']:
+            raise IOError("Could not open the video stream")
+        truncated = check_stream_complete(timings['last_frame'], timings['analyzed_frames'], timings['total_frames'])
+        if truncated:
+            raise IOError(f"{truncated}; partial results in {output_file}")
+        if timings['total_frames'] <= 0:
+            logger.warning("The video has no frame count, so a truncated stream cannot be detected")
+        analysis_time = time.time() - start_time
+        logger.info(f"✅ Streaming analysis finished in {analysis_time:.2f} seconds")
+        result = {
+            "status": "success",
+            "bot_id": bot_id,
+            "results_path": output_file,
+            "frames_analyzed": timings['analyzed_frames'],
+            "total_frames": timings['total_frames'],
+            "time_to_first_result": timings['first_result'],
+            "analysis_time": analysis_time,
+            "message": f"Recording analyzed while streaming, results saved to {output_file}"
+        }
+    except Exception as e:
+        logger.error(f"Error analyzing video stream: {e}")
+        result = {
+            "status": "error",
+            "bot_id": bot_id,
+            "error": str(e),
+            "message": f"Failed to analyze video stream: {str(e)}"
+        }
+    finally:
+        if analyzer is not None:
+            analyzer.release_models()
+    
+    if download_thread is not None:
+        download_thread.join()
+        result["download"] = download
+    return result
+
 def download_video_with_retry(s3_url: str, bot_id: str, max_retries: int = 3, custom_filename: Optional[str] = None) -> Dict:
     """
     Download video with retry logic for failed attempts
@@ -2,69 +2,93 @@ import { Button } from "@/components/ui/button"
 import { Input } from "@/components/ui/input"
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "@/components/ui/select"
 import { Badge } from "@/components/ui/badge"
-import { Search, Filter, Download, X } from "lucide-react"
+import { Search, X } from "lucide-react"
+import { StudentFilterValues } from "@/lib/types"
 
-const activeFilters = [
-  { label: "At Risk", value: "at-risk", type: "status" },
-  { label: "Physics", value: "physics", type: "subject" },
-]
+export const emptyStudentFilters: StudentFilterValues = { name_prefix: "", class_name: "", status: "all" }
+
+// Engagement range (percent) sent to /api/students for each status
+export const statusRanges: Record<StudentFilterValues["status"], { min?: number; max?: number }> = {
+  all: {},
+  engaged: { min: 70 },
+  moderate: { min: 40, max: 70 },
+  "at-risk": { max: 40 },
+}
+
+const statusLabels: Record<StudentFilterValues["status"], string> = {
+  all: "All Status",
+  engaged: "Highly Engaged",
+  moderate: "Moderate",
+  "at-risk": "At Risk",
+}
+
+interface StudentFiltersProps {
+  value: StudentFilterValues
+  onChange: (value: StudentFilterValues) => void
+}
+
+export function StudentFilters({ value, onChange }: StudentFiltersProps) {
+  const activeFilters = [
+    value.name_prefix && { label: `Name: ${value.name_prefix}`, key: "name_prefix" as const },
+    value.class_name && { label: `Class: ${value.class_name}`, key: "class_name" as const },
+    value.status !== "all" && { label: statusLabels[value.status], key: "status" as const },
+  ].filter(Boolean) as { label: string; key: keyof StudentFilterValues }[]
 
-export function StudentFilters() {
   return (
     <div className="space-y-4">
       <div className="flex items-center gap-4">
         <div className="relative flex-1 max-w-md">
           <Search className="absolute left-3 top-1/2 transform -translate-y-1/2 text-muted-foreground h-4 w-4" />
-          <Input placeholder="Search students by name or ID..." className="pl-10" />
+          <Input
+            placeholder="Search students by name..."
+            className="pl-10"
+            value={value.name_prefix}
+            onChange={(e) => onChange({ ...value, name_prefix: e.target.value })}
+          />
         </div>
 
-        <Select defaultValue="all-status">
-          <SelectTrigger className="w-40">
-            <SelectValue />
-          </SelectTrigger>
-          <SelectContent>
-            <SelectItem value="all-status">All Status</SelectItem>
-            <SelectItem value="engaged">Highly Engaged</SelectItem>
-            <SelectItem value="moderate">Moderate</SelectItem>
-            <SelectItem value="at-risk">At Risk</SelectItem>
-            <SelectItem value="inactive">Inactive</SelectItem>
-          </SelectContent>
-        </Select>
+        <Input
+          placeholder="Class"
+          className="w-40"
+          value={value.class_name}
+          onChange={(e) => onChange({ ...value, class_name: e.target.value })}
+        />
 
-        <Select defaultValue="all-subjects">
+        <Select
+          value={value.status}
+          onValueChange={(status) => onChange({ ...value, status: status as StudentFilterValues["status"] })}
+        >
           <SelectTrigger className="w-40">
             <SelectValue />
           </SelectTrigger>
           <SelectContent>
-            <SelectItem value="all-subjects">All Subjects</SelectItem>
-            <SelectItem value="mathematics">Mathematics</SelectItem>
-            <SelectItem value="physics">Physics</SelectItem>
-            <SelectItem value="chemistry">Chemistry</SelectItem>
-            <SelectItem value="biology">Biology</SelectItem>
+            {Object.entries(statusLabels).map(([status, label]) => (
+              <SelectItem key={status} value={status}>
+                {label}
+              </SelectItem>
+            ))}
           </SelectContent>
         </Select>
-
-        <Button variant="outline" size="sm">
-          <Filter className="h-4 w-4 mr-2" />
-          More Filters
-        </Button>
-
-        <Button variant="outline" size="sm">
-          <Download className="h-4 w-4 mr-2" />
-          Export
-        </Button>
       </div>
 
       {activeFilters.length > 0 && (
         <div className="flex items-center gap-2">
           <span className="text-sm text-muted-foreground">Active filters:</span>
           {activeFilters.map((filter) => (
-            <Badge key={filter.value} variant="secondary" className="gap-1">
+            <Badge key={filter.key} variant="secondary" className="gap-1">
               {filter.label}
-              <X className="h-3 w-3 cursor-pointer" />
+              <X
+                className="h-3 w-3 cursor-pointer"
+                onClick={() => onChange({ ...value, [filter.key]: emptyStudentFilters[filter.key] })}
+              />
             </Badge>
           ))}
-          <Button variant="ghost" size="sm" className="text-muted-foreground">
+          <Button
+            variant="ghost"
+            size="sm"
+            className="text-muted-foreground"
+            onClick={() => onChange(emptyStudentFilters)}
+          >
             Clear all
           </Button>
         </div>
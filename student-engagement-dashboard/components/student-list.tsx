@@ -12,30 +12,136 @@ import {
   AlertTriangle,
   Eye,
 } from "lucide-react";
-import { useCallback, useEffect, useState } from "react";
-import { Student } from "@/lib/types";
+import { useCallback, useEffect, useRef, useState } from "react";
+import {
+  Select,
+  SelectContent,
+  SelectItem,
+  SelectTrigger,
+  SelectValue,
+} from "@/components/ui/select";
+import {
+  StudentFilters,
+  emptyStudentFilters,
+  statusRanges,
+} from "@/components/student-filters";
+import {
+  Student,
+  StudentFilterValues,
+  StudentPage,
+  StudentSort,
+} from "@/lib/types";
+
+const PAGE_SIZE = 50;
+
+const sortLabels: Record<StudentSort, string> = {
+  engagement_desc: "Engagement ↓",
+  engagement_asc: "Engagement ↑",
+  sessions_desc: "Sessions ↓",
+  sessions_asc: "Sessions ↑",
+  name_asc: "Name A–Z",
+  name_desc: "Name Z–A",
+};
+
+function studentsUrl(
+  filters: StudentFilterValues,
+  sort: StudentSort,
+  cursor: string | null
+) {
+  const params = new URLSearchParams({ sort, limit: String(PAGE_SIZE) });
+  const name = filters.name_prefix.trim();
+  const className = filters.class_name.trim();
+  const { min, max } = statusRanges[filters.status];
+  if (name) params.set("name_prefix", name);
+  if (className) params.set("class_name", className);
+  if (min !== undefined) params.set("min_engagement", String(min));
+  if (max !== undefined) params.set("max_engagement", String(max));
+  if (cursor) {
+    params.set("cursor", cursor);
+  } else {
+    params.set("include_total", "true");
+  }
+  return `/api/students?${params}`;
+}
 
 export function StudentList() {
   const [students, setStudents] = useState<Student[]>([]);
-  const getData = useCallback(async () => {
-    const response = await fetch("/api/students");
-    const jsonData = await response.json();
-    setStudents(jsonData);
-  }, []);
+  const [total, setTotal] = useState<number | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loading, setLoading] = useState(false);
+  const [filters, setFilters] =
+    useState<StudentFilterValues>(emptyStudentFilters);
+  const [sort, setSort] = useState<StudentSort>("engagement_desc");
+
+  // The request in flight (first page or "Load more"); replaced and aborted
+  // when a newer request starts or the filters or sort change
+  const request = useRef<AbortController | null>(null);
+
+  const getPage = useCallback(
+    async (cursor: string | null) => {
+      request.current?.abort();
+      const controller = new AbortController();
+      request.current = controller;
+      setLoading(true);
+      try {
+        const response = await fetch(studentsUrl(filters, sort, cursor), {
+          signal: controller.signal,
+        });
+        const page: StudentPage = await response.json();
+        if (controller.signal.aborted) return;
+        setStudents((current) =>
+          cursor ? [...current, ...page.students] : page.students
+        );
+        if (page.total !== undefined) setTotal(page.total);
+        setNextCursor(page.next_cursor);
+      } catch (e) {
+        if ((e as Error).name !== "AbortError") throw e;
+      } finally {
+        if (request.current === controller) {
+          request.current = null;
+          setLoading(false);
+        }
+      }
+    },
+    [filters, sort]
+  );
+
+  // First page again whenever the filters or the sort change (debounced for typing);
+  // a page still loading for the previous filters is aborted, so its rows are never appended
   useEffect(() => {
-    getData();
-  }, [getData]);
+    const timeout = setTimeout(() => getPage(null), 250);
+    return () => {
+      clearTimeout(timeout);
+      request.current?.abort();
+    };
+  }, [getPage]);
+
   return (
     <div className="space-y-4">
+      <StudentFilters value={filters} onChange={setFilters} />
+
       <div className="flex items-center justify-between">
         <p className="text-sm text-muted-foreground">
-          Showing {students.length} students
+          Showing {students.length}
+          {total !== null && ` of ${total}`} students
         </p>
         <div className="flex items-center gap-2">
           <span className="text-sm text-muted-foreground">Sort by:</span>
-          <Button variant="ghost" size="sm">
-            Engagement ↓
-          </Button>
+          <Select
+            value={sort}
+            onValueChange={(value) => setSort(value as StudentSort)}
+          >
+            <SelectTrigger className="w-40">
+              <SelectValue />
+            </SelectTrigger>
+            <SelectContent>
+              {Object.entries(sortLabels).map(([value, label]) => (
+                <SelectItem key={value} value={value}>
+                  {label}
+                </SelectItem>
+              ))}
+            </SelectContent>
+          </Select>
         </div>
       </div>
 
@@ -111,6 +217,18 @@ export function StudentList() {
           </Card>
         ))}
       </div>
+
+      {nextCursor && (
+        <div className="flex justify-center">
+          <Button
+            variant="outline"
+            disabled={loading}
+            onClick={() => getPage(nextCursor)}
+          >
+            {loading ? "Loading..." : "Load more"}
+          </Button>
+        </div>
+      )}
     </div>
   );
 }
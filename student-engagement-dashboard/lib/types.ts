@@ -16,3 +16,23 @@ export interface Student {
   total_sessions: number;
   classes: string;
 }
+
+export type StudentSort =
+  | "engagement_desc"
+  | "engagement_asc"
+  | "sessions_desc"
+  | "sessions_asc"
+  | "name_asc"
+  | "name_desc";
+
+export interface StudentFilterValues {
+  name_prefix: string;
+  class_name: string;
+  status: "all" | "engaged" | "moderate" | "at-risk";
+}
+
+export interface StudentPage {
+  students: Student[];
+  next_cursor: string | null;
+  total?: number;
+}